@@ -22,3 +22,25 @@ class Config:
 
     REPOSITORY = environ.get('REPOSITORY')
 
+    # Startup
+    STARTUP_REPORT = environ.get('STARTUP_REPORT') == 'True'
+    BACKGROUND_LOADING = environ.get('BACKGROUND_LOADING') == 'True'
+
+    # Static assets
+    HASH_STATIC_ASSETS = environ.get('HASH_STATIC_ASSETS') == 'True'
+    SELF_HOSTED_FONTS = environ.get('SELF_HOSTED_FONTS') == 'True'
+
+    # Rendering
+    STREAM_TEMPLATES = environ.get('STREAM_TEMPLATES') == 'True'
+
+    # Instrumentation
+    SERVER_TIMING = environ.get('SERVER_TIMING') == 'True'
+    METRICS = environ.get('METRICS') == 'True'
+    PROFILING = environ.get('PROFILING') == 'True'
+    PROFILE_DIR = environ.get('PROFILE_DIR', 'profiles')
+    PROFILE_SAMPLE_RATE = float(environ.get('PROFILE_SAMPLE_RATE', 0))
+
+    # Response compression
+    COMPRESS_RESPONSES = environ.get('COMPRESS_RESPONSES') == 'True'
+    COMPRESS_MIN_SIZE = int(environ.get('COMPRESS_MIN_SIZE', 500))
+
@@ -9,12 +9,16 @@ from sqlalchemy.orm import sessionmaker, clear_mappers
 from sqlalchemy.pool import NullPool
 
 import flix.adapters.repository as repo
+from flix import assets, profiling, readiness
+from flix.startup import StartupTimer
+from flix.compression import GzipMiddleware
 from flix.adapters import memory_repository, database_repository
 from flix.adapters.orm import metadata, map_model_to_tables
 
 
 def create_app(test_config=None):
     """Construct the core application."""
+    startup = StartupTimer()
 
     # Create the Flask app object.
     app = Flask(__name__)
@@ -27,11 +31,22 @@ def create_app(test_config=None):
         # Load test configuration, and override any configuration settings.
         app.config.from_mapping(test_config)
         data_path = app.config['TEST_DATA_PATH']
+    startup.mark('configuration')
+
+    database_engine = None
+    compression = None
+    catalogue = readiness.Readiness()
 
     if app.config['REPOSITORY'] == 'memory':
         # Create the MemoryRepository instance for a memory-based repository.
         repo.repo_instance = memory_repository.MemoryRepository()
-        memory_repository.populate(data_path, repo.repo_instance)
+        if app.config.get('BACKGROUND_LOADING'):
+            # Serve health checks, and 503s to everything else, while the catalogue loads
+            repository = repo.repo_instance
+            catalogue.load_in_background(lambda: memory_repository.populate(data_path, repository))
+        else:
+            memory_repository.populate(data_path, repo.repo_instance)
+            catalogue.loaded()
 
     elif app.config['REPOSITORY'] == 'database':
         # Configure database.
@@ -41,27 +56,61 @@ def create_app(test_config=None):
         database_engine = create_engine(database_uri, connect_args={"check_same_thread": False}, poolclass=NullPool,
                                         echo=database_echo)
 
-        if app.config['TESTING'] == 'True' or len(database_engine.table_names()) == 0:
+        # Checking the schema stamp is a single query, where listing the tables reads the whole schema
+        schema_is_current = database_repository.schema_is_current(database_engine)
+        if app.config['TESTING'] == 'True' or (not schema_is_current and len(database_engine.table_names()) == 0):
             print("REPOPULATING DATABASE")
             # For testing, or first-time use of the web application, reinitialise the database.
             clear_mappers()
-            metadata.create_all(database_engine)  # Conditionally create database tables.
-            for table in reversed(metadata.sorted_tables):  # Remove any data from the tables.
-                database_engine.execute(table.delete())
+            # Recreate the tables rather than empty them, as create_all leaves tables made for an older schema as
+            # they are
+            metadata.drop_all(database_engine)
+            metadata.create_all(database_engine)
 
             # Generate mappings that map domain model classes to the database tables.
             map_model_to_tables()
 
             database_repository.populate(database_engine, data_path)
 
+        elif not schema_is_current:
+            print("MIGRATING DATABASE")
+            # A database made for older tables: bring it up to date without losing what users have written.
+            clear_mappers()
+            database_repository.migrate(database_engine, data_path)
+            map_model_to_tables()
+
         else:
             # Solely generate mappings that map domain model classes to the database tables.
+            clear_mappers()
             map_model_to_tables()
 
         # Create the database session factory using sessionmaker
         session_factory = sessionmaker(autocommit=False, autoflush=True, bind=database_engine)
         # Create the SQLAlchemy DatabaseRepository instance for an sqlite3-based repository.
         repo.repo_instance = database_repository.SqlAlchemyRepository(session_factory)
+        catalogue.loaded()
+    startup.mark('repository')
+
+    # Registered first, so requests are turned away before any other hook runs
+    readiness.init_app(app, catalogue)
+
+    if app.config.get('SELF_HOSTED_FONTS'):
+        missing_fonts = assets.missing_references(app.static_folder, 'css/fonts.css')
+        if missing_fonts:
+            # Keep the external stylesheet until the font files are added
+            print("SELF_HOSTED_FONTS IS SET BUT THESE FONTS ARE MISSING:", ', '.join(missing_fonts))
+            app.config['SELF_HOSTED_FONTS'] = False
+
+    if app.config.get('HASH_STATIC_ASSETS'):
+        assets.init_app(app)
+
+    if app.config.get('COMPRESS_RESPONSES'):
+        compression = GzipMiddleware(app.wsgi_app, min_size=app.config['COMPRESS_MIN_SIZE'])
+        app.wsgi_app = compression
+
+    if app.config.get('PROFILING'):
+        profiling.init_app(app)
+    startup.mark('middleware')
 
     # Build the application
     with app.app_context():
@@ -75,6 +124,35 @@ def create_app(test_config=None):
         from .authentication import authentication
         app.register_blueprint(authentication.authentication_blueprint)
 
+        from .api import api
+        app.register_blueprint(api.api_blueprint)
+
+        # Cached fragments that templates can include
+        from . import fragments
+        app.add_template_global(fragments.movie_card)
+        app.add_template_global(fragments.alphabet_bar)
+        startup.mark('blueprints')
+
+        if app.config.get('SERVER_TIMING'):
+            from flix import timing
+            from flix.authentication import services as authentication_services
+            from flix.movies import services as movies_services
+            timing.init_app(app, repo.repo_instance,
+                            modules=(movies_services, authentication_services),
+                            template_modules=(home, movies, authentication))
+
+        if app.config.get('METRICS'):
+            from flix import metrics
+            from flix.movies import services as movies_services
+            caches = {
+                'movie': lambda: movies_services.movie_cache_stats(repo.repo_instance),
+                'watchlist': lambda: movies_services.watchlist_cache_stats(repo.repo_instance),
+                'fragment': lambda: fragments.fragment_cache_stats(repo.repo_instance)
+            }
+            if compression is not None:
+                caches['gzip'] = compression.stats
+            metrics.init_app(app, repo.repo_instance, caches, database_engine)
+
         # Register a callback the makes sure that database sessions are associated with http requests
         # We reset the session inside the database repository before a new flask request is generated
         @app.before_request
@@ -87,5 +165,11 @@ def create_app(test_config=None):
         def shutdown_session(exception=None):
             if isinstance(repo.repo_instance, database_repository.SqlAlchemyRepository):
                 repo.repo_instance.close_session()
+        startup.mark('instrumentation')
+
+    app.extensions['startup'] = startup
+    app.extensions['readiness'] = catalogue
+    if app.config.get('STARTUP_REPORT'):
+        print('STARTUP TIMES\n' + startup.report())
 
     return app
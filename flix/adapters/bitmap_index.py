@@ -0,0 +1,138 @@
+from bisect import bisect_right
+from collections import Counter
+from typing import Iterable, List
+
+
+class BitmapIndex:
+    """Bitmap index over movie rows, for the genre, actor, director and year of each movie.
+
+    Each movie is given a row number (rows follow ascending movie id) and every indexed value is stored as a
+    Python int used as a bitset, with bit n set when the movie in row n has that value. Filters then combine
+    with &, | and ~ on the ints, and counting results is a popcount."""
+
+    FIELDS = ('genre', 'actor', 'director', 'year')
+
+    def __init__(self):
+        self.__rows = list()
+        self.__row_of = dict()
+        self.__bitmaps = {field: dict() for field in BitmapIndex.FIELDS}
+        # Values of each row, per field, so facets can be counted by visiting only the matching rows
+        self.__row_values = {field: list() for field in BitmapIndex.FIELDS}
+
+    def __len__(self):
+        return len(self.__rows)
+
+    @staticmethod
+    def normalise(key):
+        if isinstance(key, str):
+            return key.strip()
+        return key
+
+    def add_row(self, movie_id: int) -> int:
+        """Returns the row of movie_id, giving it the next row number if it is not yet indexed"""
+        row = self.__row_of.get(movie_id)
+        if row is None:
+            row = len(self.__rows)
+            self.__rows.append(movie_id)
+            self.__row_of[movie_id] = row
+            for values in self.__row_values.values():
+                values.append(list())
+        return row
+
+    def set(self, field: str, key, movie_id: int):
+        key = BitmapIndex.normalise(key)
+        if key is None or key == "":
+            return
+        row = self.add_row(movie_id)
+        bitmaps = self.__bitmaps[field]
+        bits = bitmaps.get(key, 0)
+        if not bits >> row & 1:
+            bitmaps[key] = bits | (1 << row)
+            self.__row_values[field][row].append(key)
+
+    def add_movie(self, movie_id: int, genres: Iterable[str], actors: Iterable[str], director: str, year: int):
+        self.add_row(movie_id)
+        for genre in genres:
+            self.set('genre', genre, movie_id)
+        for actor in actors:
+            self.set('actor', actor, movie_id)
+        self.set('director', director, movie_id)
+        self.set('year', year, movie_id)
+
+    def values(self, field: str, row: int) -> List:
+        """Returns the values field has for the movie in row"""
+        return self.__row_values[field][row]
+
+    def keys(self, field: str) -> List:
+        return list(self.__bitmaps[field].keys())
+
+    def bitmap(self, field: str, key) -> int:
+        """Returns the bitset of rows having key for field (0 if no row has it)"""
+        return self.__bitmaps[field].get(BitmapIndex.normalise(key), 0)
+
+    def any_of(self, field: str, keys: Iterable) -> int:
+        bits = 0
+        for key in keys:
+            bits |= self.bitmap(field, key)
+        return bits
+
+    def all_rows(self) -> int:
+        return (1 << len(self.__rows)) - 1
+
+    def negate(self, bits: int) -> int:
+        return self.all_rows() & ~bits
+
+    @staticmethod
+    def count(bits: int) -> int:
+        return bin(bits).count('1')
+
+    def rows(self, bits: int, start: int = 0) -> Iterable[int]:
+        """Yields the set rows of bits from row start on, in ascending order"""
+        bits >>= start
+        data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+        for byte_index, byte in enumerate(data):
+            if byte == 0:
+                continue
+            for bit in range(8):
+                if byte >> bit & 1:
+                    yield start + byte_index * 8 + bit
+
+    def movie_id(self, row: int) -> int:
+        return self.__rows[row]
+
+    def row(self, movie_id: int) -> int:
+        """Returns the row of movie_id, or None if it is not indexed"""
+        return self.__row_of.get(movie_id)
+
+    def movie_ids(self, bits: int, cursor: int = 0, limit: int = None, after: int = None) -> List[int]:
+        """Returns the ids of the movies in bits, ascending, skipping the first cursor matches.
+
+        If after is given only ids greater than it are returned, starting the scan at the first such row."""
+        ids = list()
+        if limit is not None and limit <= 0:
+            return ids
+        start = 0 if after is None else bisect_right(self.__rows, after)
+        for i, row in enumerate(self.rows(bits, start)):
+            if i < cursor:
+                continue
+            ids.append(self.__rows[row])
+            if limit is not None and len(ids) >= limit:
+                break
+        return ids
+
+    def facets(self, bits: int, limit: int = 10) -> dict:
+        """Returns the most common values of each field among the rows in bits, with decades derived from years.
+
+        Each facet is a list of (value, count) tuples, most common first, holding at most limit values."""
+        counters = {field: Counter() for field in BitmapIndex.FIELDS}
+        for row in self.rows(bits):
+            for field, counter in counters.items():
+                counter.update(self.__row_values[field][row])
+
+        decades = Counter()
+        for year, count in counters['year'].items():
+            decades[year - year % 10] += count
+
+        facets = {field: counter.most_common(limit) for field, counter in counters.items()}
+        facets['decade'] = decades.most_common(limit)
+        return facets
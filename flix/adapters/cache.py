@@ -0,0 +1,66 @@
+from collections import OrderedDict
+from threading import Lock
+
+
+class LRUCache:
+    """A bounded mapping that evicts the least recently used entry once it is full.
+
+    Keeps hit, miss and eviction counts so callers can report how effective the cache is."""
+
+    def __init__(self, max_size: int = 128):
+        if type(max_size) is not int or max_size <= 0:
+            raise ValueError("max_size must be a positive integer")
+        self.__max_size = max_size
+        self.__entries = OrderedDict()
+        self.__lock = Lock()
+        self.__hits = 0
+        self.__misses = 0
+        self.__evictions = 0
+
+    @property
+    def max_size(self) -> int:
+        return self.__max_size
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return key in self.__entries
+
+    def get(self, key, default=None):
+        with self.__lock:
+            try:
+                value = self.__entries[key]
+            except KeyError:
+                self.__misses += 1
+                return default
+            self.__entries.move_to_end(key)
+            self.__hits += 1
+            return value
+
+    def put(self, key, value):
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.__max_size:
+                self.__entries.popitem(last=False)
+                self.__evictions += 1
+
+    def pop(self, key, default=None):
+        with self.__lock:
+            return self.__entries.pop(key, default)
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.__hits + self.__misses
+        return {
+            'size': len(self.__entries),
+            'max_size': self.__max_size,
+            'hits': self.__hits,
+            'misses': self.__misses,
+            'evictions': self.__evictions,
+            'hit_ratio': self.__hits / lookups if lookups > 0 else 0.0
+        }
@@ -0,0 +1,136 @@
+from array import array
+from bisect import bisect_left
+from typing import Iterable, List
+
+from flix.adapters.bitmap_index import BitmapIndex
+
+
+class CoStarGraph:
+    """Graph of actors who have appeared in a movie together, in compressed sparse row form.
+
+    Actors are numbered 0..n-1 and the co-stars of actor i are neighbours[offsets[i]:offsets[i + 1]], sorted.
+    Path queries run a bidirectional breadth-first search over these arrays, recording parents in two flat arrays
+    rather than building Python objects per visited actor."""
+
+    def __init__(self, index: BitmapIndex):
+        self.__index = index
+        self.__names = sorted(index.keys('actor'))
+        self.__numbers = {name: i for i, name in enumerate(self.__names)}
+
+        co_stars = [set() for i in range(len(self.__names))]
+        for row in range(len(index)):
+            cast = [self.__numbers[name] for name in index.values('actor', row)]
+            for actor in cast:
+                for co_star in cast:
+                    if co_star != actor:
+                        co_stars[actor].add(co_star)
+
+        self.__offsets = array('l', [0])
+        self.__neighbours = array('l')
+        for actor_co_stars in co_stars:
+            self.__neighbours.extend(sorted(actor_co_stars))
+            self.__offsets.append(len(self.__neighbours))
+        self.__movies = len(index)
+
+    def add_movie(self, cast: Iterable[str]):
+        """Links the cast of a movie just appended to the index. Actors new to the graph are numbered after the
+        existing ones, and only the runs of co-stars of the cast are rewritten."""
+        numbers = list()
+        for name in cast:
+            number = self.__numbers.get(name)
+            if number is None:
+                number = len(self.__names)
+                self.__names.append(name)
+                self.__numbers[name] = number
+                self.__offsets.append(self.__offsets[-1])
+            numbers.append(number)
+
+        # Rewritten from the last run back, so the offsets of the runs still to rewrite stay valid
+        added = dict()
+        for actor in sorted(set(numbers), reverse=True):
+            lo, hi = self.__offsets[actor], self.__offsets[actor + 1]
+            co_stars = set(self.__neighbours[lo:hi]).union(co_star for co_star in numbers if co_star != actor)
+            if len(co_stars) > hi - lo:
+                self.__neighbours[lo:hi] = array('l', sorted(co_stars))
+                added[actor] = len(co_stars) - (hi - lo)
+        if added:
+            shift = 0
+            for actor in range(min(added), len(self.__names)):
+                shift += added.get(actor, 0)
+                self.__offsets[actor + 1] += shift
+        self.__movies += 1
+
+    @property
+    def index(self) -> BitmapIndex:
+        """The BitmapIndex the graph was built from"""
+        return self.__index
+
+    def __len__(self):
+        return len(self.__names)
+
+    @property
+    def movies(self) -> int:
+        """The number of movies whose casts are linked"""
+        return self.__movies
+
+    def actor_number(self, name: str):
+        """Returns the number of the actor called name, or None"""
+        return self.__numbers.get(name)
+
+    def actor_name(self, number: int) -> str:
+        return self.__names[number]
+
+    def co_stars(self, number: int) -> array:
+        return self.__neighbours[self.__offsets[number]:self.__offsets[number + 1]]
+
+    def degree(self, number: int) -> int:
+        return self.__offsets[number + 1] - self.__offsets[number]
+
+    def worked_with(self, first: int, second: int) -> bool:
+        lo, hi = self.__offsets[first], self.__offsets[first + 1]
+        i = bisect_left(self.__neighbours, second, lo, hi)
+        return i < hi and self.__neighbours[i] == second
+
+    def path(self, start: int, goal: int) -> List[int]:
+        """Returns the shortest chain of actor numbers from start to goal, each having worked with the next.
+
+        Returns None if the actors are not connected."""
+        if start == goal:
+            return [start]
+
+        unvisited = -1
+        parents = (array('l', [unvisited]) * len(self.__names), array('l', [unvisited]) * len(self.__names))
+        parents[0][start] = start
+        parents[1][goal] = goal
+        frontiers = ([start], [goal])
+
+        while frontiers[0] and frontiers[1]:
+            # Expand the smaller frontier, which keeps the number of actors visited down
+            side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+            own_parents, other_parents = parents[side], parents[1 - side]
+            next_frontier = list()
+            for actor in frontiers[side]:
+                for i in range(self.__offsets[actor], self.__offsets[actor + 1]):
+                    co_star = self.__neighbours[i]
+                    if own_parents[co_star] != unvisited:
+                        continue
+                    own_parents[co_star] = actor
+                    if other_parents[co_star] != unvisited:
+                        return self.__join(parents, co_star)
+                    next_frontier.append(co_star)
+            frontiers = (next_frontier, frontiers[1]) if side == 0 else (frontiers[0], next_frontier)
+        return None
+
+    @staticmethod
+    def __join(parents, meeting: int) -> List[int]:
+        path = [meeting]
+        actor = meeting
+        while parents[0][actor] != actor:
+            actor = parents[0][actor]
+            path.append(actor)
+        path.reverse()
+        actor = meeting
+        while parents[1][actor] != actor:
+            actor = parents[1][actor]
+            path.append(actor)
+        return path
@@ -0,0 +1,63 @@
+import time
+from datetime import datetime
+from threading import Lock
+
+
+class DataVersion:
+    """Counters of the changes made to a repository's catalog, reviews and watchlists, with the time of the last one.
+
+    Anything derived from repository data (an HTTP response, a rendered fragment) can be tagged with the counters it
+    depends on and reused for as long as they stay the same. The origin tells apart repositories (and processes)
+    whose counters happen to be equal.
+
+    A local version counts the changes made through one repository object. A version of counters stored outside the
+    process (e.g. in a database shared by several processes) is a snapshot, made with stored()."""
+
+    PARTS = ('catalog', 'reviews', 'watchlists')
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__origin = format(time.time_ns(), 'x')
+        self.__counters = {part: 0 for part in DataVersion.PARTS}
+        self.__last_modified = DataVersion.now()
+        self.__local = True
+
+    @classmethod
+    def stored(cls, origin: str, counters: dict, last_modified: datetime) -> 'DataVersion':
+        """Returns a snapshot of counters kept outside the process"""
+        version = cls()
+        version.__origin = origin
+        version.__counters = {part: counters[part] for part in DataVersion.PARTS}
+        version.__last_modified = last_modified
+        version.__local = False
+        return version
+
+    @staticmethod
+    def now() -> datetime:
+        # In UTC, to the second, like HTTP dates
+        return datetime.utcnow().replace(microsecond=0)
+
+    @property
+    def origin(self) -> str:
+        return self.__origin
+
+    @property
+    def local(self) -> bool:
+        """True if every change is counted by this object, so caches that this process invalidates itself are safe"""
+        return self.__local
+
+    @property
+    def last_modified(self) -> datetime:
+        return self.__last_modified
+
+    def changed(self, part: str):
+        with self.__lock:
+            self.__counters[part] += 1
+            self.__last_modified = DataVersion.now()
+
+    def counter(self, part: str) -> int:
+        return self.__counters[part]
+
+    def tag(self, parts=PARTS) -> str:
+        """Returns a string that changes whenever any of parts changes"""
+        return '-'.join([self.__origin] + [str(self.__counters[part]) for part in parts])
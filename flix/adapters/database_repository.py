@@ -1,20 +1,34 @@
 import csv
 import os
-from typing import List
+from typing import Iterator, List
 
-from sqlalchemy import desc
+from sqlalchemy import desc, inspect, select
 from sqlalchemy.engine import Engine
-from sqlalchemy.orm import scoped_session
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import scoped_session, selectinload
 from flask import _app_ctx_stack
 from sqlalchemy.orm.exc import NoResultFound
 
-from flix.adapters.repository import AbstractRepository
+from flix.adapters.bitmap_index import BitmapIndex
+from flix.adapters.costar_graph import CoStarGraph
+from flix.adapters.data_version import DataVersion
+from flix.adapters.description_index import DescriptionIndex
+from flix.adapters.orm import SCHEMA_VERSION, metadata, schema_version, version_counters
+from flix.adapters.rankings import Rankings
+from flix.adapters.recommendations import Recommender
+from flix.adapters.repository import AbstractRepository, add_to_indexes, statistics_to_dict
 from flix.domain.model import Director, Actor, Review, Genre, Movie, User
 
 genres = None
 directors = None
 actors = None
 
+# Number of movies fetched at a time by iter_movies
+ITER_BATCH_SIZE = 100
+
+# Tables loaded from the data files, in the order they're emptied. Everything else is written by users of the application
+CATALOGUE_TABLES = ('movie_actors', 'movie_genres', 'actors', 'directors', 'genres', 'movies')
+
 
 class SessionContextManager:
     def __init__(self, session_factory):
@@ -39,9 +53,9 @@ class SessionContextManager:
 
     def reset_session(self):
         # this method can be used e.g. to allow Flask to start a new session for each http request,
-        # via the 'before_request' callback
-        self.close_current_session()
-        self.__session = scoped_session(self.__session_factory, scopefunc=_app_ctx_stack.__ident_func__)
+        # via the 'before_request' callback. Only the current context's session is discarded: the scoped session
+        # is shared with requests running at the same time in other threads.
+        self.__session.remove()
 
     def close_current_session(self):
         if not self.__session is None:
@@ -52,6 +66,11 @@ class SqlAlchemyRepository(AbstractRepository):
 
     def __init__(self, session_factory):
         self._session_cm = SessionContextManager(session_factory)
+        self._bitmap_index = None
+        self._recommender = Recommender()
+        self._description_index = None
+        self._costar_graph = None
+        self._rankings = None
 
     def close_session(self):
         self._session_cm.close_current_session()
@@ -78,7 +97,11 @@ class SqlAlchemyRepository(AbstractRepository):
     def add_movie(self, movie: Movie):
         with self._session_cm as scm:
             scm.session.add(movie)
+            self._count_change('catalog')
             scm.commit()
+            if not add_to_indexes(movie, self._bitmap_index, self._rankings, self._costar_graph,
+                                  self._description_index):
+                self._bitmap_index = None
 
     def get_movie(self, movie_id: int) -> Movie:
         movie = None
@@ -90,6 +113,14 @@ class SqlAlchemyRepository(AbstractRepository):
 
         return movie
 
+    def iter_movies(self) -> Iterator[Movie]:
+        # Fetched in batches, and released once the caller is done with them. The actors of each batch are loaded
+        # with one more query, rather than one per movie as they are listed
+        query = self._session_cm.session.query(Movie).options(selectinload(Movie._actors)).order_by(Movie._id) \
+            .yield_per(ITER_BATCH_SIZE)
+        for movie in query:
+            yield movie
+
     def get_movies_by_letter(self, target_letter) -> List[Movie]:
         # Optimise
         movies = self._session_cm.session.query(Movie).all()
@@ -182,6 +213,7 @@ class SqlAlchemyRepository(AbstractRepository):
         super().add_review(review)
         with self._session_cm as scm:
             scm.session.add(review)
+            self._count_change('reviews')
             scm.commit()
 
     def get_reviews(self) -> List[Review]:
@@ -228,15 +260,112 @@ class SqlAlchemyRepository(AbstractRepository):
         user = self._session_cm.session.query(User).filter(User._username == username).one()
         movie = self._session_cm.session.query(Movie).filter(Movie._id == movie_id).one()
         user.add_to_watchlist(movie)
+        self._count_change('watchlists')
         self._session_cm.commit()
 
     def remove_from_watchlist(self, username: str, movie_id: int):
         user = self._session_cm.session.query(User).filter(User._username == username).one()
         movie = self._session_cm.session.query(Movie).filter(Movie._id == movie_id).one()
         user.remove_from_watchlist(movie)
-        print(user._watchlist)
+        self._count_change('watchlists')
         self._session_cm.commit()
 
+    def get_number_of_reviews(self) -> int:
+        return self._session_cm.session.query(Review).count()
+
+    def get_number_of_users(self) -> int:
+        return self._session_cm.session.query(User).count()
+
+    def get_movie_statistics(self, group_by: str) -> List[dict]:
+        groups = {
+            'genre': ('genres.name', 'JOIN movie_genres ON movie_genres.movie_id = movies.id '
+                                     'JOIN genres ON genres.id = movie_genres.genre_id'),
+            'year': ('movies.year', ''),
+            'decade': ('(movies.year / 10) * 10', ''),
+            'director': ('directors.fullname', 'JOIN directors ON directors.id = movies.director_id')
+        }
+        key, joins = groups[group_by]
+        rows = self._session_cm.session.execute(
+            f'SELECT {key} AS group_key, COUNT(*), AVG(movies.runtime), AVG(movies.rating), AVG(movies.revenue) '
+            f'FROM movies {joins} GROUP BY group_key ORDER BY group_key')
+        return [statistics_to_dict(*row) for row in rows]
+
+    def get_review_activity(self) -> List[dict]:
+        rows = self._session_cm.session.execute('SELECT date(timestamp) AS day, COUNT(*) FROM reviews '
+                                                'GROUP BY day ORDER BY day')
+        return [{'date': day, 'reviews': count} for day, count in rows]
+
+    def get_data_version(self) -> DataVersion:
+        # Read from the database, so that changes made by other processes are seen here too
+        row = self._session_cm.session.execute(select([version_counters])).first()
+        if row is None:
+            return DataVersion.stored('', dict.fromkeys(DataVersion.PARTS, 0), DataVersion.now())
+        return DataVersion.stored(row['origin'], dict(row), row['last_modified'])
+
+    def _count_change(self, part: str):
+        # Made in the transaction of the change, so the counters never run ahead of or behind the data
+        session = self._session_cm.session
+        changed = session.execute(version_counters.update().values(
+            {part: version_counters.c[part] + 1, 'last_modified': DataVersion.now()}))
+        if changed.rowcount == 0:
+            # A database that wasn't populated has no counters yet
+            session.execute(version_counters.insert().values(new_data_version_row(**{part: 1})))
+
+    def get_bitmap_index(self) -> BitmapIndex:
+        if self._bitmap_index is None:
+            self.build_bitmap_index()
+        return self._bitmap_index
+
+    def get_recommender(self) -> Recommender:
+        index = self.get_bitmap_index()
+        if self._recommender.index is not index or len(self._recommender) < len(index):
+            self._recommender.refresh(index)
+        return self._recommender
+
+    def get_description_index(self) -> DescriptionIndex:
+        if self._description_index is None:
+            descriptions = self._session_cm.session.execute('SELECT id, description FROM movies ORDER BY id ASC')
+            self._description_index = DescriptionIndex(descriptions)
+        return self._description_index
+
+    def get_costar_graph(self) -> CoStarGraph:
+        index = self.get_bitmap_index()
+        if self._costar_graph is None or self._costar_graph.index is not index:
+            self._costar_graph = CoStarGraph(index)
+        return self._costar_graph
+
+    def get_rankings(self) -> Rankings:
+        index = self.get_bitmap_index()
+        if self._rankings is None or self._rankings.index is not index:
+            metrics = self._session_cm.session.execute('SELECT id, rating, votes, revenue FROM movies')
+            self._rankings = Rankings(index, metrics)
+        return self._rankings
+
+    def build_bitmap_index(self):
+        index = BitmapIndex()
+        session = self._session_cm.session
+
+        # Assign rows in movie id order first, so genre and actor rows below line up
+        movies = session.execute('SELECT movies.id, movies.year, directors.fullname FROM movies '
+                                 'LEFT JOIN directors ON movies.director_id = directors.id '
+                                 'ORDER BY movies.id ASC')
+        for movie_id, year, director in movies:
+            index.add_row(movie_id)
+            index.set('year', year, movie_id)
+            index.set('director', director, movie_id)
+
+        movie_genres = session.execute('SELECT movie_genres.movie_id, genres.name FROM movie_genres '
+                                       'JOIN genres ON movie_genres.genre_id = genres.id')
+        for movie_id, genre in movie_genres:
+            index.set('genre', genre, movie_id)
+
+        movie_actors = session.execute('SELECT movie_actors.movie_id, actors.fullname FROM movie_actors '
+                                       'JOIN actors ON movie_actors.actor_id = actors.id')
+        for movie_id, actor in movie_actors:
+            index.set('actor', actor, movie_id)
+
+        self._bitmap_index = index
+
 
 def movie_record_generator(filename: str):
     with open(filename, mode='r', encoding='utf-8-sig') as infile:
@@ -287,7 +416,12 @@ def movie_record_generator(filename: str):
                     first_letter = letter
                     break
 
-            movie_data = movie_data[0:2] + [movie_data[3]] + [director_index] + movie_data[6:8] + [first_letter]
+            revenue = movie_data[10]
+            if revenue == 'N/A':
+                revenue = None
+
+            movie_data = movie_data[0:2] + [movie_data[3]] + [director_index] + movie_data[6:8] + [first_letter] + \
+                movie_data[8:10] + [revenue]
             yield movie_data
 
 
@@ -345,10 +479,80 @@ def movie_actors_generator():
             yield movie_actors_key, movie_key, actors_key
 
 
+def schema_is_current(engine: Engine) -> bool:
+    """Returns True if the database was populated for the current SCHEMA_VERSION of the tables.
+
+    This is a single query, where listing the tables would read the whole schema"""
+    try:
+        with engine.connect() as connection:
+            version = connection.execute(select([schema_version.c.version])).scalar()
+    except OperationalError:
+        # No schema_version table: a new database, or one made before the tables were versioned
+        return False
+    return version == SCHEMA_VERSION
+
+
 def populate(engine: Engine, data_path: str):
     conn = engine.raw_connection()
     cursor = conn.cursor()
 
+    insert_catalogue(cursor, data_path)
+    stamp_schema_version(cursor)
+    reset_data_version(cursor)
+
+    conn.commit()
+    conn.close()
+
+
+def migrate(engine: Engine, data_path: str):
+    """Brings a database made for older tables up to SCHEMA_VERSION, keeping its users, reviews and watchlists.
+
+    Missing tables and columns are added, and the catalogue is reloaded so the new columns are filled in. Movies keep
+    the ids they have in the data file, so the reviews and watchlists referring to them stay valid."""
+    metadata.create_all(engine)
+    inspector = inspect(engine)
+    for table in metadata.sorted_tables:
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                engine.execute(f'ALTER TABLE {table.name} ADD COLUMN {column.name} '
+                               f'{column.type.compile(dialect=engine.dialect)}')
+
+    conn = engine.raw_connection()
+    cursor = conn.cursor()
+
+    for table in CATALOGUE_TABLES:
+        cursor.execute(f'DELETE FROM {table}')
+    insert_catalogue(cursor, data_path)
+    stamp_schema_version(cursor)
+    reset_data_version(cursor)
+
+    conn.commit()
+    conn.close()
+
+
+def stamp_schema_version(cursor):
+    # Stamped in the same transaction as the data, so a database whose population failed isn't taken as current
+    cursor.execute('DELETE FROM schema_version')
+    cursor.execute('INSERT INTO schema_version (version) VALUES (?)', (SCHEMA_VERSION,))
+
+
+def new_data_version_row(**counters) -> dict:
+    # A new origin, as the counters start again
+    row = {'origin': DataVersion().origin, 'last_modified': DataVersion.now()}
+    row.update({part: counters.get(part, 0) for part in DataVersion.PARTS})
+    return row
+
+
+def reset_data_version(cursor):
+    row = new_data_version_row()
+    cursor.execute('DELETE FROM version_counters')
+    cursor.execute('INSERT INTO version_counters (origin, catalog, reviews, watchlists, last_modified) '
+                   'VALUES (?, ?, ?, ?, ?)',
+                   (row['origin'], row['catalog'], row['reviews'], row['watchlists'], str(row['last_modified'])))
+
+
+def insert_catalogue(cursor, data_path: str):
     global genres
     global directors
     global actors
@@ -358,8 +562,8 @@ def populate(engine: Engine, data_path: str):
 
     insert_movies = """
     INSERT INTO movies (
-    id, title, description, director_id, year, runtime, first_letter)
-    VALUES (?, ?, ?, ?, ?, ?, ?)"""
+    id, title, description, director_id, year, runtime, first_letter, rating, votes, revenue)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"""
     cursor.executemany(insert_movies, movie_record_generator(os.path.join(data_path, 'movies.csv')))
 
     insert_genres = """
@@ -386,6 +590,3 @@ def populate(engine: Engine, data_path: str):
     INSERT INTO movie_actors (id, movie_id, actor_id)
     VALUES (?, ?, ?)"""
     cursor.executemany(insert_movie_actors, movie_actors_generator())
-
-    conn.commit()
-    conn.close()
@@ -0,0 +1,177 @@
+import heapq
+import re
+from array import array
+from math import log, sqrt
+from typing import Iterable, List, Tuple
+
+STOP_WORDS = frozenset([
+    'about', 'after', 'against', 'all', 'and', 'are', 'but', 'for', 'from', 'has', 'her', 'his', 'into', 'its',
+    'not', 'one', 'out', 'she', 'that', 'the', 'their', 'them', 'they', 'this', 'who', 'with', 'when', 'while'
+])
+
+
+def tokenise(text: str) -> List[str]:
+    if text is None:
+        return []
+    return [token for token in re.findall(r"[a-z]+", text.lower()) if len(token) > 2 and token not in STOP_WORDS]
+
+
+class DescriptionIndex:
+    """Top-n movies with the most similar descriptions, by cosine similarity of TF-IDF vectors.
+
+    Terms in more than max_df_ratio of the descriptions carry little meaning and are skipped. The neighbours of
+    every movie are found when the index is built and kept in one flat array, n slots per movie, so a lookup is a
+    single slice. Dot products are accumulated by walking the posting list (parallel arrays of rows and weights) of
+    each of a movie's terms. Only the max_postings heaviest postings of a term are walked, which bounds the work per
+    movie however common its terms are: a movie sharing only a common term with another, and weighing it little,
+    may be missed, but such a movie is not among the most similar anyway."""
+
+    def __init__(self, descriptions: Iterable[Tuple[int, str]], n: int = 5, max_df_ratio: float = 0.05,
+                 max_postings: int = 64):
+        self.__n = n
+        self.__max_df_ratio = max_df_ratio
+        self.__max_postings = max_postings
+        self.__rows = dict()
+        self.__movie_ids = array('l')
+        self.__document_frequencies = dict()
+        documents = list()
+        for movie_id, description in descriptions:
+            self.__rows[movie_id] = len(documents)
+            self.__movie_ids.append(movie_id)
+            documents.append(self.__count_terms(description))
+
+        # Terms of a single description aren't weighed, but are kept with its row and their count, to be posted for
+        # it once another description has them
+        self.__singletons = dict()
+        for row, counts in enumerate(documents):
+            for term, count in counts.items():
+                if self.__document_frequencies[term] == 1:
+                    self.__singletons[term] = (row, count)
+
+        self.__norms = array('d')
+        vectors = [self.__weigh(counts) for counts in documents]
+        postings = dict()
+        for row, vector in enumerate(vectors):
+            for term, weight in vector.items():
+                postings.setdefault(term, list()).append((weight, row))
+        self.__postings = dict()
+        for term, term_postings in postings.items():
+            heaviest = heapq.nlargest(max_postings, term_postings)
+            self.__postings[term] = (array('l', [row for weight, row in heaviest]),
+                                     array('d', [weight for weight, row in heaviest]))
+
+        self.__neighbours = array('l', [0] * (len(documents) * n))
+        self.__scores = array('d', [0.0] * (len(documents) * n))
+        self.__lengths = array('h', [0] * len(documents))
+        for row, vector in enumerate(vectors):
+            self.__find_neighbours(row, vector)
+
+    def __len__(self):
+        return len(self.__rows)
+
+    def similar(self, movie_id: int, limit: int = None) -> List[int]:
+        """Returns the ids of the movies whose descriptions are most like movie_id's, most similar first"""
+        row = self.__rows.get(movie_id)
+        if row is None:
+            return []
+        length = self.__lengths[row]
+        if limit is not None:
+            length = min(length, limit)
+        start = row * self.__n
+        return self.__neighbours[start:start + length].tolist()
+
+    def add_movie(self, movie_id: int, description: str):
+        """Indexes a movie not indexed yet, finding its neighbours and offering it as a neighbour to the movies it
+        is similar to.
+
+        Its terms are weighed with the document frequencies so far. The movies already indexed keep their weights,
+        which drift from the exact TF-IDF as many movies are added, until the index is built again; a term only one
+        of them had is weighed for it now, as the new movie shares it."""
+        row = len(self.__movie_ids)
+        self.__rows[movie_id] = row
+        self.__movie_ids.append(movie_id)
+        counts = self.__count_terms(description)
+        for term, count in counts.items():
+            if self.__document_frequencies[term] == 1:
+                self.__singletons[term] = (row, count)
+            elif term in self.__singletons:
+                other, other_count = self.__singletons.pop(term)
+                weight = (1 + log(other_count)) * log(len(self.__movie_ids) / 2)
+                norm = sqrt(self.__norms[other] ** 2 + weight ** 2)
+                self.__norms[other] = norm
+                self.__post(term, other, weight / norm)
+        vector = self.__weigh(counts)
+        for term, weight in vector.items():
+            self.__post(term, row, weight)
+
+        self.__neighbours.extend([0] * self.__n)
+        self.__scores.extend([0.0] * self.__n)
+        self.__lengths.append(0)
+        for other, score in self.__find_neighbours(row, vector).items():
+            self.__offer(other, row, score)
+
+    def __post(self, term: str, row: int, weight: float):
+        # Inserts row among the postings of term, heaviest first, unless max_postings heavier ones are there
+        rows, weights = self.__postings.setdefault(term, (array('l'), array('d')))
+        i = 0
+        while i < len(weights) and weights[i] >= weight:
+            i += 1
+        if i < self.__max_postings:
+            rows.insert(i, row)
+            weights.insert(i, weight)
+            if len(rows) > self.__max_postings:
+                rows.pop()
+                weights.pop()
+
+    def __count_terms(self, description: str) -> dict:
+        counts = dict()
+        for token in tokenise(description):
+            counts[token] = counts.get(token, 0) + 1
+        for term in counts:
+            self.__document_frequencies[term] = self.__document_frequencies.get(term, 0) + 1
+        return counts
+
+    def __weigh(self, counts: dict) -> dict:
+        # Sublinear term frequency times inverse document frequency, normalised
+        number_of_documents = len(self.__movie_ids)
+        max_df = max(2, int(self.__max_df_ratio * number_of_documents))
+        vector = dict()
+        for term, count in counts.items():
+            df = self.__document_frequencies[term]
+            if 1 < df <= max_df:
+                vector[term] = (1 + log(count)) * log(number_of_documents / df)
+        norm = sqrt(sum(weight * weight for weight in vector.values()))
+        self.__norms.append(norm)
+        if norm == 0:
+            return dict()
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def __find_neighbours(self, row: int, vector: dict) -> dict:
+        # Returns the dot products with every candidate, after keeping the top n of them as row's neighbours
+        dots = dict()
+        for term, weight in vector.items():
+            rows, weights = self.__postings[term]
+            for other, other_weight in zip(rows, weights):
+                if other != row:
+                    dots[other] = dots.get(other, 0) + weight * other_weight
+        top = heapq.nlargest(self.__n, dots, key=dots.__getitem__)
+        for i, other in enumerate(top):
+            self.__neighbours[row * self.__n + i] = self.__movie_ids[other]
+            self.__scores[row * self.__n + i] = dots[other]
+        self.__lengths[row] = len(top)
+        return dots
+
+    def __offer(self, row: int, other: int, score: float):
+        start, length = row * self.__n, self.__lengths[row]
+        i = length
+        while i > 0 and self.__scores[start + i - 1] < score:
+            i -= 1
+        if i == self.__n:
+            return
+        # Shift the less similar neighbours down a slot, dropping the last one if all n slots are taken
+        end = min(length, self.__n - 1)
+        self.__neighbours[start + i + 1:start + end + 1] = self.__neighbours[start + i:start + end]
+        self.__scores[start + i + 1:start + end + 1] = self.__scores[start + i:start + end]
+        self.__neighbours[start + i] = self.__movie_ids[other]
+        self.__scores[start + i] = score
+        self.__lengths[row] = end + 1
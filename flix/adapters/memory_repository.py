@@ -1,9 +1,15 @@
 import csv
 import os
 from bisect import insort_left
-from typing import List
-
-from flix.adapters.repository import AbstractRepository
+from typing import Iterator, List
+
+from flix.adapters.bitmap_index import BitmapIndex
+from flix.adapters.costar_graph import CoStarGraph
+from flix.adapters.data_version import DataVersion
+from flix.adapters.description_index import DescriptionIndex
+from flix.adapters.rankings import Rankings
+from flix.adapters.recommendations import Recommender
+from flix.adapters.repository import AbstractRepository, add_to_indexes, index_fields, statistics_to_dict
 from flix.domain.model import Director, Actor, Review, Genre, Movie, User
 
 
@@ -17,6 +23,14 @@ class MemoryRepository(AbstractRepository):
         self.__dataset_of_genres = list()
         self.__dataset_of_reviews = list()
         self.__movies_index = dict()
+        # Ids of __movies_index, ascending, kept sorted as movies are added
+        self.__movie_ids = list()
+        self.__bitmap_index = None
+        self.__recommender = Recommender()
+        self.__description_index = None
+        self.__costar_graph = None
+        self.__rankings = None
+        self.__data_version = DataVersion()
 
     def add_user(self, user: User):
         if user not in self.__dataset_of_users:
@@ -30,7 +44,13 @@ class MemoryRepository(AbstractRepository):
     def add_movie(self, movie: Movie):
         if movie not in self.__dataset_of_movies:
             insort_left(self.__dataset_of_movies, movie)
+            if movie.id not in self.__movies_index:
+                insort_left(self.__movie_ids, movie.id)
             self.__movies_index[movie.id] = movie
+            if not add_to_indexes(movie, self.__bitmap_index, self.__rankings, self.__costar_graph,
+                                  self.__description_index):
+                self.__bitmap_index = None
+            self.__data_version.changed('catalog')
 
     def get_movie(self, movie_id: int) -> Movie:
         movie = None
@@ -41,6 +61,10 @@ class MemoryRepository(AbstractRepository):
 
         return movie
 
+    def iter_movies(self) -> Iterator[Movie]:
+        for movie_id in self.__movie_ids:
+            yield self.__movies_index[movie_id]
+
     def get_movies_by_letter(self, target_letter) -> List[Movie]:
         ret_list = []
         for movie in self.__dataset_of_movies:
@@ -120,6 +144,8 @@ class MemoryRepository(AbstractRepository):
         for movie in self.__dataset_of_movies:
             if genre in movie.genres:
                 genre_match.append(movie.id)
+        # Ordered by id, matching the database repository
+        genre_match.sort()
         return genre_match
 
     def add_genre(self, genre: Genre):
@@ -133,6 +159,7 @@ class MemoryRepository(AbstractRepository):
         super().add_review(review)
         if review not in self.__dataset_of_reviews:
             self.__dataset_of_reviews.append(review)
+            self.__data_version.changed('reviews')
 
     def get_reviews(self) -> List[Review]:
         return self.__dataset_of_reviews
@@ -167,6 +194,7 @@ class MemoryRepository(AbstractRepository):
                 for movie in self.__dataset_of_movies:
                     if movie.id == movie_id:
                         user.add_to_watchlist(movie)
+                        self.__data_version.changed('watchlists')
 
     def remove_from_watchlist(self, username: str, movie_id: int):
         for user in self.__dataset_of_users:
@@ -174,6 +202,89 @@ class MemoryRepository(AbstractRepository):
                 for movie in self.__dataset_of_movies:
                     if movie.id == movie_id:
                         user.remove_from_watchlist(movie)
+                        self.__data_version.changed('watchlists')
+
+    def get_number_of_reviews(self) -> int:
+        return len(self.__dataset_of_reviews)
+
+    def get_number_of_users(self) -> int:
+        return len(self.__dataset_of_users)
+
+    def get_movie_statistics(self, group_by: str) -> List[dict]:
+        group_keys = {
+            'genre': lambda movie: [genre.genre_name for genre in movie.genres],
+            'year': lambda movie: [movie.year],
+            'decade': lambda movie: [movie.year - movie.year % 10] if movie.year is not None else [],
+            'director': lambda movie: [movie.director.director_full_name] if movie.director is not None else []
+        }[group_by]
+
+        # Per group: number of movies, then a [total, count] pair for each of runtime, rating and revenue
+        groups = dict()
+        for movie in self.__dataset_of_movies:
+            values = (movie.runtime_minutes, movie.rating, movie.revenue)
+            for key in group_keys(movie):
+                group = groups.get(key)
+                if group is None:
+                    group = groups[key] = [0, [0, 0], [0, 0], [0, 0]]
+                group[0] += 1
+                for total, value in zip(group[1:], values):
+                    if value is not None:
+                        total[0] += value
+                        total[1] += 1
+
+        statistics = list()
+        for key in sorted(groups):
+            number_of_movies, runtime, rating, revenue = groups[key]
+            averages = [total / count if count > 0 else None for total, count in (runtime, rating, revenue)]
+            statistics.append(statistics_to_dict(key, number_of_movies, *averages))
+        return statistics
+
+    def get_review_activity(self) -> List[dict]:
+        activity = dict()
+        for review in self.__dataset_of_reviews:
+            date = review.timestamp.date().isoformat()
+            activity[date] = activity.get(date, 0) + 1
+        return [{'date': date, 'reviews': activity[date]} for date in sorted(activity)]
+
+    def get_data_version(self) -> DataVersion:
+        return self.__data_version
+
+    def get_bitmap_index(self) -> BitmapIndex:
+        if self.__bitmap_index is None:
+            self.build_bitmap_index()
+        return self.__bitmap_index
+
+    def get_recommender(self) -> Recommender:
+        index = self.get_bitmap_index()
+        if self.__recommender.index is not index or len(self.__recommender) < len(index):
+            self.__recommender.refresh(index)
+        return self.__recommender
+
+    def get_description_index(self) -> DescriptionIndex:
+        if self.__description_index is None:
+            movies = [movie for movie in self.__dataset_of_movies if movie.id is not None]
+            self.__description_index = DescriptionIndex((movie.id, movie.description) for movie in movies)
+        return self.__description_index
+
+    def get_costar_graph(self) -> CoStarGraph:
+        index = self.get_bitmap_index()
+        if self.__costar_graph is None or self.__costar_graph.index is not index:
+            self.__costar_graph = CoStarGraph(index)
+        return self.__costar_graph
+
+    def get_rankings(self) -> Rankings:
+        index = self.get_bitmap_index()
+        if self.__rankings is None or self.__rankings.index is not index:
+            metrics = [(movie.id, movie.rating, movie.votes, movie.revenue) for movie in self.__dataset_of_movies]
+            self.__rankings = Rankings(index, metrics)
+        return self.__rankings
+
+    def build_bitmap_index(self):
+        index = BitmapIndex()
+        movies = [movie for movie in self.__dataset_of_movies if movie.id is not None]
+        for movie in sorted(movies, key=lambda movie: movie.id):
+            index.add_movie(movie.id, *index_fields(movie))
+        self.__bitmap_index = index
 
     def read_csv_file(self, file_name):
         with open(file_name, mode='r', encoding='utf-8-sig') as csvfile:
@@ -184,7 +295,6 @@ class MemoryRepository(AbstractRepository):
                 title = row['Title']
                 release_year = int(row['Year'])
                 movie = Movie(title, release_year, id)
-                self.add_movie(movie)
                 actors = row["Actors"]
                 actors = actors.split(",")
                 for actor in actors:
@@ -209,7 +319,18 @@ class MemoryRepository(AbstractRepository):
 
                 movie.description = row["Description"]
                 movie.runtime_minutes = int(row["Runtime (Minutes)"])
+                movie.rating = float(row["Rating"])
+                movie.votes = int(row["Votes"])
+                if row["Revenue (Millions)"] != "N/A":
+                    movie.revenue = float(row["Revenue (Millions)"])
+                # Added once complete, so the indexes built so far take in all of it
+                self.add_movie(movie)
 
 
 def populate(data_path: str, repo: MemoryRepository):
     repo.read_csv_file(os.path.join(data_path, 'movies.csv'))
+    repo.build_bitmap_index()
+    repo.get_recommender()
+    repo.get_description_index()
+    repo.get_costar_graph()
+    repo.get_rankings()
@@ -0,0 +1,136 @@
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Tuple
+
+
+def normalise_name(name: str) -> str:
+    """Returns name case-folded, with accents removed and whitespace trimmed and collapsed"""
+    name = unicodedata.normalize('NFKD', name)
+    name = ''.join(character for character in name if not unicodedata.combining(character))
+    return ' '.join(name.casefold().split())
+
+
+def trigrams(normalised: str) -> set:
+    padded = f"  {normalised} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class NameIndex:
+    """Prefix and typo-tolerant index over names of several kinds (e.g. 'actor', 'director', 'genre').
+
+    Prefix matches come from sorted lists of normalised keys per kind, one of full names and one of their trailing
+    word sequences (so "pra" finds "Chris Pratt"). Fuzzy matches rank names by the share of trigrams they have in
+    common with the query. Names that normalise to the same key (e.g. "José" and "Jose") are kept apart."""
+
+    def __init__(self, names: Dict[str, Iterable[str]]):
+        self.__names = list()
+        self.__exact = dict()
+        # {kind: ([(key, position)] of name starts, [(key, position)] of later words)}, each sorted
+        self.__keys = dict()
+        trigram_postings = dict()
+
+        for kind, kind_names in names.items():
+            starts, later_words = self.__keys.setdefault(kind, (list(), list()))
+            for name in kind_names:
+                name = name.strip()
+                normalised = normalise_name(name)
+                if normalised == "" or any(self.__names[position][1] == name
+                                           for position in self.__exact.get((kind, normalised), ())):
+                    continue
+                position = len(self.__names)
+                self.__names.append((kind, name, normalised, len(trigrams(normalised))))
+                self.__exact.setdefault((kind, normalised), list()).append(position)
+
+                words = normalised.split(' ')
+                starts.append((normalised, position))
+                for i in range(1, len(words)):
+                    later_words.append((' '.join(words[i:]), position))
+                for trigram in trigrams(normalised):
+                    trigram_postings.setdefault(trigram, list()).append(position)
+
+        for starts, later_words in self.__keys.values():
+            starts.sort()
+            later_words.sort()
+        self.__trigrams = trigram_postings
+
+    def __len__(self):
+        return len(self.__names)
+
+    def lookup(self, name: str, kind: str):
+        """Returns the stored name equal to name once both are normalised, or None. Where several stored names
+        normalise alike, the one spelt exactly as name is preferred, else the first added"""
+        positions = self.__exact.get((kind, normalise_name(name)))
+        if positions is None:
+            return None
+        for position in positions:
+            if self.__names[position][1] == name.strip():
+                return name.strip()
+        return self.__names[positions[0]][1]
+
+    def resolve(self, name: str, kind: str, min_score: float = 0.6):
+        """Returns the stored name matching name exactly once normalised, else the closest fuzzy match scoring at
+        least min_score, else None"""
+        match = self.lookup(name, kind)
+        if match is None:
+            fuzzy = self.fuzzy(name, limit=1, kinds=[kind], min_score=min_score)
+            if fuzzy:
+                match = fuzzy[0][1]
+        return match
+
+    def prefix(self, query: str, limit: int = 10, kinds: Iterable[str] = None) -> List[Tuple[str, str]]:
+        """Returns up to limit (kind, name) pairs with a word starting with query, names starting with it first and
+        then in order of the matched words"""
+        query = normalise_name(query)
+        if query == "" or limit <= 0:
+            return []
+
+        matches = dict()
+        for kind, (starts, later_words) in self.__keys.items():
+            if kinds is not None and kind not in kinds:
+                continue
+            # The keys are sorted, so the first limit distinct names from each list are the best of that list
+            for rank, keys in enumerate((starts, later_words)):
+                found = 0
+                for i in range(bisect_left(keys, (query,)), len(keys)):
+                    key, position = keys[i]
+                    if not key.startswith(query) or found >= limit:
+                        break
+                    if position not in matches:
+                        matches[position] = (rank, key, self.__names[position][1], kind)
+                        found += 1
+        ranked = sorted(matches.values())[:limit]
+        return [(kind, name) for rank, key, name, kind in ranked]
+
+    def fuzzy(self, query: str, limit: int = 10, kinds: Iterable[str] = None,
+              min_score: float = 0.4) -> List[Tuple[str, str]]:
+        """Returns up to limit (kind, name) pairs most similar to query, by Dice coefficient over trigrams"""
+        query_trigrams = trigrams(normalise_name(query))
+        if limit <= 0 or len(query_trigrams) == 0:
+            return []
+
+        shared = dict()
+        for trigram in query_trigrams:
+            for position in self.__trigrams.get(trigram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        scored = list()
+        for position, count in shared.items():
+            kind, name, normalised, number_of_trigrams = self.__names[position]
+            if kinds is not None and kind not in kinds:
+                continue
+            score = 2 * count / (len(query_trigrams) + number_of_trigrams)
+            if score >= min_score:
+                scored.append((-score, name, kind))
+        scored.sort()
+        return [(kind, name) for score, name, kind in scored[:limit]]
+
+    def complete(self, query: str, limit: int = 10, kinds: Iterable[str] = None) -> List[Tuple[str, str]]:
+        """Returns prefix matches for query, topped up with fuzzy matches when there are fewer than limit"""
+        matches = self.prefix(query, limit, kinds)
+        if len(matches) < limit:
+            for match in self.fuzzy(query, limit, kinds):
+                if match not in matches:
+                    matches.append(match)
+                if len(matches) >= limit:
+                    break
+        return matches
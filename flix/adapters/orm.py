@@ -1,5 +1,5 @@
 from sqlalchemy import (
-    Table, MetaData, Column, Integer, String, Date, DateTime,
+    Table, MetaData, Column, Integer, String, Date, DateTime, Float,
     ForeignKey
 )
 from sqlalchemy.orm import mapper, relationship
@@ -8,6 +8,10 @@ from flix.domain import model
 
 metadata = MetaData()
 
+# Version of the tables below, stamped into the schema_version table when a database is populated. Bump it whenever
+# the tables change, so databases made for the old tables are migrated instead of used as they are
+SCHEMA_VERSION = 2
+
 users = Table(
     'users', metadata,
     Column('id', Integer, primary_key=True, autoincrement=True),
@@ -32,7 +36,10 @@ movies = Table('movies', metadata,
                Column('description', String(1024), nullable=False),
                Column('director_id', Integer, ForeignKey("directors.id")),
                Column('runtime', Integer, nullable=False),
-               Column('first_letter', String(255), nullable=False)
+               Column('first_letter', String(255), nullable=False),
+               Column('rating', Float),
+               Column('votes', Integer),
+               Column('revenue', Float)
                )
 
 genres = Table('genres', metadata,
@@ -67,6 +74,20 @@ user_movies = Table('watchlist_movies', metadata,
                     Column('user_id', Integer, ForeignKey('users.id'))
                     )
 
+schema_version = Table('schema_version', metadata,
+                       Column('version', Integer, nullable=False)
+                       )
+
+# One row of DataVersion counters, changed in the same transaction as the data they count, so that processes sharing
+# the database agree on what has changed
+version_counters = Table('version_counters', metadata,
+                         Column('origin', String(255), nullable=False),
+                         Column('catalog', Integer, nullable=False),
+                         Column('reviews', Integer, nullable=False),
+                         Column('watchlists', Integer, nullable=False),
+                         Column('last_modified', DateTime, nullable=False)
+                         )
+
 
 def map_model_to_tables():
     mapper(model.Review, reviews, properties={
@@ -81,6 +102,9 @@ def map_model_to_tables():
         '_description': movies.c.description,
         '_runtime_minutes': movies.c.runtime,
         '_first_letter': movies.c.first_letter,
+        '_rating': movies.c.rating,
+        '_votes': movies.c.votes,
+        '_revenue': movies.c.revenue,
         '_reviews': relationship(model.Review, backref='_movie')
     })
 
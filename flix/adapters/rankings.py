@@ -0,0 +1,113 @@
+import heapq
+from array import array
+from typing import Iterable, List, Tuple
+
+from flix.adapters.bitmap_index import BitmapIndex
+from flix.adapters.cache import LRUCache
+
+
+class Rankings:
+    """Movies ranked by rating, votes or revenue, overall or within a genre or year.
+
+    Metrics are held in columnar arrays aligned with the rows of a BitmapIndex. The overall ranking for each
+    metric is a precomputed permutation of rows; rankings within a genre or year take the top rows of that
+    genre's or year's bitmap with a partial sort, and are cached until a movie is added."""
+
+    METRICS = ('rating', 'votes', 'revenue')
+    # Types values are returned as; every metric is stored as a double
+    TYPES = {'rating': float, 'votes': int, 'revenue': float}
+
+    def __init__(self, index: BitmapIndex, metrics: Iterable[Tuple[int, float, int, float]],
+                 cache_size: int = 256):
+        self.__index = index
+        self.__columns = {metric: array('d', [0.0]) * len(index) for metric in Rankings.METRICS}
+        self.__known = {metric: bytearray(len(index)) for metric in Rankings.METRICS}
+        for movie_id, rating, votes, revenue in metrics:
+            row = index.row(movie_id)
+            if row is None:
+                continue
+            for metric, value in zip(Rankings.METRICS, (rating, votes, revenue)):
+                if value is not None:
+                    self.__columns[metric][row] = value
+                    self.__known[metric][row] = 1
+
+        # Highest first, ties broken by ascending movie id so pages are stable
+        self.__permutations = dict()
+        for metric in Rankings.METRICS:
+            column, known = self.__columns[metric], self.__known[metric]
+            rows = [row for row in range(len(index)) if known[row]]
+            rows.sort(key=lambda row: self.__rank_key(metric, row))
+            self.__permutations[metric] = array('l', rows)
+
+        self.__cache = LRUCache(cache_size)
+
+    def __rank_key(self, metric: str, row: int):
+        return -self.__columns[metric][row], self.__index.movie_id(row)
+
+    def add_movie(self, movie_id: int, rating: float, votes: int, revenue: float):
+        """Ranks a movie just appended to the index, inserting it into each overall ranking by binary search"""
+        row = self.__index.row(movie_id)
+        for metric, value in zip(Rankings.METRICS, (rating, votes, revenue)):
+            column, known = self.__columns[metric], self.__known[metric]
+            while len(column) <= row:
+                column.append(0.0)
+                known.append(0)
+            if value is None:
+                continue
+            column[row] = value
+            known[row] = 1
+            permutation = self.__permutations[metric]
+            key = self.__rank_key(metric, row)
+            lo, hi = 0, len(permutation)
+            while lo < hi:
+                middle = (lo + hi) // 2
+                if self.__rank_key(metric, permutation[middle]) < key:
+                    lo = middle + 1
+                else:
+                    hi = middle
+            permutation.insert(lo, row)
+        self.__cache.clear()
+
+    @property
+    def index(self) -> BitmapIndex:
+        """The BitmapIndex the rankings are aligned with"""
+        return self.__index
+
+    def stats(self) -> dict:
+        return self.__cache.stats()
+
+    def top(self, metric: str, cursor: int = 0, limit: int = 10, genre: str = None,
+            year: int = None) -> List[Tuple[int, object]]:
+        """Returns (movie id, value) pairs ranked by metric, highest first, skipping the first cursor movies.
+
+        Movies without a value for metric (e.g. unknown revenue) are left out."""
+        if metric not in Rankings.METRICS:
+            raise ValueError(f"Unknown metric {metric}")
+        if cursor < 0 or limit <= 0:
+            return []
+
+        column = self.__columns[metric]
+        if genre is None and year is None:
+            rows = self.__permutations[metric][cursor:cursor + limit]
+        else:
+            key = (metric, genre, year, cursor + limit)
+            rows = self.__cache.get(key)
+            if rows is None:
+                rows = self.__top_rows(metric, cursor + limit, genre, year)
+                self.__cache.put(key, rows)
+            rows = rows[cursor:]
+        value_type = Rankings.TYPES[metric]
+        return [(self.__index.movie_id(row), value_type(column[row])) for row in rows]
+
+    def __top_rows(self, metric: str, number: int, genre: str, year: int) -> array:
+        bits = self.__index.all_rows()
+        if genre is not None:
+            bits &= self.__index.bitmap('genre', genre)
+        if year is not None:
+            bits &= self.__index.bitmap('year', year)
+
+        column, known = self.__columns[metric], self.__known[metric]
+        index = self.__index
+        rows = heapq.nsmallest(number, (row for row in index.rows(bits) if known[row]),
+                               key=lambda row: (-column[row], index.movie_id(row)))
+        return array('l', rows)
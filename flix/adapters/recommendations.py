@@ -0,0 +1,125 @@
+import heapq
+from array import array
+from math import sqrt
+from threading import Lock
+from typing import List
+
+from flix.adapters.bitmap_index import BitmapIndex
+
+
+class Recommender:
+    """Precomputed top-k most similar movies for every movie in a BitmapIndex.
+
+    Each movie is a sparse binary vector over its actors, director and genres, weighted by field, and movies are
+    compared by cosine similarity. Candidates come from inverted lists of the movies sharing each feature, so no
+    pair of movies without a feature in common is ever compared. Features shared by very many movies (broad
+    genres) only refine the scores of candidates found through rarer ones. Neighbours are kept as compact arrays
+    of movie ids, most similar first. Refreshes are serialised, so concurrent requests can share one Recommender."""
+
+    WEIGHTS = {'director': 3.0, 'actor': 2.0, 'genre': 1.0}
+    MAX_POSTING_LENGTH = 200
+
+    def __init__(self, k: int = 10):
+        self.__k = k
+        self.__index = None
+        self.__features = dict()
+        self.__norms = dict()
+        self.__postings = dict()
+        self.__neighbours = dict()
+        self.__scores = dict()
+        self.__lock = Lock()
+
+    @property
+    def index(self) -> BitmapIndex:
+        """The BitmapIndex the recommendations were last refreshed from"""
+        return self.__index
+
+    def __len__(self):
+        return len(self.__neighbours)
+
+    def refresh(self, index: BitmapIndex):
+        """Brings the recommendations up to date with index.
+
+        Only movies not seen before are scored; their scores are offered to the neighbour lists of the existing
+        movies they are similar to, so adding a few movies doesn't recompute the whole catalog. When a feature
+        becomes too broad to find candidates through, the movies that have it are rescored. Movies appended to the
+        index refreshed from last are found without scanning the rows before them."""
+        with self.__lock:
+            new_movie_ids = list()
+            broadened = list()
+            start = len(self.__neighbours) if index is self.__index else 0
+            for row in range(start, len(index)):
+                movie_id = index.movie_id(row)
+                if movie_id in self.__features:
+                    continue
+                features = tuple((field, key) for field in Recommender.WEIGHTS for key in index.values(field, row))
+                self.__features[movie_id] = features
+                self.__norms[movie_id] = sqrt(sum(Recommender.WEIGHTS[field] ** 2 for field, key in features))
+                for feature in features:
+                    posting = self.__postings.setdefault(feature, list())
+                    posting.append(movie_id)
+                    if len(posting) == Recommender.MAX_POSTING_LENGTH + 1:
+                        broadened.append(feature)
+                new_movie_ids.append(movie_id)
+
+            # Movies scored while a feature was still specific found candidates through it that they no longer would
+            new_movies = set(new_movie_ids)
+            rescored = {movie_id for feature in broadened for movie_id in self.__postings[feature]} - new_movies
+            for movie_id in new_movie_ids + sorted(rescored):
+                scores = self.__score(movie_id)
+                top = heapq.nlargest(self.__k, scores.items(), key=lambda item: (item[1], -item[0]))
+                self.__neighbours[movie_id] = array('l', [other for other, score in top])
+                self.__scores[movie_id] = array('d', [score for other, score in top])
+                if movie_id in new_movies:
+                    for other, score in scores.items():
+                        if other not in new_movies and other not in rescored:
+                            self.__offer(other, movie_id, score)
+
+            self.__index = index
+
+    def similar(self, movie_id: int, limit: int = None) -> List[int]:
+        """Returns the ids of the movies most similar to movie_id, most similar first"""
+        neighbours = self.__neighbours.get(movie_id, ())
+        if limit is not None:
+            neighbours = neighbours[:limit]
+        return list(neighbours)
+
+    def __score(self, movie_id: int) -> dict:
+        norm = self.__norms[movie_id]
+        if norm == 0:
+            return dict()
+
+        dots = dict()
+        broad_features = list()
+        for feature in self.__features[movie_id]:
+            posting = self.__postings[feature]
+            if len(posting) > Recommender.MAX_POSTING_LENGTH:
+                broad_features.append(feature)
+                continue
+            weight = Recommender.WEIGHTS[feature[0]] ** 2
+            for other in posting:
+                if other != movie_id:
+                    dots[other] = dots.get(other, 0) + weight
+
+        if broad_features:
+            if len(dots) < self.__k:
+                # Too few specific matches, so take a bounded number of movies sharing the narrowest broad feature
+                narrowest = min((self.__postings[feature] for feature in broad_features), key=len)
+                for other in narrowest[:Recommender.MAX_POSTING_LENGTH]:
+                    if other != movie_id:
+                        dots.setdefault(other, 0)
+            broad_features = set(broad_features)
+            for other in dots:
+                for feature in self.__features[other]:
+                    if feature in broad_features:
+                        dots[other] += Recommender.WEIGHTS[feature[0]] ** 2
+
+        return {other: dot / (norm * self.__norms[other]) for other, dot in dots.items() if dot > 0}
+
+    def __offer(self, movie_id: int, other: int, score: float):
+        neighbours = list(zip(self.__neighbours[movie_id], self.__scores[movie_id]))
+        neighbours.append((other, score))
+        neighbours.sort(key=lambda item: (-item[1], item[0]))
+        neighbours = neighbours[:self.__k]
+        self.__neighbours[movie_id] = array('l', [neighbour for neighbour, score in neighbours])
+        self.__scores[movie_id] = array('d', [score for neighbour, score in neighbours])
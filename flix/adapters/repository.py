@@ -1,11 +1,61 @@
 import abc
-from typing import List
-
+from typing import Iterator, List
+
+from flix.adapters.bitmap_index import BitmapIndex
+from flix.adapters.costar_graph import CoStarGraph
+from flix.adapters.data_version import DataVersion
+from flix.adapters.description_index import DescriptionIndex
+from flix.adapters.rankings import Rankings
+from flix.adapters.recommendations import Recommender
 from flix.domain.model import User, Movie, Genre, Review, Actor, Director
 
 repo_instance = None
 
 
+def statistics_to_dict(key, number_of_movies: int, average_runtime, average_rating, average_revenue) -> dict:
+    def rounded(average):
+        return round(average, 2) if average is not None else None
+
+    return {
+        'key': key,
+        'movies': number_of_movies,
+        'average_runtime': rounded(average_runtime),
+        'average_rating': rounded(average_rating),
+        'average_revenue': rounded(average_revenue)
+    }
+
+
+def index_fields(movie: Movie) -> tuple:
+    """Returns the genres, actors, director and year BitmapIndex.add_movie takes for movie"""
+    director = movie.director.director_full_name if movie.director is not None else None
+    return ([genre.genre_name for genre in movie.genres], [actor.actor_full_name for actor in movie.actors],
+            director, movie.year)
+
+
+def add_to_indexes(movie: Movie, index: BitmapIndex, rankings: Rankings, costar_graph: CoStarGraph,
+                   description_index: DescriptionIndex) -> bool:
+    """Adds a new movie to the indexes built so far (any of which may be None), rather than having them rebuilt.
+
+    Rows of a BitmapIndex follow ascending movie id, so the movie can only be appended to it, and to the Rankings
+    and CoStarGraph over it, when its id is above every indexed one. Otherwise those are left as they are and
+    False is returned: the caller drops the BitmapIndex to have them all rebuilt."""
+    if movie.id is None:
+        return True
+    if description_index is not None:
+        description_index.add_movie(movie.id, movie.description)
+    if index is None:
+        return True
+    if len(index) > 0 and movie.id <= index.movie_id(len(index) - 1):
+        return False
+    genres, actors, director, year = index_fields(movie)
+    index.add_movie(movie.id, genres, actors, director, year)
+    if rankings is not None and rankings.index is index:
+        rankings.add_movie(movie.id, movie.rating, movie.votes, movie.revenue)
+    if costar_graph is not None and costar_graph.index is index:
+        costar_graph.add_movie(index.values('actor', index.row(movie.id)))
+    return True
+
+
 class RepositoryException(Exception):
 
     def __init__(self, message=None):
@@ -37,6 +87,10 @@ class AbstractRepository(abc.ABC):
         If there is no Movie with the given id, this method returns None."""
         raise NotImplementedError
 
+    def iter_movies(self) -> Iterator[Movie]:
+        """Yields every Movie in the repository by ascending id, without loading them all at once"""
+        raise NotImplementedError
+
     @abc.abstractmethod
     def get_movies_by_letter(self, target_letter) -> List[Movie]:
         """Returns a list of Movies that start with the letter, from the repository
@@ -168,3 +222,61 @@ class AbstractRepository(abc.ABC):
     def remove_from_watchlist(self, user: str, movie_id: int):
         """Removes movie from watchlist of user"""
         raise NotImplementedError
+
+    def get_data_version(self) -> DataVersion:
+        """Returns the DataVersion counting changes to the Movies, Reviews and watchlists of the repository.
+
+        A repository whose data can be changed by other processes (e.g. in a shared database) returns a snapshot of
+        counters stored along with the data, which every process sees"""
+        raise NotImplementedError
+
+    def get_bitmap_index(self) -> BitmapIndex:
+        """Returns a BitmapIndex of the genres, actors, director and year of every Movie in the repository.
+
+        The index is rebuilt after Movies are added to the repository"""
+        raise NotImplementedError
+
+    def get_recommender(self) -> Recommender:
+        """Returns a Recommender holding the most similar Movies for every Movie in the repository.
+
+        Movies added to the repository are scored the next time this method is called"""
+        raise NotImplementedError
+
+    def get_description_index(self) -> DescriptionIndex:
+        """Returns a DescriptionIndex of the Movies with the most similar descriptions for every Movie.
+
+        The index is rebuilt after Movies are added to the repository"""
+        raise NotImplementedError
+
+    def get_costar_graph(self) -> CoStarGraph:
+        """Returns a CoStarGraph of the Actors who have appeared in a Movie together.
+
+        The graph is rebuilt after Movies are added to the repository"""
+        raise NotImplementedError
+
+    def get_rankings(self) -> Rankings:
+        """Returns Rankings of the Movies in the repository by rating, votes and revenue.
+
+        The rankings are rebuilt after Movies are added to the repository"""
+        raise NotImplementedError
+
+    def get_number_of_reviews(self) -> int:
+        """Returns the number of Reviews in the repository"""
+        raise NotImplementedError
+
+    def get_number_of_users(self) -> int:
+        """Returns the number of Users in the repository"""
+        raise NotImplementedError
+
+    def get_movie_statistics(self, group_by: str) -> List[dict]:
+        """Returns the number of Movies and their average runtime, rating and revenue for each group.
+
+        group_by is one of 'genre', 'year', 'decade' or 'director'. Each group is a dict with keys 'key', 'movies',
+        'average_runtime', 'average_rating' and 'average_revenue', and groups are ordered by key. Movies without a
+        value (e.g. unknown revenue) are left out of that average, which is None if no Movie in the group has one."""
+        raise NotImplementedError
+
+    def get_review_activity(self) -> List[dict]:
+        """Returns the number of Reviews made on each day, as dicts with keys 'date' (ISO format) and 'reviews',
+        ordered by date"""
+        raise NotImplementedError
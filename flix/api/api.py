@@ -0,0 +1,180 @@
+from flask import Blueprint, request, session, jsonify
+
+from flix.adapters import repository as repo
+from flix.movies import services
+
+api_blueprint = Blueprint('api_bp', __name__, url_prefix='/api/v1')
+
+# Page size used when a request doesn't give one, and the largest page a client can ask for
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+
+def page_size():
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def page(items: list, limit: int, key=None):
+    # Lists are fetched with one item more than the page size, which tells whether there is a next page without
+    # counting. The next cursor is the key of the last item on the page.
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    next_cursor = items[-1] if key is None else key(items[-1])
+    return items, next_cursor
+
+
+def movie_page(movie_ids: list, limit: int, **fields):
+    movie_ids, next_cursor = page(movie_ids, limit)
+    movies = services.get_movie_summaries(movie_ids, repo.repo_instance)
+    return jsonify(movies=movies, next_cursor=next_cursor, **fields)
+
+
+def not_found(message: str):
+    return jsonify(error=message), 404
+
+
+def unknown_cursor(cursor):
+    # A stale cursor can't be resumed from, and starting over would send clients through the same pages again
+    return jsonify(error='Unknown cursor ' + str(cursor)), 400
+
+
+@api_blueprint.route('/movies', methods=['GET'])
+def movies():
+    after = request.args.get('cursor', type=int)
+    limit = page_size()
+    movie_ids = services.get_movie_ids(repo.repo_instance, after, limit + 1)
+    return movie_page(movie_ids, limit)
+
+
+@api_blueprint.route('/movies/<int:movie_id>', methods=['GET'])
+def movie(movie_id: int):
+    try:
+        return jsonify(services.get_movie_detail(movie_id, repo.repo_instance))
+    except services.NonExistentMovieException:
+        return not_found('No movie with id ' + str(movie_id))
+
+
+@api_blueprint.route('/movies/<int:movie_id>/reviews', methods=['GET'])
+def reviews(movie_id: int):
+    # Reviews are only ever appended, so the number already seen is a stable cursor
+    cursor = max(0, request.args.get('cursor', 0, type=int))
+    limit = page_size()
+    try:
+        movie_reviews = services.get_reviews_for_movie(movie_id, repo.repo_instance)
+    except services.NonExistentMovieException:
+        return not_found('No movie with id ' + str(movie_id))
+
+    next_cursor = None
+    if cursor + limit < len(movie_reviews):
+        next_cursor = cursor + limit
+    return jsonify(reviews=movie_reviews[cursor:cursor + limit], next_cursor=next_cursor)
+
+
+@api_blueprint.route('/search', methods=['GET'])
+def search():
+    filters = dict()
+    for field in ('genre', 'actor', 'director'):
+        values = request.args.getlist(field)
+        if values:
+            filters[field] = values[0] if len(values) == 1 else values
+    years = request.args.getlist('year', type=int)
+    if years:
+        filters['year'] = years[0] if len(years) == 1 else years
+
+    after = request.args.get('cursor', type=int)
+    limit = page_size()
+    movie_ids, count = services.search_movies(filters, repo.repo_instance, limit=limit + 1, after=after)
+    return movie_page(movie_ids, limit, count=count)
+
+
+@api_blueprint.route('/letters', methods=['GET'])
+def letters():
+    return jsonify(letters=services.alphabet(repo.repo_instance))
+
+
+@api_blueprint.route('/letters/<letter>', methods=['GET'])
+def movies_by_letter(letter: str):
+    after = request.args.get('cursor', type=int)
+    limit = page_size()
+    try:
+        movie_ids = services.get_movie_ids_by_letter(letter, repo.repo_instance, after, limit + 1)
+    except services.UnknownCursorException:
+        return unknown_cursor(after)
+    return movie_page(movie_ids, limit, letter=letter)
+
+
+def names(kind: str):
+    prefix = request.args.get('prefix')
+    after = request.args.get('cursor')
+    limit = page_size()
+    matches = services.get_names(kind, repo.repo_instance, prefix, after, limit + 1)
+    matches, next_cursor = page(matches, limit)
+    return jsonify(names=matches, next_cursor=next_cursor)
+
+
+def person(fullname: str, found):
+    if found is None:
+        return not_found('No one called ' + fullname)
+    after = request.args.get('cursor', 0, type=int)
+    limit = page_size()
+    movie_ids = [movie_id for movie_id in found['movies'] if movie_id > after][:limit + 1]
+    return movie_page(movie_ids, limit, fullname=found['fullname'], number_of_movies=len(found['movies']))
+
+
+@api_blueprint.route('/actors', methods=['GET'])
+def actors():
+    return names('actor')
+
+
+@api_blueprint.route('/actors/<path:fullname>', methods=['GET'])
+def actor(fullname: str):
+    return person(fullname, services.get_actor(fullname, repo.repo_instance))
+
+
+@api_blueprint.route('/directors', methods=['GET'])
+def directors():
+    return names('director')
+
+
+@api_blueprint.route('/directors/<path:fullname>', methods=['GET'])
+def director(fullname: str):
+    return person(fullname, services.get_director(fullname, repo.repo_instance))
+
+
+@api_blueprint.route('/watchlist', methods=['GET'])
+def watchlist():
+    user_watchlist = services.get_watchlist(repo.repo_instance)
+    if user_watchlist is None:
+        return jsonify(error='Log in to see your watchlist'), 401
+
+    # Keyset on the last movie seen, in watchlist order
+    after = request.args.get('cursor', type=int)
+    limit = page_size()
+    movies = list(user_watchlist)
+    start = 0
+    if after is not None:
+        position = user_watchlist.position(after)
+        if position is None:
+            return unknown_cursor(after)
+        start = position + 1
+    movies, next_cursor = page(movies[start:start + limit + 1], limit, key=lambda movie_dict: movie_dict['id'])
+    return jsonify(movies=movies, next_cursor=next_cursor)
+
+
+@api_blueprint.route('/watchlist/<int:movie_id>', methods=['PUT', 'DELETE'])
+def change_watchlist(movie_id: int):
+    if 'username' not in session:
+        return jsonify(error='Log in to change your watchlist'), 401
+    try:
+        services.get_movie(movie_id, repo.repo_instance)
+    except services.NonExistentMovieException:
+        return not_found('No movie with id ' + str(movie_id))
+
+    if request.method == 'PUT':
+        services.add_to_watchlist(movie_id, repo.repo_instance)
+    else:
+        services.remove_from_watchlist(movie_id, repo.repo_instance)
+    user_watchlist = services.get_watchlist(repo.repo_instance)
+    return jsonify(movie_id=movie_id, in_watchlist=services.movie_in_watchlist(user_watchlist, movie_id) == 1)
@@ -0,0 +1,126 @@
+import hashlib
+import mimetypes
+import os
+import posixpath
+import re
+
+from flask import Flask
+
+# Assets are named after their content, so browsers can keep them for a year without revalidating
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+CSS_URL = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def resolve_url(directory: str, url: str):
+    """Returns (path within the static folder, query and fragment) of a url in a stylesheet in directory, or None
+    for urls outside the static folder"""
+    if re.match(r'^([a-z]+:|/|#)', url):
+        return None
+    path, suffix = re.match(r'^([^?#]*)(.*)$', url).groups()
+    return posixpath.normpath(posixpath.join(directory, path)), suffix
+
+
+def missing_references(static_folder: str, stylesheet: str) -> list:
+    """Returns the files stylesheet (a path in static_folder) refers to with url(...) that aren't in static_folder"""
+    with open(os.path.join(static_folder, stylesheet), encoding='utf-8') as file:
+        css = file.read()
+    missing = list()
+    for quote, url in CSS_URL.findall(css):
+        resolved = resolve_url(posixpath.dirname(stylesheet), url)
+        if resolved is not None and not os.path.isfile(os.path.join(static_folder, resolved[0])):
+            missing.append(resolved[0])
+    return missing
+
+
+class StaticAssets:
+    """Content-hashed names for the files in a static folder, e.g. css/main.css -> css/main.0123456789ab.css.
+
+    References between files (url(...) in stylesheets) are rewritten to the hashed names as well, so a stylesheet's
+    hash changes whenever a font or image it uses changes. Rewritten stylesheets are kept in memory; other files are
+    served from disk."""
+
+    HASH_LENGTH = 12
+
+    def __init__(self, static_folder: str):
+        self.__hashed_names = dict()
+        self.__assets = dict()
+
+        filenames = list()
+        for directory, subdirectories, files in os.walk(static_folder):
+            for file in files:
+                path = os.path.relpath(os.path.join(directory, file), static_folder)
+                filenames.append(path.replace(os.sep, '/'))
+
+        # Stylesheets last, so the files they refer to already have hashed names
+        filenames.sort(key=lambda filename: (filename.endswith('.css'), filename))
+        for filename in filenames:
+            with open(os.path.join(static_folder, filename), 'rb') as file:
+                content = file.read()
+            if filename.endswith('.css'):
+                content = self.__rewrite_urls(filename, content.decode('utf-8')).encode('utf-8')
+                self.__add(filename, content, content)
+            else:
+                self.__add(filename, content, None)
+
+    def __len__(self):
+        return len(self.__assets)
+
+    def __add(self, filename: str, content: bytes, kept_content):
+        digest = hashlib.sha256(content).hexdigest()[:StaticAssets.HASH_LENGTH]
+        root, extension = posixpath.splitext(filename)
+        hashed_name = f"{root}.{digest}{extension}"
+        self.__hashed_names[filename] = hashed_name
+        self.__assets[hashed_name] = (filename, kept_content)
+
+    def __rewrite_urls(self, filename: str, css: str) -> str:
+        directory = posixpath.dirname(filename)
+
+        def rewrite(match):
+            quote, url = match.group(1), match.group(2)
+            resolved = resolve_url(directory, url)
+            if resolved is None or resolved[0] not in self.__hashed_names:
+                return match.group(0)
+            target, suffix = resolved
+            hashed_url = posixpath.relpath(self.__hashed_names[target], directory or '.') + suffix
+            return f"url({quote}{hashed_url}{quote})"
+
+        return CSS_URL.sub(rewrite, css)
+
+    def hashed_name(self, filename: str) -> str:
+        """Returns the hashed name of filename, or filename itself if it isn't in the static folder"""
+        return self.__hashed_names.get(filename, filename)
+
+    def lookup(self, hashed_name: str):
+        """Returns (filename, content) of the asset with the hashed name, where content is None for files to be
+        served from disk, or None if there is no such asset"""
+        return self.__assets.get(hashed_name)
+
+
+def init_app(app: Flask) -> StaticAssets:
+    """Makes url_for('static', filename=...) give hashed names, and serves those with immutable caching"""
+    assets = StaticAssets(app.static_folder)
+    plain_static_view = app.view_functions['static']
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == 'static' and 'filename' in values:
+            values['filename'] = assets.hashed_name(values['filename'])
+
+    def hashed_static(filename):
+        asset = assets.lookup(filename)
+        if asset is None:
+            # An unhashed name (e.g. from a bookmark), served as usual
+            return plain_static_view(filename=filename)
+        original_filename, content = asset
+        if content is None:
+            response = plain_static_view(filename=original_filename)
+        else:
+            mimetype = mimetypes.guess_type(original_filename)[0] or 'application/octet-stream'
+            response = app.response_class(content, mimetype=mimetype)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.expires = None
+        return response
+
+    app.view_functions['static'] = hashed_static
+    return assets
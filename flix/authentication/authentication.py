@@ -2,7 +2,6 @@ from functools import wraps
 
 from flask import Blueprint, url_for, redirect, render_template, session
 from flask_wtf import FlaskForm
-from password_validator import PasswordValidator
 from wtforms import StringField, PasswordField, SubmitField
 from wtforms.validators import DataRequired, Length, ValidationError
 import flix.adapters.repository as repo
@@ -94,6 +93,8 @@ class PasswordValid:
         self.message = message
 
     def __call__(self, form, field):
+        # Imported on first use, to keep it out of startup
+        from password_validator import PasswordValidator
         schema = PasswordValidator()
         schema \
             .min(8) \
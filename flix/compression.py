@@ -0,0 +1,154 @@
+import gzip
+import hashlib
+import re
+import zlib
+
+from flix.adapters.cache import LRUCache
+
+# Content types worth compressing; images and fonts are already compressed
+COMPRESSIBLE_TYPES = ('text/', 'application/json', 'application/javascript', 'application/xml', 'image/svg+xml')
+
+# Suffix given to the ETag of a compressed response, which differs byte for byte from the uncompressed one
+ETAG_SUFFIX = '-gzip'
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    for coding in accept_encoding.split(','):
+        parts = [part.strip() for part in coding.split(';')]
+        if parts[0] in ('gzip', '*'):
+            for parameter in parts[1:]:
+                if parameter.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+                    return False
+            return True
+    return False
+
+
+class GzipMiddleware:
+    """WSGI middleware gzipping responses of at least min_size bytes for clients that accept it.
+
+    Streamed responses, which have no Content-Length, are compressed chunk by chunk as they are sent: each chunk is
+    flushed, so the client can render the top of the page before the rest arrives. Compressed bodies of responses with an ETag are kept in an LRU cache keyed by a hash of the body, so a page that hasn't
+    changed is not compressed again. An ETag doesn't cover everything in a body (e.g. a session's CSRF token), so
+    it isn't trusted as the key; responses that set cookies or are private to a user aren't cached at all."""
+
+    def __init__(self, app, min_size: int = 500, level: int = 6, cache_size: int = 256):
+        self.app = app
+        self.min_size = min_size
+        self.level = level
+        self.__cache = LRUCache(cache_size)
+
+    def stats(self):
+        return self.__cache.stats()
+
+    def __call__(self, environ, start_response):
+        if not accepts_gzip(environ.get('HTTP_ACCEPT_ENCODING', '')) or environ['REQUEST_METHOD'] == 'HEAD':
+            return self.app(environ, self.__vary_start_response(start_response))
+
+        # Clients revalidate compressed pages with the compressed ETag, which the app doesn't know about
+        revalidating_compressed = ETAG_SUFFIX in environ.get('HTTP_IF_NONE_MATCH', '')
+        if revalidating_compressed:
+            environ['HTTP_IF_NONE_MATCH'] = environ['HTTP_IF_NONE_MATCH'].replace(ETAG_SUFFIX + '"', '"')
+
+        captured = dict()
+
+        def capturing_start_response(status, headers, exc_info=None):
+            captured['status'] = status
+            captured['headers'] = headers
+            captured['exc_info'] = exc_info
+            # Bodies written through write() are never compressed, so the response is started right away
+            if not self.__compressible(headers):
+                captured['started'] = True
+                if revalidating_compressed and status.startswith('304'):
+                    headers = self.__compressed_etag(headers)
+                return start_response(status, self.__add_vary(headers), exc_info)
+            return self.__write_unsupported
+
+        app_iter = self.app(environ, capturing_start_response)
+        if captured.get('started'):
+            return app_iter
+        if self.__header(captured['headers'], 'Content-Length') is None:
+            headers = captured['headers'] + [('Content-Encoding', 'gzip')]
+            start_response(captured['status'], self.__add_vary(self.__compressed_etag(headers)), captured['exc_info'])
+            return self.__compress_stream(app_iter)
+
+        try:
+            body = b''.join(app_iter)
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+        headers = captured['headers']
+        key = hashlib.blake2b(body, digest_size=16).digest() if self.__cacheable(headers) else None
+        compressed = self.__cache.get(key) if key is not None else None
+        if compressed is None:
+            compressed = gzip.compress(body, self.level)
+            if key is not None:
+                self.__cache.put(key, compressed)
+
+        headers = [(name, value) for name, value in headers if name.lower() != 'content-length']
+        headers.append(('Content-Encoding', 'gzip'))
+        headers.append(('Content-Length', str(len(compressed))))
+        start_response(captured['status'], self.__add_vary(self.__compressed_etag(headers)), captured['exc_info'])
+        return [compressed]
+
+    def __compress_stream(self, app_iter):
+        # Windows bits of 16 + MAX_WBITS write a gzip header and trailer, as gzip.compress does
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        try:
+            for chunk in app_iter:
+                if chunk:
+                    yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+            yield compressor.flush()
+        finally:
+            if hasattr(app_iter, 'close'):
+                app_iter.close()
+
+    def __compressible(self, headers) -> bool:
+        # A streamed response's size isn't known up front, so it's compressed whatever its size
+        content_length = self.__header(headers, 'Content-Length')
+        content_type = self.__header(headers, 'Content-Type') or ''
+        return (content_length is None or int(content_length) >= self.min_size) and \
+            content_type.startswith(COMPRESSIBLE_TYPES) and \
+            self.__header(headers, 'Content-Encoding') is None and \
+            'no-transform' not in (self.__header(headers, 'Cache-Control') or '')
+
+    def __cacheable(self, headers) -> bool:
+        cache_control = self.__header(headers, 'Cache-Control') or ''
+        return self.__header(headers, 'ETag') is not None and self.__header(headers, 'Set-Cookie') is None and \
+            'no-store' not in cache_control and 'private' not in cache_control
+
+    @staticmethod
+    def __compressed_etag(headers):
+        return [(name, re.sub(r'"$', ETAG_SUFFIX + '"', value) if name.lower() == 'etag' else value)
+                for name, value in headers]
+
+    def __vary_start_response(self, start_response):
+        def vary_start_response(status, headers, exc_info=None):
+            return start_response(status, self.__add_vary(headers), exc_info)
+        return vary_start_response
+
+    @staticmethod
+    def __add_vary(headers):
+        # Caches must keep compressed and uncompressed copies apart
+        content_type = GzipMiddleware.__header(headers, 'Content-Type') or ''
+        if not content_type.startswith(COMPRESSIBLE_TYPES):
+            return headers
+        vary = GzipMiddleware.__header(headers, 'Vary')
+        if vary is None:
+            return headers + [('Vary', 'Accept-Encoding')]
+        if 'accept-encoding' in vary.lower():
+            return headers
+        return [(name, value) for name, value in headers if name.lower() != 'vary'] + \
+            [('Vary', vary + ', Accept-Encoding')]
+
+    @staticmethod
+    def __header(headers, name: str):
+        name = name.lower()
+        for header, value in headers:
+            if header.lower() == name:
+                return value
+        return None
+
+    @staticmethod
+    def __write_unsupported(data):
+        raise RuntimeError("GzipMiddleware doesn't support write() for compressible responses")
@@ -134,6 +134,9 @@ class Movie:
         self._actors = []
         self._genres = []
         self._runtime_minutes = None
+        self._rating = None
+        self._votes = None
+        self._revenue = None
         self._reviews = []
         self._id = movie_id
         self._watchlists = []
@@ -200,6 +203,18 @@ class Movie:
     def runtime_minutes(self) -> int:
         return self._runtime_minutes
 
+    @property
+    def rating(self) -> float:
+        return self._rating
+
+    @property
+    def votes(self) -> int:
+        return self._votes
+
+    @property
+    def revenue(self) -> float:
+        return self._revenue
+
     @property
     def reviews(self):
         return self._reviews
@@ -248,6 +263,22 @@ class Movie:
                 raise ValueError
             self._runtime_minutes = new_runtime
 
+    @rating.setter
+    def rating(self, new_rating: float):
+        if type(new_rating) in (int, float) and 0 <= new_rating <= 10:
+            self._rating = float(new_rating)
+
+    @votes.setter
+    def votes(self, new_votes: int):
+        if type(new_votes) is int and new_votes >= 0:
+            self._votes = new_votes
+
+    @revenue.setter
+    def revenue(self, new_revenue: float):
+        # Revenue is in millions, and is unknown for some movies
+        if type(new_revenue) in (int, float) and new_revenue >= 0:
+            self._revenue = float(new_revenue)
+
     @reviews.setter
     def reviews(self, new_reviews):
         if type(new_reviews) is list:
@@ -536,6 +567,9 @@ class WatchList:
     def remove_movie(self, movie: Movie):
         if movie in self._watchlist:
             movie.remove_watchlist(self._user)
+            # Once mapped to the database, removing the user from the movie's watchlists removes the movie here too
+            if movie in self._watchlist:
+                self._watchlist.remove(movie)
 
     def select_movie_to_watch(self, index: int):
         if 0 <= index < len(self._watchlist):
@@ -0,0 +1,70 @@
+from weakref import WeakKeyDictionary
+
+from flask import render_template
+from markupsafe import Markup
+
+from flix.adapters import repository as repo
+from flix.adapters.cache import LRUCache
+from flix.adapters.repository import AbstractRepository
+
+# Maximum number of rendered fragments kept per repository. Fragments are a movie card (well under 1KB) up to a page
+# of a letter (around 10 cards), so this bounds the cache to a few MB.
+FRAGMENT_CACHE_SIZE = 2048
+
+
+class FragmentCache:
+    """LRU cache of rendered HTML fragments that are the same for every user.
+
+    Fragments are keyed by name, the arguments they were rendered for and the repository's catalog version, so a
+    change to the catalog makes every older fragment unreachable; these are then evicted as the cache fills up."""
+
+    def __init__(self, max_size: int = FRAGMENT_CACHE_SIZE):
+        self.__fragments = LRUCache(max_size)
+
+    def get(self, name: str, key: tuple, version: str, render) -> Markup:
+        """Returns the fragment for name and key, calling render() to make it if it isn't cached"""
+        cache_key = (name, key, version)
+        fragment = self.__fragments.get(cache_key)
+        if fragment is None:
+            fragment = Markup(render())
+            self.__fragments.put(cache_key, fragment)
+        return fragment
+
+    def clear(self):
+        self.__fragments.clear()
+
+    def stats(self):
+        return self.__fragments.stats()
+
+
+# One fragment cache per repository
+_fragment_caches = WeakKeyDictionary()
+
+
+def get_fragment_cache(repository: AbstractRepository) -> FragmentCache:
+    cache = _fragment_caches.get(repository)
+    if cache is None:
+        cache = FragmentCache()
+        _fragment_caches[repository] = cache
+    return cache
+
+
+def fragment_cache_stats(repository: AbstractRepository):
+    return get_fragment_cache(repository).stats()
+
+
+def cached_fragment(name: str, key: tuple, render) -> Markup:
+    # Fragments only show catalog data (titles, years, cast), so they stay valid until the catalog changes
+    repository = repo.repo_instance
+    version = repository.get_data_version().tag(('catalog',))
+    return get_fragment_cache(repository).get(name, key, version, render)
+
+
+def movie_card(movie: dict) -> Markup:
+    return cached_fragment('movie_card', (movie['id'],),
+                           lambda: render_template('movies/movie_card.html', movie=movie))
+
+
+def alphabet_bar(alphabet: list) -> Markup:
+    return cached_fragment('alphabet_bar', tuple(alphabet),
+                           lambda: render_template('movies/alphabet_bar.html', alphabet=alphabet))
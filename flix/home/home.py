@@ -8,4 +8,5 @@ home_blueprint = Blueprint('home_bp', __name__)
 @home_blueprint.route('/', methods=['GET'])
 def home():
     watchlist = services.get_watchlist(repo.repo_instance)
-    return render_template("home/home.html", watchlist=watchlist)
+    top_rated = services.get_rankings('rating', repo.repo_instance, limit=5)
+    return render_template("home/home.html", watchlist=watchlist, top_rated=top_rated)
@@ -0,0 +1,55 @@
+import time
+from functools import wraps
+
+from flask import request, session, make_response
+
+from flix.adapters import repository as repo
+
+
+def page_tag(version):
+    # Pages depend on the catalog and reviews; for a logged-in user also on their name (shown in the navigation)
+    # and watchlist (shown in the sidebar)
+    if 'username' in session:
+        return version.tag() + '-' + session['username']
+    return version.tag(('catalog', 'reviews'))
+
+
+def set_cache_headers(response, etag: str, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Always revalidate, which is cheap because of the ETag. Pages differ per user, through the session cookie.
+    response.headers['Cache-Control'] = ('private' if 'username' in session else 'public') + ', no-cache'
+    response.vary.add('Cookie')
+    return response
+
+
+def conditional(unless=None, period: int = None):
+    """Decorates a GET view to answer with 304 Not Modified, without calling the view, when the client sends the
+    current ETag of the page, and to tag full responses with an ETag and Last-Modified.
+
+    unless is an optional function returning True for requests that must always reach the view (e.g. ones that
+    change data). Pages embedding a CSRF token should give a period (in seconds, shorter than the token's lifetime)
+    after which their tag changes, so that clients don't keep a page with an expired token."""
+    def decorator(view):
+        @wraps(view)
+        def conditional_view(**kwargs):
+            if request.method != 'GET' or (unless is not None and unless()):
+                return view(**kwargs)
+
+            # Fetched once, as a database repository reads it from the database
+            version = repo.repo_instance.get_data_version()
+            etag = page_tag(version)
+            if period is not None:
+                etag += '-' + str(int(time.time()) // period)
+            last_modified = version.last_modified
+            # Only the ETag is validated: Last-Modified is to the second, so it misses changes made within the same
+            # second, and it doesn't change when a user logs in or the period ends
+            if request.if_none_match.contains(etag):
+                return set_cache_headers(make_response('', 304), etag, last_modified)
+
+            response = make_response(view(**kwargs))
+            if response.status_code == 200:
+                set_cache_headers(response, etag, last_modified)
+            return response
+        return conditional_view
+    return decorator
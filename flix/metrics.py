@@ -0,0 +1,236 @@
+import time
+from bisect import bisect_left
+from functools import wraps
+from threading import Lock
+
+from flask import Flask, Response, g, request
+from sqlalchemy import event
+
+from flix.adapters import repository as repo
+from flix.timing import public_functions
+
+# Upper bounds, in seconds, of the latency histogram buckets
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+REPOSITORY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values) -> str:
+    if not names:
+        return ''
+    return '{' + ','.join(f'{name}="{escape(value)}"' for name, value in zip(names, values)) + '}'
+
+
+def format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.__values = dict()
+        self.__lock = Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        with self.__lock:
+            self.__values[key] = self.__values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self.__values.get(tuple(labels[name] for name in self.labels), 0)
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} counter'
+        with self.__lock:
+            values = sorted(self.__values.items())
+        for key, value in values:
+            yield f'{self.name}{format_labels(self.labels, key)} {format_value(value)}'
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels=(), buckets=REQUEST_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # Per label values: a count per bucket (the last one for values above every bound), and the sum
+        self.__values = dict()
+        self.__lock = Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[name] for name in self.labels)
+        bucket = bisect_left(self.buckets, value)
+        with self.__lock:
+            counts, total = self.__values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[bucket] += 1
+            self.__values[key] = (counts, total + value)
+
+    def count(self, **labels) -> int:
+        values = self.__values.get(tuple(labels[name] for name in self.labels))
+        return sum(values[0]) if values is not None else 0
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} histogram'
+        with self.__lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self.__values.items())
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                labels = format_labels(self.labels + ('le',), key + (format_value(bound),))
+                yield f'{self.name}_bucket{labels} {cumulative}'
+            yield f'{self.name}_sum{format_labels(self.labels, key)} {format_value(total)}'
+            yield f'{self.name}_count{format_labels(self.labels, key)} {cumulative}'
+
+
+class Gauge:
+    """A gauge whose values are read when metrics are collected: collect() returns {label values: value}"""
+
+    TYPE = 'gauge'
+
+    def __init__(self, name: str, help_text: str, collect, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.collect = collect
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help_text}'
+        yield f'# TYPE {self.name} {self.TYPE}'
+        for key, value in sorted(self.collect().items()):
+            if value is not None:
+                yield f'{self.name}{format_labels(self.labels, key)} {format_value(value)}'
+
+
+class CollectedCounter(Gauge):
+    """A counter kept elsewhere (e.g. by a cache), read when metrics are collected like a Gauge"""
+
+    TYPE = 'counter'
+
+
+class Registry:
+    """Thread-safe collection of metrics, rendered in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.__metrics = dict()
+        self.__lock = Lock()
+
+    def register(self, metric):
+        with self.__lock:
+            self.__metrics[metric.name] = metric
+        return metric
+
+    def get(self, name: str):
+        return self.__metrics.get(name)
+
+    def render(self) -> str:
+        with self.__lock:
+            metrics = list(self.__metrics.values())
+        lines = list()
+        for metric in metrics:
+            try:
+                # Rendered in full before being added, so a failure doesn't leave HELP and TYPE without samples
+                lines.extend(list(metric.render()))
+            except Exception:
+                # One failing collector (e.g. the database is down) shouldn't hide every other metric
+                continue
+        return '\n'.join(lines) + '\n'
+
+
+def metered(function, name: str, calls: Counter, durations: Histogram):
+    """Returns function wrapped to count its calls and their durations under the method label name"""
+    if getattr(function, '__metered__', False):
+        return function
+
+    @wraps(function)
+    def metered_function(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            calls.inc(method=name)
+            durations.observe(time.perf_counter() - start, method=name)
+
+    metered_function.__metered__ = True
+    return metered_function
+
+
+def init_app(app: Flask, repository, caches: dict = None, database_engine=None) -> Registry:
+    """Collects request, repository, cache and database metrics for app and serves them at /metrics.
+
+    caches maps a cache name to a function returning its stats (as LRUCache.stats() does)."""
+    registry = Registry()
+
+    requests = registry.register(Counter('flix_http_requests_total', 'HTTP requests handled.',
+                                         ('route', 'method', 'status')))
+    latency = registry.register(Histogram('flix_http_request_duration_seconds', 'Time to handle a request.',
+                                          ('route',)))
+
+    calls = registry.register(Counter('flix_repository_calls_total', 'Calls to repository methods.', ('method',)))
+    durations = registry.register(Histogram('flix_repository_call_duration_seconds',
+                                            'Time spent in repository methods.', ('method',), REPOSITORY_BUCKETS))
+    for name in public_functions(repository):
+        setattr(repository, name, metered(getattr(repository, name), name, calls, durations))
+
+    def collect_sizes():
+        return {
+            ('movies',): repo.repo_instance.get_number_of_movies(),
+            ('users',): repo.repo_instance.get_number_of_users(),
+            ('reviews',): repo.repo_instance.get_number_of_reviews()
+        }
+    registry.register(Gauge('flix_repository_size', 'Number of items in the repository.', collect_sizes, ('kind',)))
+
+    caches = caches or dict()
+
+    def collect_cache_stat(stat):
+        return lambda: {(name,): stats()[stat] for name, stats in caches.items()}
+    registry.register(CollectedCounter('flix_cache_hits_total', 'Cache hits.', collect_cache_stat('hits'),
+                                       ('cache',)))
+    registry.register(CollectedCounter('flix_cache_misses_total', 'Cache misses.', collect_cache_stat('misses'),
+                                       ('cache',)))
+    registry.register(Gauge('flix_cache_hit_ratio', 'Share of cache lookups that were hits.',
+                            collect_cache_stat('hit_ratio'), ('cache',)))
+    registry.register(Gauge('flix_cache_size', 'Entries in the cache.', collect_cache_stat('size'), ('cache',)))
+
+    if database_engine is not None:
+        pool_events = registry.register(Counter('flix_db_pool_events_total',
+                                                'Database connections opened, checked out and checked in.',
+                                                ('event',)))
+        for pool_event in ('connect', 'checkout', 'checkin'):
+            event.listen(database_engine, pool_event,
+                         lambda *args, pool_event=pool_event: pool_events.inc(event=pool_event))
+
+        def collect_checked_out():
+            return {(): pool_events.value(event='checkout') - pool_events.value(event='checkin')}
+        registry.register(Gauge('flix_db_pool_checked_out', 'Database connections currently in use.',
+                                collect_checked_out))
+
+    @app.before_request
+    def start_request_clock():
+        g.metrics_start = time.perf_counter()
+
+    @app.after_request
+    def count_request(response):
+        start = g.pop('metrics_start', None)
+        if start is not None:
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            requests.inc(route=route, method=request.method, status=response.status_code)
+            latency.observe(time.perf_counter() - start, route=route)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), content_type=CONTENT_TYPE)
+
+    return registry
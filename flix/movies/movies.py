@@ -1,5 +1,4 @@
-from better_profanity import profanity
-from flask import Blueprint, request, url_for, render_template, session, redirect
+from flask import Blueprint, request, url_for, render_template, session, redirect, jsonify
 
 # Configure Blueprint
 from flask_wtf import FlaskForm
@@ -7,21 +6,20 @@ from wtforms import TextAreaField, HiddenField, SubmitField, IntegerField, Strin
 from wtforms.validators import DataRequired, Length, ValidationError, NumberRange
 
 from flix.adapters import repository as repo
+from flix import fragments
 from flix.authentication.authentication import login_required
+from flix.http_cache import conditional
+from flix.streaming import render_page
 from flix.movies import services
 
 movies_blueprint = Blueprint('movies_bp', __name__)
 
 
 @movies_blueprint.route('/movies_by_letter', methods=['GET'])
+@conditional()
 def movies_by_letter():
     target_letter = request.args.get('letter')
     cursor = request.args.get('cursor')
-    movies_per_page = 10
-    first_movie_url = None
-    last_movie_url = None
-    next_movie_url = None
-    prev_movie_url = None
 
     watchlist = services.get_watchlist(repo.repo_instance)
 
@@ -29,15 +27,34 @@ def movies_by_letter():
         movie_id = services.get_first_movie(repo.repo_instance)['id']
         target_letter = services.get_first_letter(movie_id, repo.repo_instance)
 
-    movies, previous_letter, next_letter = services.get_movies_by_letter(target_letter, repo.repo_instance)
-    alphabet = services.alphabet(repo.repo_instance)
-
     if cursor is None:
         # No cursor query parameter, so initialise cursor to start at the beginning.
         cursor = 0
     else:
         # Convert cursor from string to int.
         cursor = int(cursor)
+
+    # Everything but the sidebar is the same for all users, so it is rendered once per letter and cursor
+    body = fragments.cached_fragment('letter_body', (target_letter, cursor),
+                                     lambda: render_letter_body(target_letter, cursor))
+
+    return render_page('movies/movies_by_letter.html',
+                       body=body,
+                       letter=target_letter,
+                       watchlist=watchlist
+                       )
+
+
+def render_letter_body(target_letter, cursor: int):
+    movies_per_page = 10
+    first_movie_url = None
+    last_movie_url = None
+    next_movie_url = None
+    prev_movie_url = None
+
+    movies, previous_letter, next_letter = services.get_movies_by_letter(target_letter, repo.repo_instance)
+    alphabet = services.alphabet(repo.repo_instance)
+
     if movies is not None:
         if cursor > 0:
             # There are preceding movies, so generate URLs for the 'previous' and 'first' navigation buttons.
@@ -65,11 +82,10 @@ def movies_by_letter():
     last_movie_index = cursor + movies_per_page
     movies = movies[cursor: last_movie_index]
 
-    return render_template('movies/movies_by_letter.html',
+    return render_template('movies/letter_body.html',
                            alphabet=alphabet,
                            movies=movies,
                            letter=target_letter,
-                           watchlist=watchlist,
                            prev_movie_url=prev_movie_url,
                            first_movie_url=first_movie_url,
                            next_movie_url=next_movie_url,
@@ -78,13 +94,16 @@ def movies_by_letter():
 
 
 @movies_blueprint.route('/search', methods=['GET', 'POST'])
+@conditional(period=1800)
 def search():
     form = SearchForm()
     watchlist = services.get_watchlist(repo.repo_instance)
     search_result = []
+    facets = None
     search = [request.args.get('search_genre'), request.args.get('search_actor'), request.args.get('search_director')]
     cursor = request.args.get('cursor')
     movies_per_page = 10
+    facets_per_field = 5
     first_movie_url = None
     last_movie_url = None
     next_movie_url = None
@@ -104,36 +123,25 @@ def search():
         return redirect(url_for('movies_bp.search', search_genre=genre, search_actor=actor, search_director=director))
 
     if search is not None:
-        movies_genre = []
-        movies_actor = []
-        movies_director = []
-        search_list = []
+        filters = dict()
 
         genre = search[0]
         if genre != "" and genre is not None:
-            genre = genre[0].upper() + genre[1:].lower()
-            movies_genre = services.get_movies_from_genre(genre, repo.repo_instance)
+            filters['genre'] = genre[0].upper() + genre[1:].lower()
 
         actor = search[1]
         if actor != "" and actor is not None:
-            actor = services.get_actor(actor, repo.repo_instance)
-            if actor is not None:
-                movies_actor = actor['movies']
+            filters['actor'] = actor
 
         director = search[2]
         if director != "" and director is not None:
-            director = services.get_director(director, repo.repo_instance)
-            if director is not None:
-                movies_director = director['movies']
-        search_list = [movies_genre, movies_actor, movies_director]
-
-        # Remove search elements that are empty
-        for i in range(len(search_list) - 1, -1, -1):
-            if not search_list[i]:
-                search_list.pop(i)
+            filters['director'] = director
 
-        # Find common movies for search parameters
-        search_result = services.elements_in_common(search_list)
+        # Find common movies for search parameters, for the current page only, and their facets
+        search_result, number_of_results, search_facets = services.search_movies_with_facets(
+            filters, repo.repo_instance, cursor, movies_per_page, facet_limit=facets_per_field)
+        if number_of_results > 0:
+            facets = search_facets
 
         if cursor > 0:
             # There are preceding movies, so generate URLs for the 'previous' and 'first' navigation buttons.
@@ -145,14 +153,14 @@ def search():
                                       search_actor=search[1],
                                       search_director=search[2])
 
-        if cursor + movies_per_page < len(search_result):
+        if cursor + movies_per_page < number_of_results:
             # There are further movies, so generate URLs for the 'next' and 'last' navigation buttons.
             next_movie_url = url_for('movies_bp.search', search_genre=search[0],
                                      search_actor=search[1],
                                      search_director=search[2],
                                      cursor=cursor + movies_per_page)
-            last_cursor = movies_per_page * int(len(search_result) / movies_per_page)
-            if len(search_result) % movies_per_page == 0:
+            last_cursor = movies_per_page * int(number_of_results / movies_per_page)
+            if number_of_results % movies_per_page == 0:
                 last_cursor -= movies_per_page
 
             last_movie_url = url_for('movies_bp.search', search_genre=search[0],
@@ -160,24 +168,85 @@ def search():
                                      search_director=search[2],
                                      cursor=last_cursor)
 
-        # Get Movie for current page
-        last_movie_index = cursor + movies_per_page
-        search_result = search_result[cursor: last_movie_index]
+        # Movies are fetched from their ids as the page is written
+        search_result = services.iter_movie_summaries(repo.repo_instance, search_result)
+
+    return render_page('movies/search.html',
+                       search_result=search_result,
+                       facets=facets,
+                       search=search,
+                       watchlist=watchlist,
+                       form=form,
+                       handler_url=url_for('movies_bp.search'),
+                       prev_movie_url=prev_movie_url,
+                       first_movie_url=first_movie_url,
+                       next_movie_url=next_movie_url,
+                       last_movie_url=last_movie_url
+                       )
+
+
+@movies_blueprint.route('/movies', methods=['GET'])
+@conditional()
+def all_movies():
+    watchlist = services.get_watchlist(repo.repo_instance)
+    # Every movie, streamed from the repository as the page is written
+    movies = services.iter_movie_summaries(repo.repo_instance)
+    return render_page('movies/all_movies.html', movies=movies, watchlist=watchlist)
 
-        # Get movies from movie ids
-        for i in range(0, len(search_result)):
-            search_result[i] = services.get_movie(search_result[i], repo.repo_instance)
 
-    return render_template('movies/search.html',
-                           search_result=search_result,
-                           watchlist=watchlist,
-                           form=form,
-                           handler_url=url_for('movies_bp.search'),
-                           prev_movie_url=prev_movie_url,
-                           first_movie_url=first_movie_url,
-                           next_movie_url=next_movie_url,
-                           last_movie_url=last_movie_url
-                           )
+@movies_blueprint.route('/autocomplete', methods=['GET'])
+def autocomplete():
+    query = request.args.get('q', '')
+    limit = request.args.get('limit', 10, type=int)
+    kinds = request.args.getlist('type') or None
+
+    suggestions = services.autocomplete(query, repo.repo_instance, limit, kinds)
+    return jsonify(query=query, results=suggestions)
+
+
+@movies_blueprint.route('/actor_path', methods=['GET'])
+def actor_path():
+    from_actor = request.args.get('from', '')
+    to_actor = request.args.get('to', '')
+
+    path = services.get_actor_path(from_actor, to_actor, repo.repo_instance)
+    if path is None:
+        return jsonify(error='No path between these actors'), 404
+    return jsonify(degrees=len(path['movies']), **path)
+
+
+@movies_blueprint.route('/rankings', methods=['GET'])
+def rankings():
+    metric = request.args.get('by', 'rating')
+    genre = request.args.get('genre')
+    year = request.args.get('year', type=int)
+    cursor = max(0, request.args.get('cursor', 0, type=int))
+    # Clamped as the service clamps it, so the next cursor follows the page actually returned
+    limit = max(0, min(request.args.get('limit', 10, type=int), services.MAX_RANKING_LIMIT))
+
+    try:
+        ranked_movies = services.get_rankings(metric, repo.repo_instance, cursor, limit, genre, year)
+    except services.UnknownMetricException:
+        return jsonify(error='Unknown ranking ' + metric), 400
+
+    next_cursor = None
+    if limit > 0 and len(ranked_movies) == limit:
+        next_cursor = cursor + limit
+    return jsonify(by=metric, genre=genre, year=year, movies=ranked_movies, next_cursor=next_cursor)
+
+
+@movies_blueprint.route('/stats', methods=['GET'])
+def stats():
+    group = request.args.get('group')
+    statistics = services.get_statistics(repo.repo_instance)
+
+    if group is None:
+        return jsonify(statistics)
+    if group == 'reviews':
+        return jsonify(reviews=statistics['reviews'])
+    if group not in statistics['movies']:
+        return jsonify(error='Unknown group ' + group), 400
+    return jsonify({group: statistics['movies'][group]})
 
 
 @movies_blueprint.route('/review', methods=['GET', 'POST'])
@@ -223,6 +292,7 @@ def review_movie():
 
 
 @movies_blueprint.route('/movie', methods=['GET'])
+@conditional(unless=lambda: 'in_watchlist' in request.args)
 def movie():
     movie_id = int(request.args.get('movie_id'))
     movie_to_show_reviews = request.args.get('view_reviews_for')
@@ -248,8 +318,12 @@ def movie():
     movie_dict = services.get_movie(movie_id, repo.repo_instance)
     movie_dict["view_review_url"] = url_for('movies_bp.movie', movie_id=movie_id, view_reviews_for=movie_id)
     movie_dict["add_review_url"] = url_for('movies_bp.review_movie', movie_id=movie_id)
+    similar_movies = services.get_similar_movies(movie_id, repo.repo_instance)
+    similar_descriptions = services.get_movies_with_similar_descriptions(movie_id, repo.repo_instance)
     return render_template('movies/movie.html',
                            movie=movie_dict,
+                           similar_movies=similar_movies,
+                           similar_descriptions=similar_descriptions,
                            review_page=0,
                            show_reviews_for_movie=movie_to_show_reviews,
                            watchlist=watchlist,
@@ -263,6 +337,8 @@ class ProfanityFree:
         self.message = message
 
     def __call__(self, form, field):
+        # Imported on first use, as importing it loads its word list, which slows down startup
+        from better_profanity import profanity
         if profanity.contains_profanity(field.data):
             raise ValidationError(self.message)
 
@@ -0,0 +1,53 @@
+from bisect import bisect_left
+from typing import List
+
+
+def _gallop(posting_list: List[int], target: int, lo: int) -> int:
+    # Returns the index of the first element >= target, searching from lo with exponentially growing steps
+    # so that skipping over a long run of a large list costs O(log(distance)) rather than O(distance).
+    n = len(posting_list)
+    hi = lo
+    step = 1
+    while hi < n and posting_list[hi] < target:
+        lo = hi + 1
+        hi += step
+        step *= 2
+    return bisect_left(posting_list, target, lo, min(hi, n))
+
+
+def _unique(posting_list: List[int]) -> List[int]:
+    return [movie_id for i, movie_id in enumerate(posting_list) if i == 0 or posting_list[i - 1] != movie_id]
+
+
+def intersect(posting_lists, limit: int = None) -> List[int]:
+    """Returns the movie ids common to every posting list, in ascending order.
+
+    Each posting list must already be ascending, as the repositories build them, since sorting them here would cost
+    as much as scanning the broadest one. Lists are intersected from the smallest upward, galloping through the
+    larger lists, so the cost is driven by the most selective list. If limit is given, stops as soon as that many
+    ids have been found."""
+    if not posting_lists:
+        return []
+
+    posting_lists = sorted(posting_lists, key=len)
+    # Duplicates only matter in the list that drives the intersection
+    smallest, others = _unique(posting_lists[0]), posting_lists[1:]
+    positions = [0] * len(others)
+    common = []
+
+    for movie_id in smallest:
+        if limit is not None and len(common) >= limit:
+            break
+        in_all = True
+        for i, posting_list in enumerate(others):
+            positions[i] = _gallop(posting_list, movie_id, positions[i])
+            if positions[i] == len(posting_list):
+                # A larger list has run out, so nothing after this can be common
+                return common
+            if posting_list[positions[i]] != movie_id:
+                in_all = False
+                break
+        if in_all:
+            common.append(movie_id)
+
+    return common
@@ -1,9 +1,14 @@
+from bisect import bisect_left, bisect_right
 from typing import Iterable
+from weakref import WeakKeyDictionary
 
 from flask import session
 
+from flix.adapters.cache import LRUCache
+from flix.adapters.name_index import NameIndex, normalise_name
 from flix.adapters.repository import AbstractRepository
 from flix.domain.model import Movie, Review, Genre, make_review, User, Actor, Director
+from flix.movies import search
 
 
 class NonExistentMovieException(Exception):
@@ -14,6 +19,122 @@ class UnknownUserException(Exception):
     pass
 
 
+class UnknownMetricException(Exception):
+    pass
+
+
+class UnknownCursorException(Exception):
+    pass
+
+
+# Maximum number of movie dicts kept per repository
+MOVIE_CACHE_SIZE = 512
+
+
+class MovieCache:
+    """Read-through cache of movie dicts, keyed by movie id, the movie's version and a tag of shared changes.
+
+    A movie's version is bumped whenever it is changed through the service layer (e.g. a review is added),
+    so stale dicts are never returned. Changes made by other processes don't go through this service layer, so
+    where they can happen, callers give the tag of the stored data version (see _shared_tag) as well."""
+
+    def __init__(self, max_size: int = MOVIE_CACHE_SIZE):
+        self.__dicts = LRUCache(max_size)
+        self.__versions = dict()
+
+    def version(self, movie_id: int) -> int:
+        return self.__versions.get(movie_id, 0)
+
+    def get(self, movie_id: int, tag: str = None):
+        return self.__dicts.get((movie_id, self.version(movie_id), tag))
+
+    def put(self, movie: Movie, tag: str = None):
+        movie_dict = movie_to_dict(movie)
+        self.__dicts.put((movie.id, self.version(movie.id), tag), movie_dict)
+        return movie_dict
+
+    def invalidate(self, movie_id: int, tag: str = None):
+        self.__dicts.pop((movie_id, self.version(movie_id), tag))
+        self.__versions[movie_id] = self.version(movie_id) + 1
+
+    def clear(self):
+        self.__dicts.clear()
+        self.__versions.clear()
+
+    def stats(self):
+        return self.__dicts.stats()
+
+
+# One cache per repository, dropped along with the repository
+_movie_caches = WeakKeyDictionary()
+
+
+def get_movie_cache(repo: AbstractRepository) -> MovieCache:
+    cache = _movie_caches.get(repo)
+    if cache is None:
+        cache = MovieCache()
+        _movie_caches[repo] = cache
+    return cache
+
+
+def movie_cache_stats(repo: AbstractRepository):
+    return get_movie_cache(repo).stats()
+
+
+def _shared_tag(repo: AbstractRepository, parts) -> str:
+    # A repository shared with other processes (e.g. through a database) can change without this process knowing,
+    # so its caches are keyed by the stored data version too. Local repositories only change through this process,
+    # whose changes invalidate exactly the entries they affect.
+    version = repo.get_data_version()
+    return None if version.local else version.tag(parts)
+
+
+# Maximum number of users whose watchlists are kept per repository
+WATCHLIST_CACHE_SIZE = 256
+
+
+class Watchlist:
+    """Summary of a user's watchlist: movie summaries in watchlist order and a set of their ids."""
+
+    def __init__(self, movies: list):
+        self.__movies = movies
+        self.__ids = frozenset(movie['id'] for movie in movies)
+        self.__positions = {movie['id']: i for i, movie in enumerate(movies)}
+
+    @property
+    def ids(self) -> frozenset:
+        return self.__ids
+
+    def position(self, movie_id: int):
+        """Returns the position of movie_id in the watchlist, or None"""
+        return self.__positions.get(movie_id)
+
+    def __iter__(self):
+        return iter(self.__movies)
+
+    def __len__(self):
+        return len(self.__movies)
+
+    def __contains__(self, movie_id):
+        return movie_id in self.__ids
+
+
+# One watchlist cache ((username, tag of shared changes) -> Watchlist) per repository
+_watchlist_caches = WeakKeyDictionary()
+
+
+def get_watchlist_cache(repo: AbstractRepository) -> LRUCache:
+    cache = _watchlist_caches.get(repo)
+    if cache is None:
+        cache = LRUCache(WATCHLIST_CACHE_SIZE)
+        _watchlist_caches[repo] = cache
+    return cache
+
+
+def watchlist_cache_stats(repo: AbstractRepository):
+    return get_watchlist_cache(repo).stats()
+
+
 def add_review(movie_id: int, review_text: str, rating, username: str, repo: AbstractRepository):
     movie = repo.get_movie(movie_id)
     if movie is None:
@@ -27,20 +148,58 @@ def add_review(movie_id: int, review_text: str, rating, username: str, repo: Abs
     review = make_review(review_text, user, movie, rating)
 
     # Update Repo
+    tag = _shared_tag(repo, ('catalog', 'reviews'))
     repo.add_review(review)
+    get_movie_cache(repo).invalidate(movie_id, tag)
 
 
 def get_movie(movie_id: int, repo: AbstractRepository):
-    movie = repo.get_movie(movie_id)
-    if movie is None:
-        raise NonExistentMovieException
+    cache = get_movie_cache(repo)
+    tag = _shared_tag(repo, ('catalog', 'reviews'))
+    movie_dict = cache.get(movie_id, tag)
+    if movie_dict is None:
+        movie = repo.get_movie(movie_id)
+        if movie is None:
+            raise NonExistentMovieException
+        movie_dict = cache.put(movie, tag)
+
+    # Return a copy so callers can add keys (e.g. urls) without touching the cached dict
+    return dict(movie_dict)
+
+
+def get_movie_detail(movie_id: int, repo: AbstractRepository):
+    # Returns a movie's fields with genres as names and the number of reviews instead of the reviews themselves
+    movie_dict = get_movie(movie_id, repo)
+    movie_dict['genres'] = [genre['genre'] for genre in movie_dict['genres']]
+    movie_dict['number_of_reviews'] = len(movie_dict.pop('reviews'))
+    return movie_dict
+
 
-    return movie_to_dict(movie)
+def get_movie_ids(repo: AbstractRepository, after: int = None, limit: int = None):
+    # Returns the ids of all movies, ascending, starting after the given id
+    index = repo.get_bitmap_index()
+    return index.movie_ids(index.all_rows(), limit=limit, after=after)
+
+
+def iter_movie_summaries(repo: AbstractRepository, movie_ids: Iterable[int] = None):
+    # Yields summaries of the given movies, or of every movie by ascending id, one at a time
+    if movie_ids is None:
+        for movie in repo.iter_movies():
+            yield movie_to_summary_dict(movie)
+    else:
+        for movie_id in movie_ids:
+            movie = repo.get_movie(movie_id)
+            if movie is not None:
+                yield movie_to_summary_dict(movie)
+
+
+def get_movie_summaries(movie_ids: Iterable[int], repo: AbstractRepository):
+    return list(iter_movie_summaries(repo, movie_ids))
 
 
 def get_first_movie(repo: AbstractRepository):
     movie = repo.get_first_movie()
-    return movie_to_dict(movie)
+    return get_movie(movie.id, repo)
 
 
 def get_first_letter(movie_id: int, repo: AbstractRepository):
@@ -52,7 +211,7 @@ def get_first_letter(movie_id: int, repo: AbstractRepository):
 
 def get_last_movie(repo: AbstractRepository):
     movie = repo.get_last_movie()
-    return movie_to_dict(movie)
+    return get_movie(movie.id, repo)
 
 
 def get_all_letters(repo: AbstractRepository):
@@ -78,6 +237,37 @@ def get_movies_by_letter(letter, repo: AbstractRepository):
     return movies_dict, prev_letter, next_letter
 
 
+# Per repository, the catalog version and {letter: (movie ids in title order, {movie id: position})}
+_letter_caches = WeakKeyDictionary()
+
+
+def _letter_movie_ids(letter, repo: AbstractRepository):
+    version = repo.get_data_version().tag(('catalog',))
+    cached = _letter_caches.get(repo)
+    if cached is None or cached[0] != version:
+        cached = (version, dict())
+        _letter_caches[repo] = cached
+    letter_movie_ids = cached[1].get(letter)
+    if letter_movie_ids is None:
+        movie_ids = [movie.id for movie in repo.get_movies_by_letter(letter)]
+        letter_movie_ids = (movie_ids, {movie_id: i for i, movie_id in enumerate(movie_ids)})
+        cached[1][letter] = letter_movie_ids
+    return letter_movie_ids
+
+
+def get_movie_ids_by_letter(letter, repo: AbstractRepository, after: int = None, limit: int = None):
+    # Returns the ids of the movies from a given letter in title order, starting after the movie with id after.
+    # Raises UnknownCursorException if that movie isn't one of the letter's
+    movie_ids, positions = _letter_movie_ids(letter, repo)
+    start = 0
+    if after is not None:
+        if after not in positions:
+            raise UnknownCursorException
+        start = positions[after] + 1
+    end = None if limit is None else start + max(0, limit)
+    return movie_ids[start:end]
+
+
 def get_movies_from_genre(genre_name, repo: AbstractRepository):
     genre = Genre(genre_name)
     movies = repo.get_movies_from_genre(genre)
@@ -101,12 +291,19 @@ def get_user(username: str, repo: AbstractRepository):
 
 
 def get_watchlist(repo: AbstractRepository):
-    watchlist = None
-    if 'username' in session:
-        username = session['username']
+    if 'username' not in session:
+        return None
+
+    username = session['username']
+    cache = get_watchlist_cache(repo)
+    key = (username, _shared_tag(repo, ('catalog', 'watchlists')))
+    watchlist = cache.get(key)
+    if watchlist is None:
         user = repo.get_user(username)
-        watchlist = user.watchlist
-        watchlist = movies_to_dict(watchlist)
+        if user is None:
+            return None
+        watchlist = Watchlist(movies_to_summary_dict(user.watchlist))
+        cache.put(key, watchlist)
     return watchlist
 
 
@@ -115,45 +312,285 @@ def add_to_watchlist(movie_id: int, repo: AbstractRepository):
         return
 
     repo.add_to_watchlist(session['username'], movie_id)
+    # Under a shared tag, the change already made the tag, and so the key of the old watchlist, stale
+    get_watchlist_cache(repo).pop((session['username'], None))
 
 
 def remove_from_watchlist(movie_id: int, repo: AbstractRepository):
     if 'username' not in session:
         return
     repo.remove_from_watchlist(session['username'], movie_id)
+    get_watchlist_cache(repo).pop((session['username'], None))
 
 
 def movie_in_watchlist(watchlist, movie_id: int):
-    if 'username' not in session:
+    if 'username' not in session or watchlist is None:
         return 0
-    for movie in watchlist:
-        if movie['id'] == movie_id:
-            return 1
+    if movie_id in watchlist:
+        return 1
     return 0
 
 
 def get_actor(fullname: str, repo: AbstractRepository):
-    actor = repo.get_actor(fullname)
-    if actor is None:
+    # Names are matched ignoring case, accents and surrounding spaces, falling back to the closest spelling
+    name = get_name_index(repo).resolve(fullname, 'actor')
+    if name is None:
         return
-    return actor_to_dict(actor)
+    index = repo.get_bitmap_index()
+    return {
+        'fullname': name,
+        'movies': index.movie_ids(index.bitmap('actor', name))
+    }
 
 
 def get_director(fullname: str, repo: AbstractRepository):
-    director = repo.get_director(fullname)
-    if director is None:
+    name = get_name_index(repo).resolve(fullname, 'director')
+    if name is None:
         return
-    return director_to_dict(director)
+    index = repo.get_bitmap_index()
+    return {
+        'fullname': name,
+        'movies': index.movie_ids(index.bitmap('director', name))
+    }
+
+
+# Name index per bitmap index, so it is rebuilt whenever the repository rebuilds its bitmap index
+_name_indexes = WeakKeyDictionary()
+
+
+def get_name_index(repo: AbstractRepository) -> NameIndex:
+    bitmap_index = repo.get_bitmap_index()
+    name_index = _name_indexes.get(bitmap_index)
+    if name_index is None:
+        name_index = NameIndex({kind: bitmap_index.keys(kind) for kind in ('actor', 'director', 'genre')})
+        _name_indexes[bitmap_index] = name_index
+    return name_index
+
+
+# Names of each kind sorted ignoring case and accents, per bitmap index
+_sorted_names = WeakKeyDictionary()
+
+
+def get_names(kind: str, repo: AbstractRepository, prefix: str = None, after: str = None, limit: int = None):
+    # Returns names of a kind ('actor', 'director' or 'genre') in alphabetical order, optionally only those
+    # starting with prefix and coming after the name after
+    bitmap_index = repo.get_bitmap_index()
+    names_by_kind = _sorted_names.setdefault(bitmap_index, dict())
+    names = names_by_kind.get(kind)
+    if names is None:
+        names = sorted((normalise_name(name), name) for name in bitmap_index.keys(kind))
+        names_by_kind[kind] = names
+
+    start = 0
+    if prefix:
+        prefix = normalise_name(prefix)
+        start = bisect_left(names, (prefix,))
+    if after is not None:
+        start = max(start, bisect_right(names, (normalise_name(after), after)))
+
+    matches = list()
+    for i in range(start, len(names)):
+        if (prefix and not names[i][0].startswith(prefix)) or (limit is not None and len(matches) >= limit):
+            break
+        matches.append(names[i][1])
+    return matches
+
+
+# Upper bound on the number of autocomplete suggestions
+MAX_AUTOCOMPLETE_LIMIT = 20
+
+
+def autocomplete(query: str, repo: AbstractRepository, limit: int = 10, kinds=None):
+    # Returns names of actors, directors and genres matching query, as dicts with 'name' and 'type'
+    limit = max(0, min(limit, MAX_AUTOCOMPLETE_LIMIT))
+    matches = get_name_index(repo).complete(query, limit, kinds)
+    return [{'name': name, 'type': kind} for kind, name in matches]
+
+
+def get_similar_movies(movie_id: int, repo: AbstractRepository, limit: int = 5):
+    # Returns summaries of the movies sharing the most actors, director and genres with the given movie
+    similar_movies = list()
+    for similar_id in repo.get_recommender().similar(movie_id, limit):
+        movie = repo.get_movie(similar_id)
+        if movie is not None:
+            similar_movies.append(movie_to_summary_dict(movie))
+    return similar_movies
+
+
+def get_movies_with_similar_descriptions(movie_id: int, repo: AbstractRepository, limit: int = 5):
+    # Returns summaries of the movies whose descriptions are textually closest to the given movie's
+    similar_movies = list()
+    for similar_id in repo.get_description_index().similar(movie_id, limit):
+        movie = repo.get_movie(similar_id)
+        if movie is not None:
+            similar_movies.append(movie_to_summary_dict(movie))
+    return similar_movies
+
+
+# Maximum number of actor paths kept per co-star graph
+ACTOR_PATH_CACHE_SIZE = 1024
+
+# Recently answered actor paths, per co-star graph, with the number of movies the graph had linked
+_actor_path_caches = WeakKeyDictionary()
+
+
+def get_actor_path(from_actor: str, to_actor: str, repo: AbstractRepository):
+    # Returns the shortest chain of actors linking from_actor to to_actor, with a movie each pair appeared in,
+    # as {'actors': [names], 'movies': [movie summaries]}. Returns None if either actor is unknown or unconnected.
+    names = get_name_index(repo)
+    from_actor = names.resolve(from_actor, 'actor')
+    to_actor = names.resolve(to_actor, 'actor')
+    if from_actor is None or to_actor is None:
+        return None
+
+    graph = repo.get_costar_graph()
+    cached = _actor_path_caches.get(graph)
+    if cached is None or cached[0] != graph.movies:
+        # A movie added to the graph can link actors, or shorten the path between them
+        cached = (graph.movies, LRUCache(ACTOR_PATH_CACHE_SIZE))
+        _actor_path_caches[graph] = cached
+    cache = cached[1]
+
+    key = (from_actor, to_actor)
+    if key not in cache:
+        path = graph.path(graph.actor_number(from_actor), graph.actor_number(to_actor))
+        if path is not None:
+            path = [graph.actor_name(number) for number in path]
+        cache.put(key, path)
+    path = cache.get(key)
+    if path is None:
+        return None
+
+    index = repo.get_bitmap_index()
+    movies = list()
+    for first, second in zip(path, path[1:]):
+        movie_id = index.movie_ids(index.bitmap('actor', first) & index.bitmap('actor', second), limit=1)[0]
+        movies.append(movie_to_summary_dict(repo.get_movie(movie_id)))
+    return {'actors': path, 'movies': movies}
+
+
+# Upper bound on the number of movies in a page of rankings
+MAX_RANKING_LIMIT = 50
+
+
+def get_rankings(metric: str, repo: AbstractRepository, cursor: int = 0, limit: int = 10, genre: str = None,
+                 year: int = None):
+    # Returns summaries of the movies ranked highest by metric ('rating', 'votes' or 'revenue'), each with the
+    # ranked value, optionally within a genre and/or year
+    rankings = repo.get_rankings()
+    if metric not in rankings.METRICS:
+        raise UnknownMetricException
+
+    if genre is not None:
+        genre = _resolve_key(repo, 'genre', genre)
+    limit = max(0, min(limit, MAX_RANKING_LIMIT))
+
+    ranked_movies = list()
+    for movie_id, value in rankings.top(metric, cursor, limit, genre, year):
+        movie_dict = movie_to_summary_dict(repo.get_movie(movie_id))
+        movie_dict[metric] = value
+        ranked_movies.append(movie_dict)
+    return ranked_movies
+
+
+STATISTICS_GROUPS = ('genre', 'year', 'decade', 'director')
+
+# Number of new reviews after which cached statistics are recomputed
+STATISTICS_REVIEW_THRESHOLD = 50
+
+# Cached statistics per repository, as (bitmap index, number of reviews, statistics) when they were computed
+_statistics_caches = WeakKeyDictionary()
+
+
+def get_statistics(repo: AbstractRepository):
+    # Returns movie statistics for every group in STATISTICS_GROUPS and the review activity per day. The result is
+    # reused until the catalog changes or STATISTICS_REVIEW_THRESHOLD more reviews have been added.
+    index = repo.get_bitmap_index()
+    number_of_reviews = repo.get_number_of_reviews()
+    cached = _statistics_caches.get(repo)
+    if cached is not None:
+        cached_index, cached_number_of_reviews, statistics = cached
+        if cached_index is index and number_of_reviews - cached_number_of_reviews < STATISTICS_REVIEW_THRESHOLD:
+            return statistics
+
+    statistics = {
+        'movies': {group: repo.get_movie_statistics(group) for group in STATISTICS_GROUPS},
+        'reviews': repo.get_review_activity()
+    }
+    _statistics_caches[repo] = (index, number_of_reviews, statistics)
+    return statistics
+
 
+# Upper bound on the number of values returned per facet
+MAX_FACET_LIMIT = 50
 
-def elements_in_common(search_list):
-    elements_common = []
-    if search_list:
-        elements_common = search_list[0]
-    # Finds intersection between all list in search_list
-    for i in range(1, len(search_list)):
-        elements_common = list(set(elements_common).intersection(search_list[i]))
-    return elements_common
+
+def search_movies(filters: dict, repo: AbstractRepository, cursor: int = 0, limit: int = None, exclude: dict = None,
+                  after: int = None):
+    # Returns the ids of movies matching every filter and none of the exclusions, ascending, plus the total count.
+    # Filters map a field ('genre', 'actor', 'director' or 'year') to a value, or a list of values to match any of.
+    # Pages are taken either by position (cursor) or by keyset (ids after the given id).
+    if not filters:
+        return [], 0
+
+    index = repo.get_bitmap_index()
+    bits = _search_bitmap(repo, filters, exclude)
+    return index.movie_ids(bits, cursor, limit, after), index.count(bits)
+
+
+def get_search_facets(filters: dict, repo: AbstractRepository, limit: int = 10, exclude: dict = None):
+    # Returns counts of the genres, directors, actors, years and decades of the movies matching the search,
+    # at most limit values per facet (capped at MAX_FACET_LIMIT)
+    if not filters:
+        return {field: [] for field in ('genre', 'actor', 'director', 'year', 'decade')}
+
+    index = repo.get_bitmap_index()
+    return index.facets(_search_bitmap(repo, filters, exclude), max(0, min(limit, MAX_FACET_LIMIT)))
+
+
+def search_movies_with_facets(filters: dict, repo: AbstractRepository, cursor: int = 0, limit: int = None,
+                              facet_limit: int = 10, exclude: dict = None):
+    # Returns the page of search_movies, the total count and the facets of get_search_facets, evaluating the
+    # search once for all three
+    if not filters:
+        return [], 0, get_search_facets(filters, repo)
+
+    index = repo.get_bitmap_index()
+    bits = _search_bitmap(repo, filters, exclude)
+    facets = index.facets(bits, max(0, min(facet_limit, MAX_FACET_LIMIT)))
+    return index.movie_ids(bits, cursor, limit), index.count(bits), facets
+
+
+def _search_bitmap(repo: AbstractRepository, filters: dict, exclude: dict = None):
+    index = repo.get_bitmap_index()
+    bits = index.all_rows()
+    for field, keys in filters.items():
+        bits &= _field_bitmap(repo, field, keys)
+    if exclude is not None:
+        for field, keys in exclude.items():
+            bits &= index.negate(_field_bitmap(repo, field, keys))
+    return bits
+
+
+def _field_bitmap(repo: AbstractRepository, field: str, keys):
+    index = repo.get_bitmap_index()
+    if isinstance(keys, (list, tuple, set)):
+        return index.any_of(field, [_resolve_key(repo, field, key) for key in keys])
+    return index.bitmap(field, _resolve_key(repo, field, keys))
+
+
+def _resolve_key(repo: AbstractRepository, field: str, key):
+    # Names are resolved the same way as in get_actor/get_director, other values (years) are used as given
+    if field in ('actor', 'director', 'genre') and isinstance(key, str):
+        name = get_name_index(repo).resolve(key, field)
+        if name is not None:
+            return name
+    return key
+
+
+def elements_in_common(search_list, limit: int = None):
+    # Finds intersection between all lists in search_list, as ascending movie ids
+    return search.intersect(search_list, limit)
 
 
 # ============================================
@@ -180,6 +617,21 @@ def movies_to_dict(movies: Iterable[Movie]):
     return [movie_to_dict(movie) for movie in movies]
 
 
+def movie_to_summary_dict(movie: Movie):
+    # Only the fields needed to list a movie, without reviews or genre graphs
+    summary_dict = {
+        'id': movie.id,
+        'title': movie.title,
+        'year': movie.year,
+        'actors': [actor.actor_full_name for actor in movie.actors]
+    }
+    return summary_dict
+
+
+def movies_to_summary_dict(movies: Iterable[Movie]):
+    return [movie_to_summary_dict(movie) for movie in movies]
+
+
 def review_to_dict(review: Review):
     review_dict = {
         'username': review.user.username,
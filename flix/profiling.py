@@ -0,0 +1,147 @@
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import time
+from collections import deque
+from threading import Lock
+
+from flask import Flask, Response, abort, jsonify, request
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+# Request header carrying a token from make_profile_token, asking for the request to be profiled
+PROFILE_HEADER = 'X-Flix-Profile'
+
+# Seconds a profile token stays valid
+TOKEN_MAX_AGE = 3600
+
+# Number of captured profiles listed in the index
+INDEX_SIZE = 100
+
+# Number of functions shown per profile, by cumulative time
+TOP_FUNCTIONS = 30
+
+
+def token_serializer(secret_key) -> URLSafeTimedSerializer:
+    return URLSafeTimedSerializer(secret_key, salt='flix-profile')
+
+
+def make_profile_token(secret_key) -> str:
+    return token_serializer(secret_key).dumps('profile')
+
+
+def valid_profile_token(secret_key, token: str) -> bool:
+    if not token or not secret_key:
+        return False
+    try:
+        return token_serializer(secret_key).loads(token, max_age=TOKEN_MAX_AGE) == 'profile'
+    except BadSignature:
+        return False
+
+
+class ProfilingMiddleware:
+    """WSGI middleware running cProfile around a request and writing the stats to a file in directory.
+
+    A request is profiled when it carries a valid signed token in the X-Flix-Profile header, or when it is picked
+    at random with probability sample_rate. The response body is generated inside the profile too, so streamed
+    pages are profiled in full (and buffered). Only one request is profiled at a time; others run as usual."""
+
+    def __init__(self, app, directory: str, secret_key, sample_rate: float = 0.0):
+        self.app = app
+        self.directory = directory
+        self.secret_key = secret_key
+        self.sample_rate = sample_rate
+        self.__lock = Lock()
+        self.__captured = deque(maxlen=INDEX_SIZE)
+
+    def captured(self) -> list:
+        """Returns the profiles captured since startup, most recent first"""
+        return list(reversed(self.__captured))
+
+    def wants_profile(self, environ) -> bool:
+        if valid_profile_token(self.secret_key, environ.get('HTTP_' + PROFILE_HEADER.upper().replace('-', '_'))):
+            return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, environ, start_response):
+        if not self.wants_profile(environ) or not self.__lock.acquire(blocking=False):
+            return self.app(environ, start_response)
+
+        try:
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            profile.enable()
+            try:
+                app_iter = self.app(environ, start_response)
+                try:
+                    body = list(app_iter)
+                finally:
+                    if hasattr(app_iter, 'close'):
+                        app_iter.close()
+            finally:
+                profile.disable()
+            self.__save(profile, environ, time.perf_counter() - start)
+            return body
+        finally:
+            self.__lock.release()
+
+    def __save(self, profile: cProfile.Profile, environ, duration: float):
+        os.makedirs(self.directory, exist_ok=True)
+        path = environ.get('PATH_INFO', '/')
+        slug = re.sub(r'[^A-Za-z0-9]+', '_', path).strip('_') or 'root'
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{int(time.time() * 1000) % 1000:03d}-" \
+               f"{environ.get('REQUEST_METHOD', 'GET')}-{slug}.prof"
+        profile.dump_stats(os.path.join(self.directory, name))
+        self.__captured.append({
+            'name': name,
+            'method': environ.get('REQUEST_METHOD', 'GET'),
+            'path': path,
+            'query': environ.get('QUERY_STRING', ''),
+            'duration_ms': round(duration * 1000, 2)
+        })
+
+
+def top_functions(filename: str, limit: int = TOP_FUNCTIONS) -> str:
+    """Returns the functions of a stats file with the most cumulative time, as pstats prints them"""
+    output = io.StringIO()
+    stats = pstats.Stats(filename, stream=output)
+    stats.strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return output.getvalue()
+
+
+def init_app(app: Flask) -> ProfilingMiddleware:
+    """Profiles requests of app as set by PROFILE_DIR and PROFILE_SAMPLE_RATE, and serves an index of captured
+    profiles at /profiles. The index needs the same token as profiled requests, in the header only, so it stays out
+    of access logs and browser history. `flask profile-token` prints a token."""
+    directory = os.path.abspath(app.config['PROFILE_DIR'])
+    profiler = ProfilingMiddleware(app.wsgi_app, directory, app.config['SECRET_KEY'],
+                                   app.config['PROFILE_SAMPLE_RATE'])
+    app.wsgi_app = profiler
+
+    def check_token():
+        if not valid_profile_token(app.config['SECRET_KEY'], request.headers.get(PROFILE_HEADER)):
+            abort(403)
+
+    @app.route('/profiles')
+    def profiles():
+        check_token()
+        return jsonify(profiles=profiler.captured())
+
+    @app.route('/profiles/<name>')
+    def profile(name: str):
+        check_token()
+        filename = os.path.join(directory, name)
+        if not re.fullmatch(r'[A-Za-z0-9_.-]+\.prof', name) or not os.path.isfile(filename):
+            abort(404)
+        # A limit that isn't a number falls back to the default rather than failing
+        limit = max(1, request.args.get('limit', TOP_FUNCTIONS, type=int))
+        return Response(top_functions(filename, limit), mimetype='text/plain')
+
+    @app.cli.command('profile-token')
+    def profile_token():
+        """Prints a token for the X-Flix-Profile header"""
+        print(make_profile_token(app.config['SECRET_KEY']))
+
+    return profiler
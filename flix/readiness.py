@@ -0,0 +1,76 @@
+import logging
+import threading
+
+from flask import Flask, Response, jsonify, request
+
+# Seconds clients are asked to wait before retrying while the catalogue loads
+RETRY_AFTER = 5
+
+# Endpoints served while the catalogue loads; metrics keep being scraped, so a slow load shows on the dashboards
+ALWAYS_SERVED = ('healthz', 'readyz', 'metrics', 'static')
+
+
+class Readiness:
+    """Whether the app has loaded its catalogue and can serve requests.
+
+    The catalogue is loaded either before the app starts serving (loaded() is called straight away) or on a
+    background thread by load_in_background, so the process answers health checks meanwhile."""
+
+    def __init__(self):
+        self.__loaded = threading.Event()
+        self.error = None
+
+    def loaded(self):
+        self.__loaded.set()
+
+    def is_ready(self) -> bool:
+        return self.__loaded.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Blocks until the catalogue is loaded or timeout seconds have passed, returning whether it is loaded"""
+        return self.__loaded.wait(timeout)
+
+    def load_in_background(self, load) -> threading.Thread:
+        """Calls load on a new thread, the app being ready once it returns"""
+        def run():
+            try:
+                load()
+            except Exception as e:
+                # The app stays unready, and /healthz reports the error so the process gets restarted
+                logging.getLogger(__name__).exception('Loading the catalogue failed')
+                self.error = e
+            else:
+                self.loaded()
+
+        thread = threading.Thread(target=run, name='catalogue-loader', daemon=True)
+        thread.start()
+        return thread
+
+
+def unavailable(response: Response) -> Response:
+    response.status_code = 503
+    response.headers['Retry-After'] = str(RETRY_AFTER)
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def init_app(app: Flask, readiness: Readiness):
+    """Serves /healthz (is the process alive) and /readyz (can it serve requests), and answers every other request
+    with a 503 and Retry-After until readiness is ready"""
+
+    @app.before_request
+    def wait_for_catalogue():
+        if not readiness.is_ready() and request.endpoint not in ALWAYS_SERVED:
+            return unavailable(Response('The catalogue is loading, please retry shortly\n', mimetype='text/plain'))
+
+    @app.route('/healthz')
+    def healthz():
+        if readiness.error is not None:
+            return jsonify(status='failed', error=repr(readiness.error)), 500
+        return jsonify(status='ok')
+
+    @app.route('/readyz')
+    def readyz():
+        if readiness.is_ready():
+            return jsonify(status='ready')
+        return unavailable(jsonify(status='failed' if readiness.error is not None else 'loading'))
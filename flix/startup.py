@@ -0,0 +1,29 @@
+import time
+
+
+class StartupTimer:
+    """Wall time of each phase of create_app, in the order they ran.
+
+    Each call to mark ends a phase, which started when the previous one ended."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.__last = self.start
+        self.__phases = list()
+
+    def mark(self, phase: str):
+        now = time.perf_counter()
+        self.__phases.append((phase, now - self.__last))
+        self.__last = now
+
+    def total(self) -> float:
+        return self.__last - self.start
+
+    def phases(self) -> dict:
+        """Returns {phase: seconds}"""
+        return dict(self.__phases)
+
+    def report(self) -> str:
+        lines = [f'{phase:<16}{seconds * 1000:>10.1f} ms' for phase, seconds in self.__phases]
+        lines.append(f"{'total':<16}{self.total() * 1000:>10.1f} ms")
+        return '\n'.join(lines)
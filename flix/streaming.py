@@ -0,0 +1,21 @@
+from flask import current_app, render_template, Response, stream_with_context
+
+# Number of template output pieces joined into each chunk sent to the client
+STREAM_BUFFER_SIZE = 32
+
+
+def stream_template(template_name: str, **context) -> Response:
+    """Renders a template piece by piece as the response is sent, so the top of the page (header, navigation) goes
+    out before the rest has been rendered, and iterables in context are consumed as the page is written"""
+    app = current_app._get_current_object()
+    app.update_template_context(context)
+    stream = app.jinja_env.get_template(template_name).stream(context)
+    stream.enable_buffering(STREAM_BUFFER_SIZE)
+    return Response(stream_with_context(stream), mimetype='text/html')
+
+
+def render_page(template_name: str, **context):
+    """Renders a page with stream_template when STREAM_TEMPLATES is set, otherwise with render_template"""
+    if current_app.config.get('STREAM_TEMPLATES'):
+        return stream_template(template_name, **context)
+    return render_template(template_name, **context)
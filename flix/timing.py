@@ -0,0 +1,211 @@
+import inspect
+import math
+import time
+import weakref
+from collections import deque
+from functools import wraps
+from threading import Lock
+from types import ModuleType
+
+from flask import Flask, abort, g, has_request_context, jsonify, request
+
+from flix import profiling
+
+# Layers a request passes through, outermost first. Each layer's time includes the time of the layers it calls.
+LAYERS = ('view', 'service', 'repository', 'template')
+
+# Number of recent requests kept per route for percentiles
+SAMPLES_PER_ROUTE = 1000
+
+PERCENTILES = (50, 90, 99)
+
+
+class RequestTimer:
+    """Time spent in each layer during one request.
+
+    Only the outermost call into a layer is timed, so a service calling another service isn't counted twice."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.totals = dict.fromkeys(LAYERS, 0.0)
+        self.calls = dict.fromkeys(LAYERS, 0)
+        self.depths = dict.fromkeys(LAYERS, 0)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def server_timing(self) -> str:
+        """Returns the timings as a Server-Timing header value, in milliseconds"""
+        metrics = [f'{layer};dur={self.totals[layer] * 1000:.2f};desc="{self.calls[layer]} calls"'
+                   for layer in LAYERS if self.calls[layer] > 0]
+        metrics.append(f'total;dur={self.elapsed() * 1000:.2f}')
+        return ', '.join(metrics)
+
+
+class TimingStats:
+    """Durations of recent requests per route and layer, from which percentiles are computed on demand"""
+
+    def __init__(self, samples: int = SAMPLES_PER_ROUTE):
+        self.__samples = samples
+        self.__durations = dict()
+        self.__lock = Lock()
+
+    def add(self, route: str, durations: dict):
+        with self.__lock:
+            route_durations = self.__durations.get(route)
+            if route_durations is None:
+                route_durations = {layer: deque(maxlen=self.__samples) for layer in durations}
+                self.__durations[route] = route_durations
+            for layer, duration in durations.items():
+                route_durations.setdefault(layer, deque(maxlen=self.__samples)).append(duration)
+
+    def clear(self):
+        with self.__lock:
+            self.__durations.clear()
+
+    def percentiles(self) -> dict:
+        """Returns {route: {layer: {'count': n, 'p50': ms, 'p90': ms, 'p99': ms}}}"""
+        with self.__lock:
+            snapshot = {route: {layer: sorted(durations) for layer, durations in layers.items()}
+                        for route, layers in self.__durations.items()}
+        return {route: {layer: summarise(durations) for layer, durations in layers.items() if durations}
+                for route, layers in snapshot.items()}
+
+
+def percentile(sorted_durations: list, p: float) -> float:
+    # Nearest rank
+    rank = max(1, math.ceil(p / 100 * len(sorted_durations)))
+    return sorted_durations[rank - 1]
+
+
+def summarise(sorted_durations: list) -> dict:
+    summary = {'count': len(sorted_durations)}
+    for p in PERCENTILES:
+        summary[f'p{p}'] = round(percentile(sorted_durations, p) * 1000, 3)
+    return summary
+
+
+def timed(function, layer: str):
+    """Returns function wrapped to add its duration to layer's time of the current request, if it is being timed"""
+    if getattr(function, '__timed_layer__', None) == layer:
+        return function
+
+    @wraps(function)
+    def timed_function(*args, **kwargs):
+        timer = g.get('request_timer') if has_request_context() else None
+        if timer is None or timer.depths[layer] > 0:
+            return function(*args, **kwargs)
+        timer.depths[layer] += 1
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            timer.totals[layer] += time.perf_counter() - start
+            timer.calls[layer] += 1
+            timer.depths[layer] -= 1
+
+    timed_function.__timed_layer__ = layer
+    return timed_function
+
+
+# Functions replaced by instrument, as (id(target), name) -> [target, name, original, wrapper, number of users]. The
+# original is None where the attribute came from the target's class
+_patches = dict()
+_patches_lock = Lock()
+
+
+def instrument(target, layer: str, names=None) -> list:
+    """Times calls to the public functions of a module, or the public methods of an object, as layer.
+
+    names limits this to the given attributes. Returns the patches made, which release undoes once every app that
+    asked for them has released them, so untimed apps created later call the functions directly."""
+    if names is None:
+        names = public_functions(target)
+    keys = list()
+    with _patches_lock:
+        for name in names:
+            key = (id(target), name)
+            patch = _patches.get(key)
+            if patch is None:
+                wrapper = timed(getattr(target, name), layer)
+                patch = [target, name, vars(target).get(name), wrapper, 0]
+                setattr(target, name, wrapper)
+                _patches[key] = patch
+            patch[4] += 1
+            keys.append(key)
+    return keys
+
+
+def release(keys: list):
+    """Undoes the patches of instrument that no other app is using"""
+    with _patches_lock:
+        for key in keys:
+            patch = _patches.get(key)
+            if patch is None:
+                continue
+            patch[4] -= 1
+            if patch[4] > 0:
+                continue
+            del _patches[key]
+            target, name, original, wrapper = patch[:4]
+            # Anything wrapped around the timing since (e.g. metrics) is left in place, calling straight through
+            if vars(target).get(name) is wrapper:
+                if original is None:
+                    delattr(target, name)
+                else:
+                    setattr(target, name, original)
+
+
+def public_functions(target) -> list:
+    """Returns the names of the public functions defined in a module, or of the public methods of an object"""
+    if isinstance(target, ModuleType):
+        names = [name for name, value in vars(target).items()
+                 if inspect.isfunction(value) and value.__module__ == target.__name__]
+    else:
+        names = [name for name, value in inspect.getmembers(type(target)) if inspect.isfunction(value)]
+    return [name for name in names if not name.startswith('_')]
+
+
+def init_app(app: Flask, repository, modules=(), template_modules=()):
+    """Times the views of app, the functions of modules (services), the methods of repository and the templates
+    rendered by template_modules (blueprints), adding a Server-Timing header to every response and serving
+    per-route percentiles at /timings, to requests carrying a profile token (see flix/profiling.py).
+
+    Only requests to app are timed; the functions are shared with other apps, which call straight through. The
+    patches are undone when app is garbage collected, or when app.extensions['timing'] is called.
+
+    Time spent streaming a response happens after its headers are sent, so it is only included in the header up
+    to the point the response was returned."""
+    stats = TimingStats()
+    for endpoint, view in list(app.view_functions.items()):
+        if endpoint != 'static':
+            app.view_functions[endpoint] = timed(view, 'view')
+    patches = list()
+    for module in modules:
+        patches += instrument(module, 'service')
+    patches += instrument(repository, 'repository')
+    for module in template_modules:
+        patches += instrument(module, 'template',
+                              [name for name in ('render_template', 'render_page') if hasattr(module, name)])
+    app.extensions['timing'] = weakref.finalize(app, release, patches)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_timer = RequestTimer()
+
+    @app.after_request
+    def add_server_timing(response):
+        timer = g.pop('request_timer', None)
+        if timer is not None:
+            response.headers['Server-Timing'] = timer.server_timing()
+            route = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            durations = {layer: timer.totals[layer] for layer in LAYERS if timer.calls[layer] > 0}
+            durations['total'] = timer.elapsed()
+            stats.add(route, durations)
+        return response
+
+    @app.route('/timings')
+    def timings():
+        if not profiling.valid_profile_token(app.config['SECRET_KEY'], request.headers.get(profiling.PROFILE_HEADER)):
+            abort(403)
+        return jsonify(stats.percentiles())
@@ -0,0 +1,239 @@
+import argparse
+import inspect
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker, clear_mappers
+from sqlalchemy.pool import NullPool
+
+from flix.adapters import memory_repository, database_repository
+from flix.adapters.orm import metadata, map_model_to_tables
+from flix.adapters.repository import AbstractRepository
+from flix.domain.model import Actor, Director, Genre, Movie, User, make_review
+from flix.timing import percentile
+from tests.benchmarks import synthetic_catalog
+
+BACKENDS = ('memory', 'database')
+
+# Catalogue sizes run by default. 100000 and 1000000 movies take minutes to load (much longer for the memory
+# backend), so they are only run when asked for with --sizes
+DEFAULT_SIZES = (1000, 10000)
+
+# Seconds spent calling each method, after an untimed first call that builds whatever the method builds lazily
+TIME_PER_METHOD = 1.0
+MIN_CALLS = 3
+MAX_CALLS = 10000
+
+BENCHMARK_USER = 'benchmark'
+
+
+def load_repository(backend: str, data_path: str, directory: str):
+    """Returns (repository, close) for backend loaded from the movies.csv in data_path, the way create_app loads it,
+    along with the synthetic users, reviews and watchlists there"""
+    if backend == 'memory':
+        repository = memory_repository.MemoryRepository()
+        memory_repository.populate(data_path, repository)
+        synthetic_catalog.load_activity(data_path, repository)
+        repository.add_user(User(BENCHMARK_USER, 'Benchmark1'))
+        return repository, lambda: None
+
+    engine = create_engine('sqlite:///' + os.path.join(directory, 'benchmark.db'),
+                           connect_args={"check_same_thread": False}, poolclass=NullPool)
+    clear_mappers()
+    metadata.create_all(engine)
+    map_model_to_tables()
+    database_repository.populate(engine, data_path)
+    synthetic_catalog.populate_activity(engine, data_path)
+    repository = database_repository.SqlAlchemyRepository(
+        sessionmaker(autocommit=False, autoflush=True, bind=engine))
+    repository.add_user(User(BENCHMARK_USER, 'Benchmark1'))
+
+    def close():
+        repository.close_session()
+        engine.dispose()
+        clear_mappers()
+    return repository, close
+
+
+def benchmarks(repository, size: int) -> list:
+    """Returns (method name, call) for every repository method, where call(i) makes the i-th call.
+
+    Reads come first; writes follow in an order that leaves the repository usable, with add_movie last as it
+    invalidates the indexes the reads use."""
+    movie = repository.get_movie(size // 2 + 1)
+    letter = movie.get_first_letter()
+    genre = movie.genres[0]
+    actor = movie.actors[0].actor_full_name
+    director = movie.director.director_full_name
+
+    def add_movie(i):
+        new_movie = Movie(f'Benchmark movie {i}', 2020, size + i + 1)
+        new_movie.description = 'A movie added by the benchmarks.'
+        new_movie.runtime_minutes = 100
+        repository.add_movie(new_movie)
+
+    def add_review(i):
+        user = repository.get_user(BENCHMARK_USER)
+        review = make_review(f'Benchmark review {i}', user, repository.get_movie(i % size + 1), i % 10 + 1,
+                             datetime.now())
+        repository.add_review(review)
+
+    return [
+        ('get_user', lambda i: repository.get_user(BENCHMARK_USER)),
+        ('get_movie', lambda i: repository.get_movie(i % size + 1)),
+        ('iter_movies', lambda i: sum(1 for _ in repository.iter_movies())),
+        ('get_movies_by_letter', lambda i: repository.get_movies_by_letter(letter)),
+        ('get_number_of_movies', lambda i: repository.get_number_of_movies()),
+        ('get_first_movie', lambda i: repository.get_first_movie()),
+        ('get_first_letter', lambda i: repository.get_first_letter(i % size + 1)),
+        ('get_last_movie', lambda i: repository.get_last_movie()),
+        ('get_movies_from_year', lambda i: repository.get_movies_from_year(movie.year)),
+        ('get_letter_of_next_movie', lambda i: repository.get_letter_of_next_movie(movie)),
+        ('get_letter_of_previous_movie', lambda i: repository.get_letter_of_previous_movie(movie)),
+        ('get_all_letters', lambda i: repository.get_all_letters()),
+        ('alphabet', lambda i: repository.alphabet()),
+        ('get_movies_from_genre', lambda i: repository.get_movies_from_genre(genre)),
+        ('get_genres', lambda i: repository.get_genres()),
+        ('get_reviews', lambda i: repository.get_reviews()),
+        ('get_actors', lambda i: repository.get_actors()),
+        ('get_directors', lambda i: repository.get_directors()),
+        ('get_actor', lambda i: repository.get_actor(actor)),
+        ('get_director', lambda i: repository.get_director(director)),
+        ('get_data_version', lambda i: repository.get_data_version()),
+        ('get_bitmap_index', lambda i: repository.get_bitmap_index()),
+        ('get_recommender', lambda i: repository.get_recommender()),
+        ('get_description_index', lambda i: repository.get_description_index()),
+        ('get_costar_graph', lambda i: repository.get_costar_graph()),
+        ('get_rankings', lambda i: repository.get_rankings()),
+        ('get_number_of_reviews', lambda i: repository.get_number_of_reviews()),
+        ('get_number_of_users', lambda i: repository.get_number_of_users()),
+        ('get_movie_statistics', lambda i: repository.get_movie_statistics('genre')),
+        ('get_review_activity', lambda i: repository.get_review_activity()),
+        ('add_user', lambda i: repository.add_user(User(f'benchmark{i}', 'Benchmark1'))),
+        ('add_review', add_review),
+        ('add_to_watchlist', lambda i: repository.add_to_watchlist(BENCHMARK_USER, i % size + 1)),
+        ('remove_from_watchlist', lambda i: repository.remove_from_watchlist(BENCHMARK_USER, i % size + 1)),
+        ('add_genre', lambda i: repository.add_genre(Genre(f'Benchmark genre {i}'))),
+        ('add_actor', lambda i: repository.add_actor(Actor(f'Benchmark Actor {i}'))),
+        ('add_director', lambda i: repository.add_director(Director(f'Benchmark Director {i}'))),
+        ('add_movie', add_movie)
+    ]
+
+
+def repository_methods() -> list:
+    return sorted(name for name, value in inspect.getmembers(AbstractRepository, inspect.isfunction)
+                  if not name.startswith('_'))
+
+
+def time_calls(call, time_per_method: float = TIME_PER_METHOD) -> dict:
+    """Calls call once untimed, then repeatedly for about time_per_method seconds, and returns the throughput and
+    latency percentiles of the timed calls"""
+    start = time.perf_counter()
+    call(0)
+    first_call = time.perf_counter() - start
+
+    durations = list()
+    total = 0.0
+    while len(durations) < MIN_CALLS or (total < time_per_method and len(durations) < MAX_CALLS):
+        start = time.perf_counter()
+        call(len(durations) + 1)
+        duration = time.perf_counter() - start
+        durations.append(duration)
+        total += duration
+
+    durations.sort()
+    return {
+        'calls': len(durations),
+        'ops_per_sec': round(len(durations) / total, 2) if total > 0 else None,
+        'p50_ms': round(percentile(durations, 50) * 1000, 4),
+        'p99_ms': round(percentile(durations, 99) * 1000, 4),
+        'first_call_ms': round(first_call * 1000, 4)
+    }
+
+
+def run(backends=BACKENDS, sizes=DEFAULT_SIZES, methods=None, time_per_method: float = TIME_PER_METHOD, seed: int = 0,
+        report=None) -> dict:
+    """Benchmarks the repository methods (all of them, or those named in methods) of each backend with a synthetic
+    catalogue of each size, generated from seed.
+
+    report, if given, is called with each result as it is measured"""
+    results = list()
+    loads = list()
+    benchmarked = set()
+
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            synthetic_catalog.generate(directory, size, seed)
+            for backend in backends:
+                start = time.perf_counter()
+                repository, close = load_repository(backend, directory, directory)
+                loads.append({'backend': backend, 'size': size, 'seconds': round(time.perf_counter() - start, 3)})
+                try:
+                    for method, call in benchmarks(repository, size):
+                        if methods and method not in methods:
+                            continue
+                        benchmarked.add(method)
+                        result = {'backend': backend, 'size': size, 'method': method}
+                        try:
+                            result.update(time_calls(call, time_per_method))
+                        except Exception as e:
+                            result['error'] = repr(e)
+                        results.append(result)
+                        if report is not None:
+                            report(result)
+                finally:
+                    close()
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'time_per_method': time_per_method,
+        'seed': seed,
+        'loads': loads,
+        'results': results,
+        'untimed': [method for method in repository_methods()
+                    if method not in benchmarked and (not methods or method in methods)]
+    }
+
+
+def format_result(result: dict) -> str:
+    prefix = f"{result['backend']:<9}{result['size']:>9}  {result['method']:<30}"
+    if 'error' in result:
+        return f"{prefix}failed: {result['error']}"
+    return f"{prefix}{result['ops_per_sec']:>12.1f} ops/s  p50 {result['p50_ms']:>10.3f} ms  " \
+           f"p99 {result['p99_ms']:>10.3f} ms"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks the repository methods of each backend.')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES,
+                        help='numbers of movies, e.g. 1000 10000 100000 1000000')
+    parser.add_argument('--methods', nargs='+', help='only benchmark these repository methods')
+    parser.add_argument('--time-per-method', type=float, default=TIME_PER_METHOD,
+                        help='seconds spent calling each method')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic catalogues')
+    parser.add_argument('--output', default='benchmarks.json', help='file the results are written to, as JSON')
+    args = parser.parse_args(argv)
+
+    results = run(args.backends, args.sizes, args.methods, args.time_per_method, args.seed,
+                  report=lambda result: print(format_result(result), flush=True))
+    for load in results['loads']:
+        print(f"loaded {load['backend']} with {load['size']} movies in {load['seconds']} s")
+    if results['untimed']:
+        print('not benchmarked: ' + ', '.join(results['untimed']), file=sys.stderr)
+
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from statistics import median
+
+from flix.timing import percentile
+from tests.benchmarks import synthetic_catalog
+
+BACKENDS = ('memory', 'database')
+
+DEFAULT_SIZES = (1000,)
+
+# Processes started per backend and size
+RUNS = 5
+
+# Run in a new interpreter each time, so imports are timed as a worker would pay for them
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+from flix import create_app
+imported = time.perf_counter()
+app = create_app(json.loads(sys.argv[1]))
+phases = {'import': imported - start}
+phases.update(app.extensions['startup'].phases())
+print(json.dumps(phases))
+"""
+
+
+def start_app(config: dict) -> dict:
+    """Starts the app with config in a new process, returning the wall time of the whole process and the time of
+    importing flix and of each phase of create_app, in seconds"""
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, '-c', CHILD, json.dumps(config)], capture_output=True, text=True,
+                               check=True)
+    wall = time.perf_counter() - start
+    # create_app may print too, so the phases are the last line
+    phases = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {'wall': wall, 'phases': phases}
+
+
+def summarise_runs(backend: str, size: int, method: str, runs: list) -> dict:
+    walls = sorted(run['wall'] for run in runs)
+    return {
+        'backend': backend,
+        'size': size,
+        'method': method,
+        'calls': len(runs),
+        'ops_per_sec': round(len(walls) / sum(walls), 4),
+        'p50_ms': round(percentile(walls, 50) * 1000, 2),
+        'p99_ms': round(percentile(walls, 99) * 1000, 2),
+        'phases_ms': {phase: round(median(run['phases'][phase] for run in runs) * 1000, 2)
+                      for phase in runs[0]['phases']}
+    }
+
+
+def run(backends=BACKENDS, sizes=DEFAULT_SIZES, runs: int = RUNS, seed: int = 0, report=None) -> dict:
+    """Times starting the app in a new process, runs times for each backend with a synthetic catalogue of each size.
+
+    'start' is a start with the catalogue already loaded where the backend allows it, as when a worker restarts. For
+    the database backend, 'start_populating' is the first start, which populates a new database"""
+    results = list()
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            synthetic_catalog.generate(directory, size, seed)
+            for backend in backends:
+                config = {
+                    'REPOSITORY': backend,
+                    'TEST_DATA_PATH': directory,
+                    'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + os.path.join(directory, 'startup.db'),
+                    'SQLALCHEMY_ECHO': False
+                }
+                if backend == 'database':
+                    summary = summarise_runs(backend, size, 'start_populating', [start_app(config)])
+                    results.append(summary)
+                    if report is not None:
+                        report(summary)
+                summary = summarise_runs(backend, size, 'start', [start_app(config) for _ in range(runs)])
+                results.append(summary)
+                if report is not None:
+                    report(summary)
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': seed,
+        'results': results
+    }
+
+
+def format_result(result: dict) -> str:
+    phases = '  '.join(f'{phase} {milliseconds:.0f}' for phase, milliseconds in result['phases_ms'].items())
+    return f"{result['backend']:<9}{result['size']:>9}  {result['method']:<18}p50 {result['p50_ms']:>9.1f} ms  " \
+           f"p99 {result['p99_ms']:>9.1f} ms  ({phases} ms)"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Times starting the app in a new process.')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=BACKENDS)
+    parser.add_argument('--sizes', nargs='+', type=int, default=DEFAULT_SIZES, help='numbers of movies')
+    parser.add_argument('--runs', type=int, default=RUNS, help='starts timed per backend and size')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic catalogues')
+    parser.add_argument('--output', default='startup.json', help='file the results are written to, as JSON')
+    args = parser.parse_args(argv)
+
+    results = run(args.backends, args.sizes, args.runs, args.seed,
+                  report=lambda result: print(format_result(result), flush=True))
+    with open(args.output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f'results written to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import argparse
+import json
+import sys
+
+# Relative change in throughput and median latency reported as a regression
+THRESHOLD = 0.25
+
+# Calls with a median below this many milliseconds are mostly timer overhead, and too noisy to compare
+NOISE_FLOOR_MS = 0.01
+
+
+def key(result: dict) -> tuple:
+    return result['backend'], result['size'], result['method']
+
+
+def compare(baseline: dict, current: dict, threshold: float = THRESHOLD) -> list:
+    """Compares the results of two benchmark runs, returning a dict per method benchmarked in both with the relative
+    change in throughput, median and p99 latency, and whether it is a regression: throughput down and median latency
+    up, both by more than threshold. Requiring both keeps one noisy measure from flagging a method, and p99 is
+    reported but not judged as a few slow calls move it a lot. A method that failed in the current run but not the
+    baseline is a regression too"""
+    baseline_results = {key(result): result for result in baseline['results']}
+    comparisons = list()
+
+    for result in current['results']:
+        before = baseline_results.get(key(result))
+        if before is None or 'error' in before:
+            continue
+
+        comparison = {'backend': result['backend'], 'size': result['size'], 'method': result['method']}
+        if 'error' in result:
+            comparison.update(ops_change=None, p50_change=None, p99_change=None, regression=True,
+                              error=result['error'])
+        else:
+            comparison['ops_change'] = relative_change(before['ops_per_sec'], result['ops_per_sec'])
+            comparison['p50_change'] = relative_change(before['p50_ms'], result['p50_ms'])
+            comparison['p99_change'] = relative_change(before['p99_ms'], result['p99_ms'])
+            comparison['regression'] = result['p50_ms'] >= NOISE_FLOOR_MS and \
+                comparison['ops_change'] is not None and comparison['ops_change'] < -threshold and \
+                comparison['p50_change'] is not None and comparison['p50_change'] > threshold
+        comparisons.append(comparison)
+
+    return comparisons
+
+
+def relative_change(before, after):
+    if not before or after is None:
+        return None
+    return (after - before) / before
+
+
+def format_change(change) -> str:
+    return f'{change:+8.1%}' if change is not None else f"{'n/a':>8}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compares benchmark results with a baseline, exiting with status 1 '
+                                                 'if any method regressed.')
+    parser.add_argument('baseline', help='results of the baseline run')
+    parser.add_argument('current', help='results of the run being checked')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative change counted as a regression, e.g. 0.25 for 25%%')
+    args = parser.parse_args(argv)
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    with open(args.current) as file:
+        current = json.load(file)
+
+    comparisons = compare(baseline, current, args.threshold)
+    for comparison in comparisons:
+        flag = 'REGRESSION' if comparison['regression'] else ''
+        print(f"{comparison['backend']:<9}{comparison['size']:>9}  {comparison['method']:<30}"
+              f"ops/s {format_change(comparison['ops_change'])}  p50 {format_change(comparison['p50_change'])}  "
+              f"p99 {format_change(comparison['p99_change'])}  "
+              f"{comparison.get('error', flag)}")
+
+    regressions = [comparison for comparison in comparisons if comparison['regression']]
+    print(f'{len(regressions)} regressions in {len(comparisons)} methods compared')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
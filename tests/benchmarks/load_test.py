@@ -0,0 +1,298 @@
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.cookiejar import CookieJar
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import HTTPCookieProcessor, HTTPRedirectHandler, build_opener
+
+from sqlalchemy import create_engine
+from werkzeug.serving import make_server
+
+from flix import create_app
+from flix.adapters import repository as repo
+from flix.timing import summarise
+from tests.benchmarks import synthetic_catalog
+
+BACKENDS = ('memory', 'database')
+
+# Relative weights of the scenarios each simulated user picks from, one after the other
+TRAFFIC_MIX = {'browse': 50, 'search': 25, 'watchlist': 15, 'review': 10}
+
+# Statuses of a successful request; the app redirects after logging in, toggling the watchlist and reviewing
+OK_STATUSES = (200, 302, 304)
+
+CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+
+ALPHABET = ['Numbers'] + [chr(ord('A') + i) for i in range(26)]
+
+TIMEOUT = 30
+
+
+class NoRedirectHandler(HTTPRedirectHandler):
+    # Redirects are timed as their own requests, as a browser would make them
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Recorder:
+    """Durations and statuses of the requests made during a load test, per route"""
+
+    def __init__(self):
+        self.__requests = dict()
+        self.__failures = list()
+        self.__lock = threading.Lock()
+
+    def add(self, route: str, duration: float, status: int):
+        with self.__lock:
+            self.__requests.setdefault(route, list()).append((duration, status))
+
+    def fail(self, username: str, error: Exception):
+        """Records a simulated user that stopped because of error"""
+        with self.__lock:
+            self.__failures.append({'user': username, 'error': repr(error)})
+
+    def report(self, elapsed: float) -> dict:
+        with self.__lock:
+            requests = {route: list(route_requests) for route, route_requests in self.__requests.items()}
+            failures = list(self.__failures)
+
+        routes = dict()
+        for route, route_requests in sorted(requests.items()):
+            summary = summarise(sorted(duration for duration, status in route_requests))
+            summary['errors'] = sum(1 for duration, status in route_requests if status not in OK_STATUSES)
+            summary['throughput'] = round(len(route_requests) / elapsed, 2)
+            routes[route] = summary
+        total = sum(len(route_requests) for route_requests in requests.values())
+        return {
+            'elapsed': round(elapsed, 3),
+            'requests': total,
+            # A user that stopped counts as an error, however many of its requests succeeded
+            'errors': sum(summary['errors'] for summary in routes.values()) + len(failures),
+            'failures': failures,
+            'throughput': round(total / elapsed, 2) if elapsed > 0 else None,
+            'routes': routes
+        }
+
+
+class SimulatedUser:
+    """A logged in user with their own session cookie, making the requests of one scenario at a time"""
+
+    def __init__(self, base_url: str, username: str, counts: dict, recorder: Recorder, rng: random.Random):
+        self.base_url = base_url
+        self.username = username
+        self.counts = counts
+        self.recorder = recorder
+        self.rng = rng
+        self.watchlist = set()
+        self.opener = build_opener(HTTPCookieProcessor(CookieJar()), NoRedirectHandler())
+
+    def request(self, path: str, params: dict = None, form: dict = None) -> tuple:
+        url = self.base_url + path + ('?' + urlencode(params) if params else '')
+        data = urlencode(form).encode('utf-8') if form is not None else None
+        route = ('POST ' if data is not None else 'GET ') + path
+        start = time.perf_counter()
+        try:
+            with self.opener.open(url, data, timeout=TIMEOUT) as response:
+                body = response.read().decode('utf-8')
+                status = response.status
+        except HTTPError as e:
+            body = e.read().decode('utf-8', 'replace')
+            status = e.code
+        except (URLError, OSError):
+            body = ''
+            status = 0
+        self.recorder.add(route, time.perf_counter() - start, status)
+        return status, body
+
+    def csrf_token(self, page: str) -> str:
+        match = CSRF_TOKEN.search(page)
+        return match.group(1) if match else ''
+
+    def movie_id(self) -> int:
+        return self.rng.randint(1, self.counts['movies'])
+
+    def popular_name(self, first_names=synthetic_catalog.FIRST_NAMES) -> str:
+        # The most popular actors and directors are the first names the catalogue hands out
+        return synthetic_catalog.person_name(self.rng.randrange(20), first_names)
+
+    def login(self):
+        status, page = self.request('/authentication/login')
+        status, page = self.request('/authentication/login', form={
+            'csrf_token': self.csrf_token(page),
+            'username': self.username,
+            'password': synthetic_catalog.SYNTHETIC_PASSWORD
+        })
+        # The login page is shown again if logging in failed
+        if status != 302:
+            raise RuntimeError(f'Could not log in as {self.username}: status {status}')
+
+    def browse(self):
+        self.request('/')
+        self.request('/movies_by_letter', {'letter': self.rng.choice(ALPHABET)})
+        self.request('/movie', {'movie_id': self.movie_id()})
+
+    def search(self):
+        field, value = self.rng.choice((
+            ('search_genre', self.rng.choice(list(synthetic_catalog.GENRES))),
+            ('search_actor', self.popular_name()),
+            ('search_director', self.popular_name(synthetic_catalog.FIRST_NAMES[::-1]))
+        ))
+        self.request('/search', {field: value})
+
+    def watchlist_toggle(self):
+        movie_id = self.movie_id()
+        if movie_id in self.watchlist:
+            self.watchlist.remove(movie_id)
+            self.request('/movie', {'movie_id': movie_id, 'in_watchlist': -1})
+        else:
+            self.watchlist.add(movie_id)
+            self.request('/movie', {'movie_id': movie_id, 'in_watchlist': 1})
+        self.request('/movie', {'movie_id': movie_id, 'view_reviews_for': -1})
+
+    def review(self):
+        movie_id = self.movie_id()
+        status, page = self.request('/review', {'movie_id': movie_id})
+        self.request('/review', form={
+            'csrf_token': self.csrf_token(page),
+            'review': self.rng.choice(synthetic_catalog.REVIEW_TEXTS),
+            'rating': self.rng.randint(1, 10),
+            'movie_id': movie_id
+        })
+        self.request('/movie', {'movie_id': movie_id, 'view_reviews_for': movie_id})
+
+
+SCENARIOS = {
+    'browse': SimulatedUser.browse,
+    'search': SimulatedUser.search,
+    'watchlist': SimulatedUser.watchlist_toggle,
+    'review': SimulatedUser.review
+}
+
+
+def parse_mix(mix: str) -> dict:
+    """Parses a traffic mix such as 'browse=50,search=25' into {'browse': 50, 'search': 25}"""
+    weights = dict()
+    for part in mix.split(','):
+        scenario, weight = part.split('=')
+        if scenario.strip() not in SCENARIOS:
+            raise ValueError(f'Unknown scenario {scenario.strip()}, expected one of {", ".join(SCENARIOS)}')
+        weights[scenario.strip()] = float(weight)
+    return weights
+
+
+def build_app(backend: str, data_path: str, directory: str):
+    """Returns the app for backend with the synthetic catalogue and activity in data_path"""
+    database_uri = 'sqlite:///' + os.path.join(directory, 'load_test.db')
+    app = create_app({
+        'REPOSITORY': backend,
+        'TEST_DATA_PATH': data_path,
+        'SQLALCHEMY_DATABASE_URI': database_uri,
+        'SQLALCHEMY_ECHO': False
+    })
+    if backend == 'memory':
+        synthetic_catalog.load_activity(data_path, repo.repo_instance)
+    else:
+        engine = create_engine(database_uri)
+        synthetic_catalog.populate_activity(engine, data_path)
+        engine.dispose()
+    return app
+
+
+def run(backend: str = 'memory', movies: int = 1000, concurrency: int = 8, duration: float = 10.0,
+        scenarios_per_user: int = None, mix: dict = None, processes: int = 1, seed: int = 0) -> dict:
+    """Serves the app for backend with a synthetic catalogue of movies movies on a local threaded (or, with processes
+    above 1, forking) server, and has concurrency simulated users replay the traffic mix against it for duration
+    seconds, or until each has run scenarios_per_user scenarios. Returns the throughput and latency percentiles of
+    each route"""
+    mix = mix or TRAFFIC_MIX
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)
+
+    with tempfile.TemporaryDirectory() as directory:
+        counts = synthetic_catalog.generate(directory, movies, seed, users=max(concurrency, int(movies * 0.1)))
+        app = build_app(backend, directory, directory)
+        server = make_server('127.0.0.1', 0, app, threaded=processes <= 1, processes=max(1, processes))
+        server_thread = threading.Thread(target=server.serve_forever, daemon=True)
+        server_thread.start()
+        base_url = f'http://127.0.0.1:{server.server_port}'
+
+        recorder = Recorder()
+        scenarios = list(mix)
+        weights = [mix[scenario] for scenario in scenarios]
+        start = time.perf_counter()
+        deadline = start + duration if duration else None
+
+        def simulate(number: int):
+            rng = random.Random(seed * 1000 + number)
+            user = SimulatedUser(base_url, f'user{number % counts["users"] + 1:07d}', counts, recorder, rng)
+            # Nothing joins on the outcome of a thread, so a user that stops is recorded rather than raised
+            try:
+                user.login()
+                made = 0
+                while (deadline is None or time.perf_counter() < deadline) and \
+                        (scenarios_per_user is None or made < scenarios_per_user):
+                    SCENARIOS[rng.choices(scenarios, weights)[0]](user)
+                    made += 1
+            except Exception as e:
+                recorder.fail(user.username, e)
+
+        clients = [threading.Thread(target=simulate, args=(number,)) for number in range(concurrency)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join()
+        elapsed = time.perf_counter() - start
+
+        server.shutdown()
+        server.server_close()
+
+    report = recorder.report(elapsed)
+    report.update(backend=backend, movies=movies, concurrency=concurrency, processes=processes, mix=mix)
+    return report
+
+
+def format_report(report: dict) -> str:
+    lines = [f"{'route':<34}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}"]
+    for route, summary in report['routes'].items():
+        lines.append(f"{route:<34}{summary['count']:>9}{summary['errors']:>8}{summary['throughput']:>9.1f}"
+                     f"{summary['p50']:>10.1f}{summary['p90']:>10.1f}{summary['p99']:>10.1f}")
+    for failure in report['failures']:
+        lines.append(f"{failure['user']} stopped: {failure['error']}")
+    lines.append(f"{report['requests']} requests, {report['errors']} errors in {report['elapsed']} s: "
+                 f"{report['throughput']} requests/s with {report['concurrency']} users against the "
+                 f"{report['backend']} repository")
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load tests the app on a local server with simulated users.')
+    parser.add_argument('--backend', choices=BACKENDS, default='memory')
+    parser.add_argument('--movies', type=int, default=1000, help='size of the synthetic catalogue')
+    parser.add_argument('--concurrency', type=int, default=8, help='number of simulated users')
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds to run for')
+    parser.add_argument('--scenarios-per-user', type=int, help='scenarios each user runs, instead of a duration')
+    parser.add_argument('--mix', type=parse_mix, default=TRAFFIC_MIX,
+                        help='weights of the scenarios, e.g. browse=50,search=25,watchlist=15,review=10')
+    parser.add_argument('--processes', type=int, default=1, help='serve from forked processes instead of threads')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='file the report is written to, as JSON')
+    args = parser.parse_args(argv)
+
+    report = run(args.backend, args.movies, args.concurrency, None if args.scenarios_per_user else args.duration,
+                 args.scenarios_per_user, args.mix, args.processes, args.seed)
+    print(format_report(report))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    return 1 if report['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
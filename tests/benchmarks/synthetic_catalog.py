@@ -0,0 +1,369 @@
+import argparse
+import csv
+import os
+import random
+from bisect import bisect
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy.engine import Engine
+from werkzeug.security import generate_password_hash
+
+from flix.domain.model import User, make_review
+
+MOVIE_FIELDS = ('Rank', 'Title', 'Genre', 'Description', 'Director', 'Actors', 'Year', 'Runtime (Minutes)', 'Rating',
+                'Votes', 'Revenue (Millions)', 'Metascore')
+
+# Every synthetic user has this password, so load tests can log in as any of them
+SYNTHETIC_PASSWORD = 'Synthetic123'
+
+# Number of movies starting with each letter (or digit) in flix/adapters/data/movies.csv. 'The ...' makes T the most
+# common by far
+FIRST_LETTERS = {
+    'A': 50, 'B': 47, 'C': 45, 'D': 41, 'E': 24, 'F': 34, 'G': 24, 'H': 39, 'I': 40, 'J': 16, 'K': 17, 'L': 40,
+    'M': 57, 'N': 19, 'O': 12, 'P': 42, 'Q': 2, 'R': 29, 'S': 82, 'T': 253, 'U': 11, 'V': 7, 'W': 30, 'X': 5, 'Y': 4,
+    'Z': 7, '1': 7, '2': 7, '3': 5, '4': 1, '5': 2
+}
+
+# Share of the movies starting with T whose title starts with 'The'
+THE_SHARE = 0.8
+
+# Number of movies in each genre in flix/adapters/data/movies.csv
+GENRES = {
+    'Drama': 513, 'Action': 303, 'Comedy': 279, 'Adventure': 259, 'Thriller': 195, 'Crime': 150, 'Romance': 141,
+    'Sci-Fi': 120, 'Horror': 119, 'Mystery': 106, 'Fantasy': 101, 'Biography': 81, 'Family': 51, 'Animation': 49,
+    'History': 29, 'Sport': 18, 'Music': 16, 'War': 13, 'Western': 7, 'Musical': 5
+}
+
+# Number of movies with one, two and three genres
+GENRES_PER_MOVIE = {1: 105, 2: 235, 3: 660}
+
+ACTORS_PER_MOVIE = 4
+
+# Number of movies released each year
+YEARS = {2006: 44, 2007: 53, 2008: 52, 2009: 51, 2010: 60, 2011: 63, 2012: 64, 2013: 91, 2014: 98, 2015: 127,
+         2016: 297}
+
+# Exponent of the Zipf distributions: the k-th most popular actor is in about 1 / k ** exponent as many movies as
+# the most popular one
+ACTOR_EXPONENT = 0.6
+DIRECTOR_EXPONENT = 0.6
+REVIEWER_EXPONENT = 1.0
+MOVIE_EXPONENT = 1.0
+
+# Distinct actors and directors per movie in the catalogue
+ACTORS_PER_MOVIE_RATIO = 2.0
+DIRECTORS_PER_MOVIE_RATIO = 0.65
+
+# Defaults for the activity generated with a catalogue: users per movie, and reviews and watchlist entries per user
+USERS_PER_MOVIE = 0.1
+REVIEWS_PER_USER = 5
+WATCHLIST_ENTRIES_PER_USER = 3
+
+REVIEWS_START = datetime(2020, 1, 1)
+REVIEWS_PERIOD = timedelta(days=366)
+
+WORDS = {
+    'A': ('Absolute', 'After', 'Alien', 'American', 'Angel', 'Arrival', 'Assassin', 'Avenger'),
+    'B': ('Back', 'Bad', 'Beast', 'Beyond', 'Black', 'Blood', 'Broken', 'Brother'),
+    'C': ('Captain', 'City', 'Code', 'Cold', 'Cowboy', 'Crimson', 'Crossing', 'Curse'),
+    'D': ('Dark', 'Dawn', 'Dead', 'Deep', 'Desert', 'Devil', 'Dream', 'Drive'),
+    'E': ('Eagle', 'Echo', 'Edge', 'Empire', 'End', 'Escape', 'Every', 'Exit'),
+    'F': ('Fallen', 'Family', 'Fast', 'Fire', 'First', 'Forest', 'Fury', 'Future'),
+    'G': ('Game', 'Ghost', 'Girl', 'Glass', 'Gold', 'Gone', 'Grand', 'Green'),
+    'H': ('Hacksaw', 'Half', 'Heart', 'Heaven', 'Hidden', 'Home', 'House', 'Hunter'),
+    'I': ('Ice', 'Identity', 'Immortal', 'Inside', 'Into', 'Iron', 'Island', 'Ivory'),
+    'J': ('Jack', 'Jade', 'Jet', 'Joker', 'Journey', 'Joy', 'Judge', 'Jungle'),
+    'K': ('Keeper', 'Kick', 'Kid', 'Kill', 'King', 'Kingdom', 'Kiss', 'Knight'),
+    'L': ('Lady', 'Land', 'Last', 'Legend', 'Light', 'Lion', 'Lost', 'Love'),
+    'M': ('Machine', 'Man', 'Midnight', 'Mirror', 'Mission', 'Money', 'Moon', 'Murder'),
+    'N': ('Naked', 'Never', 'New', 'Night', 'Nine', 'Noble', 'North', 'Nowhere'),
+    'O': ('Ocean', 'Old', 'Omega', 'On', 'One', 'Orbit', 'Origin', 'Outlaw'),
+    'P': ('Paper', 'Paradise', 'Perfect', 'Phantom', 'Planet', 'Point', 'Power', 'Prisoner'),
+    'Q': ('Quantum', 'Queen', 'Quest', 'Quick', 'Quiet'),
+    'R': ('Rain', 'Red', 'Return', 'Revenge', 'Rising', 'River', 'Road', 'Rogue'),
+    'S': ('Secret', 'Shadow', 'Silent', 'Sky', 'Snow', 'Star', 'Storm', 'Summer'),
+    'T': ('Tale', 'Ten', 'Thunder', 'Time', 'Tomorrow', 'Tower', 'Trouble', 'True'),
+    'U': ('Ultimate', 'Under', 'Undone', 'Unknown', 'Until', 'Upside', 'Urban', 'Utopia'),
+    'V': ('Valley', 'Velvet', 'Vengeance', 'Venom', 'Victory', 'Vision', 'Voice', 'Voyage'),
+    'W': ('War', 'Warrior', 'Water', 'West', 'White', 'Wild', 'Winter', 'World'),
+    'X': ('X-Ray', 'Xanadu', 'Xenon', 'Xtreme'),
+    'Y': ('Year', 'Yellow', 'Yesterday', 'Young', 'Youth'),
+    'Z': ('Zero', 'Zodiac', 'Zombie', 'Zone', 'Zulu')
+}
+ALL_WORDS = tuple(word for words in WORDS.values() for word in words)
+
+FIRST_NAMES = ('Adam', 'Alice', 'Amy', 'Anna', 'Ben', 'Bradley', 'Carla', 'Chris', 'Daniel', 'Diane', 'Emma', 'Ethan',
+               'Frank', 'Grace', 'Hannah', 'Henry', 'Isaac', 'Jack', 'James', 'Jessica', 'John', 'Julia', 'Kate',
+               'Kevin', 'Laura', 'Leo', 'Lily', 'Lucas', 'Maria', 'Mark', 'Mia', 'Michael', 'Nina', 'Noah', 'Olivia',
+               'Oscar', 'Paul', 'Rachel', 'Robert', 'Rose', 'Ryan', 'Sam', 'Sarah', 'Scott', 'Sofia', 'Thomas',
+               'Tom', 'Victor', 'Zoe')
+LAST_NAMES = ('Adams', 'Baker', 'Bell', 'Brooks', 'Brown', 'Carter', 'Clark', 'Collins', 'Cooper', 'Davis', 'Diaz',
+              'Edwards', 'Evans', 'Fisher', 'Foster', 'Garcia', 'Gray', 'Green', 'Hall', 'Harris', 'Hughes', 'Jones',
+              'Kelly', 'King', 'Lee', 'Lewis', 'Martin', 'Miller', 'Moore', 'Morgan', 'Murphy', 'Nelson', 'Parker',
+              'Perry', 'Price', 'Reed', 'Reyes', 'Roberts', 'Ross', 'Russell', 'Scott', 'Shaw', 'Smith', 'Stone',
+              'Taylor', 'Turner', 'Walker', 'Ward', 'Watson', 'White', 'Wood', 'Young')
+
+DESCRIPTIONS = (
+    'A {noun} must face the {adjective} truth about their past.',
+    'When a {noun} goes missing, a {adjective} search begins.',
+    'Two strangers are drawn into a {adjective} plot to steal a {noun}.',
+    'A {adjective} journey across the country changes a {noun} forever.',
+    'The last {noun} on Earth fights a {adjective} enemy.'
+)
+NOUNS = ('detective', 'family', 'soldier', 'scientist', 'teacher', 'thief', 'pilot', 'singer', 'robot', 'village')
+ADJECTIVES = ('dangerous', 'strange', 'hidden', 'desperate', 'secret', 'unlikely', 'violent', 'hopeful')
+
+REVIEW_TEXTS = ('Loved it.', 'Not for me.', 'A masterpiece.', 'Too long, but worth it.', 'Great cast.',
+                'The ending was a let down.', 'Would watch again.', 'Better than the book.', 'Forgettable.')
+
+
+def zipf_weights(count: int, exponent: float) -> list:
+    """Returns the cumulative weights of a Zipf distribution over count items, most popular first"""
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def weighted_sampler(rng: random.Random, weights: dict):
+    keys = list(weights)
+    cumulative = list(accumulate(weights[key] for key in keys))
+    return lambda: keys[bisect(cumulative, rng.random() * cumulative[-1])]
+
+
+def distinct_choices(rng: random.Random, cumulative: list, k: int) -> list:
+    """Returns k distinct indexes drawn with the cumulative weights, or every index if there are no more than k"""
+    if len(cumulative) <= k:
+        return list(range(len(cumulative)))
+    chosen = list()
+    while len(chosen) < k:
+        index = bisect(cumulative, rng.random() * cumulative[-1])
+        if index not in chosen:
+            chosen.append(index)
+    return chosen
+
+
+def person_name(index: int, first_names=FIRST_NAMES) -> str:
+    """Returns a distinct name for every index, the plain first and last names coming first"""
+    first = first_names[index % len(first_names)]
+    index //= len(first_names)
+    last = LAST_NAMES[index % len(LAST_NAMES)]
+    index //= len(LAST_NAMES)
+    if index == 0:
+        return f'{first} {last}'
+    initials = ''
+    while index > 0:
+        index -= 1
+        initials = chr(ord('A') + index % 26) + '.' + initials
+        index //= 26
+    return f'{first} {initials} {last}'
+
+
+def movie_title(rng: random.Random, letter: str) -> str:
+    if letter.isdigit():
+        words = [letter + ''.join(str(rng.randrange(10)) for _ in range(rng.randrange(3)))]
+    elif letter == 'T' and rng.random() < THE_SHARE:
+        words = ['The', rng.choice(ALL_WORDS)]
+    else:
+        words = [rng.choice(WORDS[letter])]
+    words.extend(rng.choice(ALL_WORDS) for _ in range(rng.choice((0, 1, 1, 2))))
+    return ' '.join(words)
+
+
+def generate_movies(filename: str, movies: int, rng: random.Random) -> list:
+    """Writes movies rows in the format of flix/adapters/data/movies.csv to filename, returning (id, rating, votes)
+    of each movie"""
+    next_letter = weighted_sampler(rng, FIRST_LETTERS)
+    next_genre = weighted_sampler(rng, GENRES)
+    next_genre_count = weighted_sampler(rng, GENRES_PER_MOVIE)
+    next_year = weighted_sampler(rng, YEARS)
+    actor_weights = zipf_weights(max(ACTORS_PER_MOVIE, int(movies * ACTORS_PER_MOVIE_RATIO)), ACTOR_EXPONENT)
+    director_weights = zipf_weights(max(1, int(movies * DIRECTORS_PER_MOVIE_RATIO)), DIRECTOR_EXPONENT)
+
+    titles = set()
+    summaries = list()
+    with open(filename, mode='w', encoding='utf-8', newline='') as movies_file:
+        writer = csv.writer(movies_file)
+        writer.writerow(MOVIE_FIELDS)
+        for movie_id in range(1, movies + 1):
+            title = movie_title(rng, next_letter())
+            sequel = 2
+            unique_title = title
+            while unique_title in titles:
+                unique_title = f'{title} {sequel}'
+                sequel += 1
+            titles.add(unique_title)
+
+            genres = list()
+            genre_count = next_genre_count()
+            while len(genres) < genre_count:
+                genre = next_genre()
+                if genre not in genres:
+                    genres.append(genre)
+
+            actors = [person_name(index) for index in distinct_choices(rng, actor_weights, ACTORS_PER_MOVIE)]
+            # Directors' first names are taken in the opposite order, so the busiest directors aren't actors too
+            director = person_name(bisect(director_weights, rng.random() * director_weights[-1]),
+                                   FIRST_NAMES[::-1])
+
+            rating = round(min(9.0, max(1.9, rng.gauss(6.7, 0.95))), 1)
+            votes = max(61, int(rng.lognormvariate(11.4, 1.3)))
+            revenue = 'N/A' if rng.random() < 0.13 else f'{min(936.63, rng.lognormvariate(3.6, 1.6)):.2f}'
+            metascore = 'N/A' if rng.random() < 0.064 else str(min(100, max(11, int(rng.gauss(59, 17)))))
+            description = rng.choice(DESCRIPTIONS).format(noun=rng.choice(NOUNS), adjective=rng.choice(ADJECTIVES))
+
+            writer.writerow((movie_id, unique_title, ','.join(genres), description, director, ', '.join(actors),
+                             next_year(), min(191, max(66, int(rng.gauss(113, 19)))), rating, votes, revenue,
+                             metascore))
+            summaries.append((movie_id, rating, votes))
+    return summaries
+
+
+def generate_activity(directory: str, movie_summaries: list, users: int, reviews: int, watchlist_entries: int,
+                      rng: random.Random) -> tuple:
+    """Writes users.csv, reviews.csv and watchlists.csv to directory. A few users write most of the reviews, and the
+    movies with the most votes get the most reviews and watchlist entries. Returns the number of reviews and
+    watchlist entries written"""
+    usernames = [f'user{number:07d}' for number in range(1, users + 1)]
+    with open(os.path.join(directory, 'users.csv'), mode='w', encoding='utf-8', newline='') as users_file:
+        writer = csv.writer(users_file)
+        writer.writerow(('username', 'password'))
+        writer.writerows((username, SYNTHETIC_PASSWORD) for username in usernames)
+    if not usernames or not movie_summaries:
+        reviews = watchlist_entries = 0
+
+    by_popularity = sorted(movie_summaries, key=lambda summary: -summary[2])
+    movie_weights = zipf_weights(len(by_popularity), MOVIE_EXPONENT)
+    user_weights = zipf_weights(max(1, users), REVIEWER_EXPONENT)
+
+    def next_movie():
+        return by_popularity[bisect(movie_weights, rng.random() * movie_weights[-1])]
+
+    def next_user():
+        return usernames[bisect(user_weights, rng.random() * user_weights[-1])]
+
+    rows = list()
+    for _ in range(reviews):
+        movie_id, rating, votes = next_movie()
+        timestamp = REVIEWS_START + timedelta(seconds=rng.randrange(int(REVIEWS_PERIOD.total_seconds())))
+        review_rating = min(10, max(1, round(rng.gauss(rating, 1.5))))
+        rows.append((timestamp, next_user(), movie_id, review_rating, rng.choice(REVIEW_TEXTS)))
+    rows.sort()
+    with open(os.path.join(directory, 'reviews.csv'), mode='w', encoding='utf-8', newline='') as reviews_file:
+        writer = csv.writer(reviews_file)
+        writer.writerow(('username', 'movie_id', 'rating', 'timestamp', 'review'))
+        writer.writerows((username, movie_id, rating, timestamp.isoformat(sep=' '), text)
+                         for timestamp, username, movie_id, rating, text in rows)
+
+    # Users pick from few enough movies that this could loop for long if asked for most of the pairs
+    watchlist_entries = min(watchlist_entries, users * len(movie_summaries) // 2)
+    entries = list()
+    seen = set()
+    while len(entries) < watchlist_entries:
+        entry = (rng.choice(usernames), next_movie()[0])
+        if entry not in seen:
+            seen.add(entry)
+            entries.append(entry)
+    with open(os.path.join(directory, 'watchlists.csv'), mode='w', encoding='utf-8', newline='') as watchlists_file:
+        writer = csv.writer(watchlists_file)
+        writer.writerow(('username', 'movie_id'))
+        writer.writerows(entries)
+
+    return reviews, watchlist_entries
+
+
+def generate(directory: str, movies: int, seed: int = 0, users: int = None, reviews: int = None,
+             watchlist_entries: int = None) -> dict:
+    """Writes a synthetic movies.csv of movies movies to directory, with users.csv, reviews.csv and watchlists.csv of
+    matching activity. The same arguments always give the same files. Returns the number of each item written"""
+    rng = random.Random(seed)
+    if users is None:
+        users = max(1, int(movies * USERS_PER_MOVIE))
+    if reviews is None:
+        reviews = users * REVIEWS_PER_USER
+    if watchlist_entries is None:
+        watchlist_entries = users * WATCHLIST_ENTRIES_PER_USER
+
+    os.makedirs(directory, exist_ok=True)
+    summaries = generate_movies(os.path.join(directory, 'movies.csv'), movies, rng)
+    reviews, watchlist_entries = generate_activity(directory, summaries, users, reviews, watchlist_entries, rng)
+    return {'movies': movies, 'users': users, 'reviews': reviews, 'watchlist_entries': watchlist_entries}
+
+
+def read_rows(data_path: str, filename: str):
+    path = os.path.join(data_path, filename)
+    if not os.path.exists(path):
+        return
+    with open(path, mode='r', encoding='utf-8', newline='') as file:
+        yield from csv.DictReader(file)
+
+
+def password_hashes():
+    # Hashing is slow on purpose, and synthetic users share their password
+    hashes = dict()
+
+    def password_hash(password: str) -> str:
+        if password not in hashes:
+            hashes[password] = generate_password_hash(password)
+        return hashes[password]
+    return password_hash
+
+
+def load_activity(data_path: str, repository):
+    """Adds the users, reviews and watchlists written by generate to data_path to a repository holding its movies"""
+    password_hash = password_hashes()
+    for row in read_rows(data_path, 'users.csv'):
+        repository.add_user(User(row['username'], password_hash(row['password'])))
+    for row in read_rows(data_path, 'reviews.csv'):
+        review = make_review(row['review'], repository.get_user(row['username']),
+                             repository.get_movie(int(row['movie_id'])), int(row['rating']),
+                             datetime.fromisoformat(row['timestamp']))
+        repository.add_review(review)
+    for row in read_rows(data_path, 'watchlists.csv'):
+        repository.add_to_watchlist(row['username'], int(row['movie_id']))
+
+
+def populate_activity(engine: Engine, data_path: str):
+    """Inserts the users, reviews and watchlists written by generate to data_path into a database populated with its
+    movies, in bulk as database_repository.populate does"""
+    conn = engine.raw_connection()
+    cursor = conn.cursor()
+
+    password_hash = password_hashes()
+    user_ids = dict()
+    cursor.execute('SELECT COALESCE(MAX(id), 0) FROM users')
+    next_id = cursor.fetchone()[0]
+    users = list()
+    for row in read_rows(data_path, 'users.csv'):
+        next_id += 1
+        user_ids[row['username']] = next_id
+        users.append((next_id, row['username'], password_hash(row['password'])))
+    cursor.executemany('INSERT INTO users (id, username, password) VALUES (?, ?, ?)', users)
+
+    cursor.executemany('INSERT INTO reviews (user_id, movie_id, review, rating, timestamp) VALUES (?, ?, ?, ?, ?)',
+                       ((user_ids[row['username']], int(row['movie_id']), row['review'], int(row['rating']),
+                         row['timestamp']) for row in read_rows(data_path, 'reviews.csv')))
+
+    cursor.executemany('INSERT INTO watchlist_movies (movie_id, user_id) VALUES (?, ?)',
+                       ((int(row['movie_id']), user_ids[row['username']])
+                        for row in read_rows(data_path, 'watchlists.csv')))
+
+    conn.commit()
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Writes a synthetic movies.csv, with users, reviews and watchlists.')
+    parser.add_argument('directory', help='directory the files are written to')
+    parser.add_argument('--movies', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--users', type=int, help=f'defaults to {USERS_PER_MOVIE} per movie')
+    parser.add_argument('--reviews', type=int, help=f'defaults to {REVIEWS_PER_USER} per user')
+    parser.add_argument('--watchlist-entries', type=int, help=f'defaults to {WATCHLIST_ENTRIES_PER_USER} per user')
+    args = parser.parse_args(argv)
+
+    counts = generate(args.directory, args.movies, args.seed, args.users, args.reviews, args.watchlist_entries)
+    print(', '.join(f'{count} {name.replace("_", " ")}' for name, count in counts.items()) +
+          f' written to {args.directory}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+from tests.benchmarks import bench_repository, bench_startup, compare
+
+
+def test_every_repository_method_is_benchmarked_on_both_backends():
+    results = bench_repository.run(sizes=(20,), time_per_method=0)
+
+    assert results['untimed'] == []
+    assert [load['backend'] for load in results['loads']] == ['memory', 'database']
+    methods = bench_repository.repository_methods()
+    for backend in bench_repository.BACKENDS:
+        backend_results = [result for result in results['results'] if result['backend'] == backend]
+        assert sorted(result['method'] for result in backend_results) == methods
+        for result in backend_results:
+            assert 'error' not in result, result
+            assert result['calls'] >= bench_repository.MIN_CALLS
+            assert result['p50_ms'] <= result['p99_ms']
+
+
+def test_compare_flags_methods_slower_by_more_than_the_threshold():
+    def run(get_movie, get_movies_by_letter, error=None):
+        results = [
+            {'backend': 'memory', 'size': 1000, 'method': 'get_movie', 'ops_per_sec': get_movie,
+             'p50_ms': 1000 / get_movie, 'p99_ms': 2000 / get_movie},
+            {'backend': 'memory', 'size': 1000, 'method': 'get_movies_by_letter',
+             'ops_per_sec': get_movies_by_letter, 'p50_ms': 1000 / get_movies_by_letter,
+             'p99_ms': 2000 / get_movies_by_letter}
+        ]
+        if error is not None:
+            results.append({'backend': 'memory', 'size': 1000, 'method': 'add_movie', 'error': error})
+        else:
+            results.append({'backend': 'memory', 'size': 1000, 'method': 'add_movie', 'ops_per_sec': 100,
+                            'p50_ms': 10, 'p99_ms': 20})
+        return {'results': results}
+
+    comparisons = compare.compare(run(1000, 50), run(900, 25, error='IntegrityError()'), threshold=0.25)
+
+    assert [(comparison['method'], comparison['regression']) for comparison in comparisons] == [
+        ('get_movie', False), ('get_movies_by_letter', True), ('add_movie', True)]
+    assert round(comparisons[1]['ops_change'], 2) == -0.5
+
+
+def test_compare_ignores_calls_too_fast_to_time_reliably():
+    def run(p50_ms):
+        return {'results': [{'backend': 'memory', 'size': 1000, 'method': 'alphabet', 'ops_per_sec': 1 / p50_ms,
+                             'p50_ms': p50_ms, 'p99_ms': p50_ms}]}
+
+    assert not compare.compare(run(0.001), run(0.004))[0]['regression']
+    assert compare.compare(run(0.01), run(0.04))[0]['regression']
+
+
+def test_startup_is_timed_in_new_processes():
+    results = bench_startup.run(backends=('database',), sizes=(20,), runs=1)
+
+    assert [result['method'] for result in results['results']] == ['start_populating', 'start']
+    for result in results['results']:
+        assert list(result['phases_ms']) == ['import', 'configuration', 'repository', 'middleware', 'blueprints',
+                                             'instrumentation']
+        assert result['p50_ms'] >= sum(result['phases_ms'].values())
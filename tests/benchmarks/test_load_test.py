@@ -0,0 +1,48 @@
+import pytest
+
+from tests.benchmarks import load_test
+
+ROUTES = ['GET /', 'GET /authentication/login', 'GET /movie', 'GET /movies_by_letter', 'GET /review', 'GET /search',
+          'POST /authentication/login', 'POST /review']
+
+
+@pytest.mark.parametrize('backend', load_test.BACKENDS)
+def test_load_test_replays_every_scenario_against_a_local_server(backend):
+    report = load_test.run(backend, movies=30, concurrency=4, duration=None, scenarios_per_user=12,
+                           mix={'browse': 1, 'search': 1, 'watchlist': 1, 'review': 1}, seed=3)
+
+    assert report['failures'] == []
+    assert report['errors'] == 0
+    assert sorted(report['routes']) == ROUTES
+    assert report['requests'] == sum(summary['count'] for summary in report['routes'].values())
+    for summary in report['routes'].values():
+        assert summary['p50'] <= summary['p90'] <= summary['p99']
+        assert summary['throughput'] > 0
+
+
+@pytest.mark.parametrize('backend', load_test.BACKENDS)
+def test_concurrent_users_each_log_in(backend):
+    report = load_test.run(backend, movies=30, concurrency=3, duration=None, scenarios_per_user=2,
+                           mix={'browse': 1})
+
+    assert report['errors'] == 0
+    assert report['routes']['POST /authentication/login']['count'] == 3
+    assert report['routes']['GET /movies_by_letter']['count'] == 6
+
+
+def test_traffic_mix_is_parsed():
+    assert load_test.parse_mix('browse=3, search=1') == {'browse': 3.0, 'search': 1.0}
+    with pytest.raises(ValueError):
+        load_test.parse_mix('checkout=1')
+
+
+def test_users_that_stop_are_counted_as_errors(monkeypatch):
+    def fail_to_log_in(user):
+        raise RuntimeError('Could not log in')
+
+    monkeypatch.setattr(load_test.SimulatedUser, 'login', fail_to_log_in)
+    report = load_test.run('memory', movies=30, concurrency=2, duration=None, scenarios_per_user=1,
+                           mix={'browse': 1})
+
+    assert report['errors'] == 2
+    assert [failure['error'] for failure in report['failures']] == ["RuntimeError('Could not log in')"] * 2
@@ -0,0 +1,73 @@
+import csv
+import os
+from collections import Counter
+
+from flix.adapters import memory_repository
+from flix.adapters.memory_repository import MemoryRepository
+from flix.domain.model import Movie
+from tests.benchmarks import synthetic_catalog
+
+
+def read(directory, filename):
+    with open(os.path.join(directory, filename), encoding='utf-8', newline='') as file:
+        return list(csv.DictReader(file))
+
+
+def test_same_seed_gives_same_files(tmp_path):
+    synthetic_catalog.generate(str(tmp_path / 'a'), 200, seed=7)
+    synthetic_catalog.generate(str(tmp_path / 'b'), 200, seed=7)
+    synthetic_catalog.generate(str(tmp_path / 'c'), 200, seed=8)
+
+    for filename in ('movies.csv', 'users.csv', 'reviews.csv', 'watchlists.csv'):
+        assert read(tmp_path / 'a', filename) == read(tmp_path / 'b', filename)
+    assert read(tmp_path / 'a', 'movies.csv') != read(tmp_path / 'c', 'movies.csv')
+
+
+def test_movies_have_the_shape_of_the_real_catalogue(tmp_path):
+    counts = synthetic_catalog.generate(str(tmp_path), 2000, seed=1)
+    movies = read(tmp_path, 'movies.csv')
+
+    assert counts == {'movies': 2000, 'users': 200, 'reviews': 1000, 'watchlist_entries': 600}
+    assert list(movies[0]) == list(synthetic_catalog.MOVIE_FIELDS)
+    assert [int(movie['Rank']) for movie in movies] == list(range(1, 2001))
+    assert len(set(movie['Title'] for movie in movies)) == 2000
+
+    letters = Counter(Movie(movie['Title'], int(movie['Year'])).get_first_letter() for movie in movies)
+    assert letters.most_common(1)[0][0] == 'T'
+
+    genres = [movie['Genre'].split(',') for movie in movies]
+    assert all(1 <= len(movie_genres) <= 3 and len(set(movie_genres)) == len(movie_genres)
+               for movie_genres in genres)
+    assert Counter(len(movie_genres) for movie_genres in genres).most_common(1)[0][0] == 3
+
+    actors = Counter(actor for movie in movies for actor in movie['Actors'].split(', '))
+    assert all(len(set(movie['Actors'].split(', '))) == 4 for movie in movies)
+    # Zipfian: a few actors are in many movies, and most in one or two
+    assert actors.most_common(1)[0][1] > 50
+    assert sum(1 for appearances in actors.values() if appearances <= 2) > len(actors) / 2
+
+
+def test_activity_refers_to_generated_users_and_movies(tmp_path):
+    synthetic_catalog.generate(str(tmp_path), 100, seed=1, users=5, reviews=40, watchlist_entries=20)
+    usernames = [user['username'] for user in read(tmp_path, 'users.csv')]
+    reviews = read(tmp_path, 'reviews.csv')
+    watchlists = read(tmp_path, 'watchlists.csv')
+
+    assert len(usernames) == 5
+    assert len(reviews) == 40
+    assert all(review['username'] in usernames and 1 <= int(review['movie_id']) <= 100 and
+               1 <= int(review['rating']) <= 10 for review in reviews)
+    assert [review['timestamp'] for review in reviews] == sorted(review['timestamp'] for review in reviews)
+    assert len(set((entry['username'], entry['movie_id']) for entry in watchlists)) == 20
+
+
+def test_activity_loads_into_a_repository(tmp_path):
+    synthetic_catalog.generate(str(tmp_path), 50, seed=1, users=3, reviews=10, watchlist_entries=6)
+    repository = MemoryRepository()
+    memory_repository.populate(str(tmp_path), repository)
+    synthetic_catalog.load_activity(str(tmp_path), repository)
+
+    assert repository.get_number_of_movies() == 50
+    assert repository.get_number_of_users() == 3
+    assert repository.get_number_of_reviews() == 10
+    assert sum(len(repository.get_user(f'user000000{number}').watchlist) for number in (1, 2, 3)) == 6
@@ -85,13 +85,29 @@ def session_factory():
     clear_mappers()
 
 
+@pytest.fixture
+def file_session_factory(tmp_path):
+    # A database file, which several repositories (as in several processes) can share
+    clear_mappers()
+    engine = create_engine('sqlite:///' + str(tmp_path / 'flix.db'))
+    metadata.create_all(engine)
+    map_model_to_tables()
+    database_repository.populate(engine, TEST_DATA_PATH_DATABASE)
+    yield sessionmaker(bind=engine)
+    clear_mappers()
+
+
 @pytest.fixture
 def client():
     my_app = create_app({
         'TESTING': True,  # Set to True during testing.
         'REPOSITORY': 'memory',  # Set to 'memory' or 'database' depending on desired repository.
         'TEST_DATA_PATH': TEST_DATA_PATH_MEMORY,  # Path for loading test data into the repository.
-        'WTF_CSRF_ENABLED': False  # test_client will not send a CSRF token, so disable validation.
+        'WTF_CSRF_ENABLED': False,  # test_client will not send a CSRF token, so disable validation.
+        'COMPRESS_RESPONSES': True,  # Compress responses for clients sending Accept-Encoding: gzip.
+        'HASH_STATIC_ASSETS': True,  # Serve static files under content-hashed names.
+        'STREAM_TEMPLATES': True,  # Stream large pages as they are rendered.
+        'METRICS': True  # Serve Prometheus metrics at /metrics.
     })
     repo1.repo_instance.add_user(User("shaun", generate_password_hash("12345")))
     return my_app.test_client()
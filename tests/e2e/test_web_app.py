@@ -1,7 +1,15 @@
+import gzip
+import os
+import re
+
 import pytest
 
 from flask import session
 
+from flix import create_app, fragments, profiling
+from flix.adapters import repository as repo
+from flix.movies import services
+
 
 def test_register(client):
     # Check that we retrieve the register page.
@@ -64,6 +72,7 @@ def test_index(client):
     response = client.get('/')
     assert response.status_code == 200
     assert b'CS235FLIX is a movie' in response.data
+    assert b'Highest Rated' in response.data
 
 
 def test_login_required_to_review(client):
@@ -146,3 +155,309 @@ def test_movies_with_search(client):
 
     assert b'Guardians of the Galaxy' in response.data
     assert b'Prometheus' not in response.data
+    assert b'James Gunn (1)' in response.data
+
+
+def test_watchlist(client, auth):
+    auth.login()
+
+    # Check movie is not in watchlist yet
+    response = client.get('/movie?movie_id=2')
+    assert b'Add to Watchlist' in response.data
+
+    # Add movie to watchlist and check the cached watchlist is refreshed
+    client.get('/movie?movie_id=2&in_watchlist=1')
+    response = client.get('/movie?movie_id=2')
+    assert b'Remove from Watchlist' in response.data
+    assert b'Prometheus (2012)' in response.data
+
+
+def test_autocomplete(client):
+    response = client.get('/autocomplete?q=james&type=director')
+    assert response.status_code == 200
+    assert response.json['results'] == [{'name': 'James Gunn', 'type': 'director'}]
+
+
+def test_actor_path(client):
+    response = client.get('/actor_path?from=Chris Pratt&to=Vin Diesel')
+    assert response.status_code == 200
+    assert response.json['actors'] == ['Chris Pratt', 'Vin Diesel']
+    assert response.json['degrees'] == 1
+
+    response = client.get('/actor_path?from=Chris Pratt&to=Nobody Known')
+    assert response.status_code == 404
+
+
+def test_rankings(client):
+    response = client.get('/rankings?by=votes&year=2016&limit=2')
+    assert response.status_code == 200
+    assert [movie['id'] for movie in response.json['movies']] == [5, 3]
+    assert type(response.json['movies'][0]['votes']) is int
+    assert response.json['next_cursor'] == 2
+
+    response = client.get('/rankings?by=metascore')
+    assert response.status_code == 400
+
+
+def test_rankings_cursor_follows_the_clamped_limit(client, monkeypatch):
+    monkeypatch.setattr(services, 'MAX_RANKING_LIMIT', 2)
+    response = client.get('/rankings?by=votes&limit=100')
+    assert len(response.json['movies']) == 2
+    assert response.json['next_cursor'] == 2
+
+    response = client.get('/rankings?by=votes&limit=0')
+    assert response.json['movies'] == []
+    assert response.json['next_cursor'] is None
+
+
+def test_stats(client):
+    response = client.get('/stats')
+    assert response.status_code == 200
+    assert response.json['movies']['decade'][0]['movies'] == 5
+
+    response = client.get('/stats?group=director')
+    assert 'James Gunn' in [group['key'] for group in response.json['director']]
+
+    response = client.get('/stats?group=runtime')
+    assert response.status_code == 400
+
+
+def test_api_movies(client):
+    response = client.get('/api/v1/movies?limit=2')
+    assert response.status_code == 200
+    assert [movie['id'] for movie in response.json['movies']] == [1, 2]
+    assert response.json['next_cursor'] == 2
+    assert set(response.json['movies'][0].keys()) == {'id', 'title', 'year', 'actors'}
+
+    response = client.get('/api/v1/movies?limit=2&cursor=4')
+    assert [movie['id'] for movie in response.json['movies']] == [5]
+    assert response.json['next_cursor'] is None
+
+    response = client.get('/api/v1/movies?limit=1000')
+    assert len(response.json['movies']) == 5
+
+
+def test_api_movie(client):
+    response = client.get('/api/v1/movies/1')
+    assert response.json['title'] == 'Guardians of the Galaxy'
+    assert response.json['genres'] == ['Action', 'Adventure', 'Sci-Fi']
+    assert response.json['number_of_reviews'] == 0
+
+    assert client.get('/api/v1/movies/99').status_code == 404
+    assert client.get('/api/v1/movies/99/reviews').status_code == 404
+
+
+def test_api_search(client):
+    response = client.get('/api/v1/search?genre=Adventure&limit=1')
+    assert response.json['count'] == 3
+    assert [movie['id'] for movie in response.json['movies']] == [1]
+
+    response = client.get('/api/v1/search?genre=Adventure&limit=1&cursor=' + str(response.json['next_cursor']))
+    assert [movie['id'] for movie in response.json['movies']] == [2]
+
+
+def test_api_letters(client):
+    assert 'Numbers' in client.get('/api/v1/letters').json['letters']
+
+    response = client.get('/api/v1/letters/S?limit=1')
+    first_page = response.json['movies']
+    assert len(first_page) == 1
+    response = client.get('/api/v1/letters/S?cursor=' + str(response.json['next_cursor']))
+    assert len(response.json['movies']) == 2
+    assert first_page[0] not in response.json['movies']
+
+    # Movie 1 doesn't start with S, so the cursor can't be resumed from
+    response = client.get('/api/v1/letters/S?cursor=1')
+    assert response.status_code == 400
+
+
+def test_api_people(client):
+    response = client.get('/api/v1/directors?prefix=ja')
+    assert response.json['names'] == ['James Gunn']
+
+    response = client.get('/api/v1/actors/vin diesel')
+    assert response.json['fullname'] == 'Vin Diesel'
+    assert [movie['id'] for movie in response.json['movies']] == [1]
+
+    assert client.get('/api/v1/actors/Nobody Known').status_code == 404
+
+
+def test_api_watchlist(client, auth):
+    assert client.get('/api/v1/watchlist').status_code == 401
+    assert client.put('/api/v1/watchlist/2').status_code == 401
+
+    auth.login()
+    response = client.put('/api/v1/watchlist/2')
+    assert response.json['in_watchlist']
+    response = client.get('/api/v1/watchlist')
+    assert [movie['id'] for movie in response.json['movies']] == [2]
+    assert client.put('/api/v1/watchlist/99').status_code == 404
+
+    client.put('/api/v1/watchlist/3')
+    response = client.get('/api/v1/watchlist?limit=1')
+    assert response.json['next_cursor'] == 2
+    response = client.get('/api/v1/watchlist?limit=1&cursor=2')
+    assert [movie['id'] for movie in response.json['movies']] == [3]
+    client.delete('/api/v1/watchlist/2')
+    assert client.get('/api/v1/watchlist?limit=1&cursor=2').status_code == 400
+
+
+def test_conditional_get(client, auth):
+    response = client.get('/movie?movie_id=1')
+    etag = response.headers['ETag']
+    last_modified = response.headers['Last-Modified']
+    assert 'no-cache' in response.headers['Cache-Control']
+    assert 'Cookie' in response.headers['Vary']
+
+    response = client.get('/movie?movie_id=1', headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    # Last-Modified is only to the second, so it isn't used to validate
+    response = client.get('/movie?movie_id=1', headers={'If-Modified-Since': last_modified})
+    assert response.status_code == 200
+
+    # A review changes the page, and logging in gives a per-user page
+    auth.login()
+    client.post('/review', data={'review': 'Who needs quokkas?', 'rating': 5, 'movie_id': 1})
+    response = client.get('/movie?movie_id=1', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert response.headers['Cache-Control'].startswith('private')
+
+
+def test_letter_page_fragments_are_cached(client, auth):
+    client.get('/movies_by_letter?letter=S')
+    hits = fragments.fragment_cache_stats(repo.repo_instance)['hits']
+
+    # A second user gets the same page body, with their own watchlist
+    auth.login()
+    client.get('/movie?movie_id=3&in_watchlist=1')
+    response = client.get('/movies_by_letter?letter=S')
+    assert fragments.fragment_cache_stats(repo.repo_instance)['hits'] > hits
+    assert b'Must be logged in' not in response.data
+    assert response.data.count(b'Split (2016)') == 2
+
+
+def test_compressed_etag_is_revalidated(client):
+    response = client.get('/movie?movie_id=1', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    etag = response.headers['ETag']
+    assert etag.endswith('-gzip"')
+
+    response = client.get('/movie?movie_id=1', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+
+
+def test_streamed_pages_are_compressed(client):
+    # The client fixture both streams templates and compresses responses
+    response = client.get('/movies', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    assert b'Guardians of the Galaxy' in gzip.decompress(response.data)
+
+    response = client.get('/movies_by_letter?letter=S', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+
+
+def test_static_assets_are_hashed_and_immutable(client):
+    response = client.get('/')
+    match = re.search(rb'href="(/static/css/main\.[0-9a-f]{12}\.css)"', response.data)
+    assert match is not None
+
+    response = client.get(match.group(1).decode())
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    assert b'font-family' in response.data
+
+    assert client.get('/static/css/main.css').status_code == 200
+
+
+def test_all_movies_page_is_streamed(client):
+    response = client.get('/movies')
+    assert response.status_code == 200
+    assert response.is_streamed
+    data = response.data
+    assert data.count(b'id="movie-container"') == 5
+    assert data.index(b'id="nav"') < data.index(b'Guardians of the Galaxy (2014)')
+
+
+def test_server_timing():
+    app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': os.path.join('tests', 'data', 'memory'),
+        'SERVER_TIMING': True
+    })
+    client = app.test_client()
+    response = client.get('/search?search_genre=Action')
+    server_timing = response.headers['Server-Timing']
+    for layer in ('view', 'service', 'repository', 'template', 'total'):
+        assert layer + ';dur=' in server_timing
+
+    assert client.get('/timings').status_code == 403
+    token = profiling.make_profile_token(app.config['SECRET_KEY'])
+    timings = client.get('/timings', headers={profiling.PROFILE_HEADER: token}).json
+    assert timings['/search']['total']['count'] == 1
+
+    # Once the app is torn down, the services it timed are called directly again
+    assert hasattr(services.search_movies_with_facets, '__timed_layer__')
+    app.extensions['timing']()
+    assert not hasattr(services.search_movies_with_facets, '__timed_layer__')
+
+
+def test_metrics(client):
+    client.get('/movie?movie_id=1')
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.content_type.startswith('text/plain; version=0.0.4')
+    text = response.data.decode()
+    assert 'flix_http_requests_total{route="/movie",method="GET",status="200"} 1' in text
+    assert 'flix_http_request_duration_seconds_bucket{route="/movie",le="+Inf"} 1' in text
+    assert 'flix_repository_calls_total{method="get_movie"}' in text
+    assert 'flix_repository_size{kind="movies"} 5' in text
+    assert 'flix_cache_hit_ratio{cache="movie"}' in text
+
+
+def test_profiling(tmp_path):
+    app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': os.path.join('tests', 'data', 'memory'),
+        'PROFILING': True,
+        'PROFILE_DIR': str(tmp_path)
+    })
+    client = app.test_client()
+    token = profiling.make_profile_token(app.config['SECRET_KEY'])
+
+    client.get('/movies_by_letter?letter=S', headers={profiling.PROFILE_HEADER: token})
+    assert client.get('/profiles').status_code == 403
+    # Tokens in the query string would end up in access logs
+    assert client.get('/profiles?token=' + token).status_code == 403
+    captured = client.get('/profiles', headers={profiling.PROFILE_HEADER: token}).json['profiles']
+    assert [profile['path'] for profile in captured] == ['/movies_by_letter']
+
+    response = client.get('/profiles/' + captured[0]['name'] + '?limit=500', headers={profiling.PROFILE_HEADER: token})
+    assert b'get_movies_by_letter' in response.data
+
+    response = client.get('/profiles/' + captured[0]['name'] + '?limit=all', headers={profiling.PROFILE_HEADER: token})
+    assert response.status_code == 200
+
+
+def test_compressed_pages_keep_each_sessions_csrf_token():
+    app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': os.path.join('tests', 'data', 'memory'),
+        'COMPRESS_RESPONSES': True,
+        'STREAM_TEMPLATES': False
+    })
+    tokens = list()
+    for client in (app.test_client(), app.test_client()):
+        for i in range(2):
+            response = client.get('/search?search_genre=Action', headers={'Accept-Encoding': 'gzip'})
+            assert response.headers['Content-Encoding'] == 'gzip'
+            page = gzip.decompress(response.data).decode()
+            tokens.append(re.search(r'name="csrf_token" type="hidden" value="([^"]+)"', page).group(1))
+    assert tokens[0] != tokens[2]
@@ -1,8 +1,10 @@
+import math
 from datetime import datetime
 
 import pytest
+from sqlalchemy import event
 
-from flix.adapters.database_repository import SqlAlchemyRepository
+from flix.adapters.database_repository import ITER_BATCH_SIZE, SqlAlchemyRepository
 from flix.adapters.repository import RepositoryException
 from flix.domain.model import User, Movie, Director, Genre, make_review, Review, Actor
 
@@ -70,6 +72,9 @@ def test_repository_can_retrieve_a_movie(session_factory):
     assert movie.year == 2014
     assert movie.runtime_minutes == 121
     assert movie.description == "A group of intergalactic criminals are forced to work together to stop a fanatical warrior from taking control of the universe."
+    assert movie.rating == 8.1
+    assert movie.votes == 757074
+    assert movie.revenue == 333.13
 
 
 def test_repository_does_not_retrieve_non_existent_movie(session_factory):
@@ -166,6 +171,61 @@ def test_repository_returns_an_empty_list_where_there_are_no_movies_in_a_genre(s
     assert len(movies) == 0
 
 
+def test_repository_can_build_bitmap_index(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    index = repo.get_bitmap_index()
+    assert len(index) == 1000
+
+    comedy = index.bitmap('genre', 'Comedy')
+    assert index.count(comedy) == 279
+    assert index.movie_ids(comedy, limit=2) == [4, 7]
+
+    # Actor names are matched regardless of the leading spaces stored by the loader
+    chris_pratt = index.bitmap('actor', 'Chris Pratt')
+    assert index.movie_ids(chris_pratt, limit=4) == [1, 10, 39, 86]
+    assert index.movie_ids(chris_pratt & index.bitmap('director', 'James Gunn')) == [1]
+
+
+def test_added_movies_are_appended_to_the_indexes(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    index = repo.get_bitmap_index()
+    rankings = repo.get_rankings()
+    movie = Movie("Guardians of the Galaxy Returns", 2019)
+    movie.description = "A group of intergalactic criminals return to stop a fanatical warrior."
+    movie.runtime_minutes = 121
+    movie.rating = 9.5
+    movie.director = repo.get_director('James Gunn')
+    movie.add_actor(repo.get_actor('Chris Pratt'))
+    repo.add_movie(movie)
+
+    assert repo.get_bitmap_index() is index
+    assert repo.get_rankings() is rankings
+    assert index.movie_ids(index.bitmap('director', 'James Gunn')) == [1, movie.id]
+    assert rankings.top('rating', limit=1) == [(movie.id, 9.5)]
+
+
+def test_repository_can_rank_movies(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    rankings = repo.get_rankings()
+    top = rankings.top('rating', limit=1)
+    assert top == [(55, 9.0)]
+    assert len(rankings.top('revenue', genre='Western', limit=50)) < 10
+
+
+def test_repository_can_get_movie_statistics(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    genres = repo.get_movie_statistics('genre')
+    comedy = next(group for group in genres if group['key'] == 'Comedy')
+    assert comedy['movies'] == 279
+
+    decades = repo.get_movie_statistics('decade')
+    assert [group['key'] for group in decades] == [2000, 2010]
+    assert sum(group['movies'] for group in decades) == 1000
+    assert repo.get_movie_statistics('year')[0]['key'] == 2006
+    assert repo.get_review_activity() == []
+    assert repo.get_number_of_reviews() == 0
+
+
 def test_repository_can_add_a_review(session_factory):
     repo = SqlAlchemyRepository(session_factory)
     user = User('aidan', 'hi1234')
@@ -273,3 +333,40 @@ def test_repository_returns_none_for_non_existent_director(session_factory):
     name = "Sam sam"
     director = repo.get_director(name)
     assert director is None
+
+
+def test_repository_can_iterate_over_movies(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    movies = repo.iter_movies()
+    assert next(movies).id == 1
+    assert next(movies).id == 2
+    assert sum(1 for movie in movies) + 2 == repo.get_number_of_movies()
+
+
+def test_iterating_over_movies_loads_actors_per_batch(session_factory):
+    repo = SqlAlchemyRepository(session_factory)
+    statements = list()
+    event.listen(session_factory.kw['bind'], 'before_cursor_execute',
+                 lambda conn, cursor, statement, *args: statements.append(statement))
+
+    actors = [[actor.actor_full_name for actor in movie.actors] for movie in repo.iter_movies()]
+    assert all(actors)
+    # The movies, then one query for the actors of each batch rather than one per movie
+    assert len(statements) == 1 + math.ceil(len(actors) / ITER_BATCH_SIZE)
+
+
+def test_repositories_sharing_a_database_count_each_others_changes(file_session_factory):
+    first = SqlAlchemyRepository(file_session_factory)
+    second = SqlAlchemyRepository(file_session_factory)
+    first.add_user(User('freddy', '123231'))
+    tag = second.get_data_version().tag()
+    reviews_tag = second.get_data_version().tag(('reviews',))
+    assert first.get_data_version().tag() == tag
+
+    first.add_review(make_review('Great', first.get_user('freddy'), first.get_movie(1), 9))
+    assert second.get_data_version().counter('reviews') == 1
+    assert second.get_data_version().tag(('reviews',)) != reviews_tag
+
+    first.add_to_watchlist('freddy', 2)
+    assert second.get_data_version().counter('watchlists') == 1
+    assert not second.get_data_version().local
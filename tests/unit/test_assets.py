@@ -0,0 +1,60 @@
+import os
+
+from flix import assets, create_app
+from flix.assets import StaticAssets, missing_references
+
+
+def make_static_folder(tmp_path):
+    (tmp_path / 'css').mkdir()
+    (tmp_path / 'fonts').mkdir()
+    (tmp_path / 'fonts' / 'plex.woff2').write_bytes(b'font')
+    (tmp_path / 'css' / 'main.css').write_text("@font-face { src: url('../fonts/plex.woff2') format('woff2'); }\n"
+                                              "body { background: url(https://example.com/a.png); }")
+    return tmp_path
+
+
+def test_assets_get_content_hashed_names(tmp_path):
+    assets = StaticAssets(str(make_static_folder(tmp_path)))
+    assert len(assets) == 2
+    hashed_css = assets.hashed_name('css/main.css')
+    assert hashed_css.startswith('css/main.') and hashed_css.endswith('.css')
+    assert assets.hashed_name('css/missing.css') == 'css/missing.css'
+    assert assets.lookup('css/main.css') is None
+
+
+def test_stylesheet_urls_are_rewritten(tmp_path):
+    assets = StaticAssets(str(make_static_folder(tmp_path)))
+    filename, content = assets.lookup(assets.hashed_name('css/main.css'))
+    hashed_font = assets.hashed_name('fonts/plex.woff2')
+    assert filename == 'css/main.css'
+    assert f"url('../{hashed_font}')".encode() in content
+    assert b'url(https://example.com/a.png)' in content
+    assert assets.lookup(hashed_font) == ('fonts/plex.woff2', None)
+
+
+def test_changing_a_font_changes_the_stylesheet_name(tmp_path):
+    folder = make_static_folder(tmp_path)
+    before = StaticAssets(str(folder)).hashed_name('css/main.css')
+    (folder / 'fonts' / 'plex.woff2').write_bytes(b'new font')
+    assert StaticAssets(str(folder)).hashed_name('css/main.css') != before
+
+
+def test_missing_references_are_listed(tmp_path):
+    folder = make_static_folder(tmp_path)
+    (folder / 'css' / 'fonts.css').write_text("@font-face { src: url('../fonts/plex.woff2'); }\n"
+                                              "@font-face { src: url(\"../fonts/plex-bold.woff2?v=1\"); }")
+    assert missing_references(str(folder), 'css/main.css') == []
+    assert missing_references(str(folder), 'css/fonts.css') == ['fonts/plex-bold.woff2']
+
+
+def test_app_keeps_the_external_font_stylesheet_until_the_fonts_are_added(monkeypatch):
+    monkeypatch.setattr(assets, 'missing_references', lambda static_folder, stylesheet: ['fonts/plex.woff2'])
+    app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': os.path.join('tests', 'data', 'memory'),
+        'WTF_CSRF_ENABLED': False,
+        'SELF_HOSTED_FONTS': True
+    })
+    assert not app.config['SELF_HOSTED_FONTS']
+    assert b'fonts.googleapis.com' in app.test_client().get('/').data
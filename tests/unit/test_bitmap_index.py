@@ -0,0 +1,57 @@
+from flix.adapters.bitmap_index import BitmapIndex
+
+
+def make_index():
+    index = BitmapIndex()
+    index.add_movie(1, ["Action", "Sci-Fi"], ["Chris Pratt", " Vin Diesel"], "James Gunn", 2014)
+    index.add_movie(2, ["Adventure", "Sci-Fi"], ["Noomi Rapace"], "Ridley Scott", 2012)
+    index.add_movie(3, ["Action"], ["Vin Diesel"], "Justin Lin", 2013)
+    return index
+
+
+def test_index_assigns_rows_in_order():
+    index = make_index()
+    assert len(index) == 3
+    assert index.row(1) == 0
+    assert index.movie_id(2) == 3
+    assert index.row(4) is None
+
+
+def test_index_and_or_not():
+    index = make_index()
+    action = index.bitmap('genre', "Action")
+    sci_fi = index.bitmap('genre', "Sci-Fi")
+    assert index.movie_ids(action & sci_fi) == [1]
+    assert index.movie_ids(action | sci_fi) == [1, 2, 3]
+    assert index.movie_ids(index.negate(action)) == [2]
+    assert index.movie_ids(index.any_of('director', ["Ridley Scott", "Justin Lin"])) == [2, 3]
+
+
+def test_index_strips_names():
+    index = make_index()
+    assert index.movie_ids(index.bitmap('actor', "Vin Diesel")) == [1, 3]
+
+
+def test_index_counts_and_pages():
+    index = make_index()
+    action_or_sci_fi = index.any_of('genre', ["Action", "Sci-Fi"])
+    assert index.count(action_or_sci_fi) == 3
+    assert index.movie_ids(action_or_sci_fi, cursor=1, limit=1) == [2]
+    assert index.count(index.bitmap('year', 1999)) == 0
+
+
+def test_index_pages_by_keyset():
+    index = make_index()
+    all_rows = index.all_rows()
+    assert index.movie_ids(all_rows, after=1, limit=1) == [2]
+    assert index.movie_ids(all_rows, after=2) == [3]
+    assert index.movie_ids(all_rows, after=3) == []
+    assert index.movie_ids(index.bitmap('actor', "Vin Diesel"), after=0) == [1, 3]
+
+
+def test_index_facets():
+    index = make_index()
+    facets = index.facets(index.bitmap('actor', "Vin Diesel"), limit=1)
+    assert facets['genre'] == [("Action", 2)]
+    assert facets['decade'] == [(2010, 2)]
+    assert len(facets['director']) == 1
@@ -0,0 +1,56 @@
+import pytest
+
+from flix.adapters.cache import LRUCache
+from flix.fragments import FragmentCache
+
+
+def test_cache_returns_stored_value():
+    cache = LRUCache(2)
+    cache.put(1, 'a')
+    assert cache.get(1) == 'a'
+    assert cache.get(2) is None
+
+
+def test_cache_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.put(1, 'a')
+    cache.put(2, 'b')
+    cache.get(1)
+    cache.put(3, 'c')
+    assert 1 in cache
+    assert 2 not in cache
+    assert 3 in cache
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_counts_hits_and_misses():
+    cache = LRUCache(2)
+    cache.put(1, 'a')
+    cache.get(1)
+    cache.get(1)
+    cache.get(2)
+    stats = cache.stats()
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['hit_ratio'] == 2 / 3
+
+
+def test_cache_rejects_invalid_size():
+    with pytest.raises(ValueError):
+        LRUCache(0)
+
+
+def test_fragment_cache_renders_once_per_version():
+    cache = FragmentCache(max_size=2)
+    renders = []
+
+    def render():
+        renders.append(1)
+        return "<p>card</p>"
+
+    assert cache.get('card', (1,), 'v1', render) == "<p>card</p>"
+    cache.get('card', (1,), 'v1', render)
+    assert len(renders) == 1
+    cache.get('card', (1,), 'v2', render)
+    assert len(renders) == 2
+    assert cache.stats()['hits'] == 1
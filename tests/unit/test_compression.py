@@ -0,0 +1,86 @@
+import gzip
+
+from werkzeug.test import Client
+from werkzeug.wrappers import Request, Response
+
+from flix.compression import GzipMiddleware, accepts_gzip
+
+
+@Request.application
+def page(request):
+    if request.path == '/stream':
+        return Response((b'x' * 100 for i in range(10)), content_type='text/html')
+    if request.path == '/small':
+        return Response(b'small', content_type='text/html')
+    response = Response(b'<p>movie</p>' * 100, content_type='text/html')
+    response.set_etag('v1')
+    return response
+
+
+def test_accepts_gzip():
+    assert accepts_gzip('gzip, deflate, br')
+    assert accepts_gzip('br;q=1.0, gzip;q=0.8')
+    assert not accepts_gzip('gzip;q=0')
+    assert not accepts_gzip('identity')
+
+
+def test_large_responses_are_compressed_and_cached():
+    middleware = GzipMiddleware(page)
+    client = Client(middleware, Response)
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert gzip.decompress(response.data) == b'<p>movie</p>' * 100
+    assert response.headers['ETag'] == '"v1-gzip"'
+    assert 'Accept-Encoding' in response.headers['Vary']
+
+    client.get('/', headers={'Accept-Encoding': 'gzip'})
+    assert middleware.stats()['hits'] == 1
+
+
+def test_small_and_unaccepted_responses_are_not_compressed():
+    client = Client(GzipMiddleware(page), Response)
+    assert 'Content-Encoding' not in client.get('/small', headers={'Accept-Encoding': 'gzip'}).headers
+    response = client.get('/')
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_streamed_responses_are_compressed_chunk_by_chunk():
+    middleware = GzipMiddleware(page)
+    app_iter, status, headers = Client(middleware).get('/stream', headers={'Accept-Encoding': 'gzip'})
+    chunks = list(app_iter)
+
+    assert headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in headers
+    # One chunk per chunk of the page, and the gzip trailer
+    assert len(chunks) == 11
+    assert gzip.decompress(b''.join(chunks)) == b'x' * 1000
+    assert middleware.stats()['misses'] == 0
+
+
+@Request.application
+def session_page(request):
+    # The same ETag for every session, though the body holds the session's own token
+    response = Response(b'<p>movie</p>' * 100 + request.args['token'].encode(), content_type='text/html')
+    response.set_etag('v1')
+    if 'new' in request.args:
+        response.set_cookie('session', request.args['token'])
+    return response
+
+
+def test_cached_bodies_are_only_served_for_identical_responses():
+    middleware = GzipMiddleware(session_page)
+    client = Client(middleware, Response)
+    first = client.get('/?token=a', headers={'Accept-Encoding': 'gzip'})
+    second = client.get('/?token=b', headers={'Accept-Encoding': 'gzip'})
+    assert gzip.decompress(first.data).endswith(b'a')
+    assert gzip.decompress(second.data).endswith(b'b')
+    assert middleware.stats()['hits'] == 0
+
+    client.get('/?token=a', headers={'Accept-Encoding': 'gzip'})
+    assert middleware.stats()['hits'] == 1
+
+    # Responses setting cookies are not kept
+    client.get('/?token=c&new=1', headers={'Accept-Encoding': 'gzip'})
+    client.get('/?token=c&new=1', headers={'Accept-Encoding': 'gzip'})
+    assert middleware.stats()['hits'] == 1
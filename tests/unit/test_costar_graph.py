@@ -0,0 +1,47 @@
+from flix.adapters.bitmap_index import BitmapIndex
+from flix.adapters.costar_graph import CoStarGraph
+
+
+def make_graph():
+    index = BitmapIndex()
+    index.add_movie(1, ["Action"], ["A", "B"], "X", 2000)
+    index.add_movie(2, ["Action"], ["B", "C"], "X", 2001)
+    index.add_movie(3, ["Drama"], ["C", "D", "E"], "Y", 2002)
+    index.add_movie(4, ["Drama"], ["F", "G"], "Y", 2003)
+    return CoStarGraph(index)
+
+
+def test_graph_adjacency():
+    graph = make_graph()
+    assert len(graph) == 7
+    c = graph.actor_number("C")
+    assert [graph.actor_name(number) for number in graph.co_stars(c)] == ["B", "D", "E"]
+    assert graph.degree(c) == 3
+    assert graph.worked_with(c, graph.actor_number("D"))
+    assert not graph.worked_with(c, graph.actor_number("A"))
+    assert graph.actor_number("Z") is None
+
+
+def test_graph_shortest_path():
+    graph = make_graph()
+    path = graph.path(graph.actor_number("A"), graph.actor_number("E"))
+    assert [graph.actor_name(number) for number in path] == ["A", "B", "C", "E"]
+    assert graph.path(graph.actor_number("A"), graph.actor_number("A")) == [graph.actor_number("A")]
+
+
+def test_graph_unconnected_actors():
+    graph = make_graph()
+    assert graph.path(graph.actor_number("A"), graph.actor_number("G")) is None
+
+
+def test_added_movies_link_their_cast():
+    graph = make_graph()
+    graph.index.add_movie(5, ["Drama"], ["E", "F", "H"], "Y", 2004)
+    graph.add_movie(["E", "F", "H"])
+    assert len(graph) == 8
+    assert graph.movies == 5
+    e = graph.actor_number("E")
+    assert [graph.actor_name(number) for number in graph.co_stars(e)] == ["C", "D", "F", "H"]
+    assert [graph.actor_name(number) for number in graph.co_stars(graph.actor_number("G"))] == ["F"]
+    path = graph.path(graph.actor_number("A"), graph.actor_number("G"))
+    assert [graph.actor_name(number) for number in path] == ["A", "B", "C", "E", "F", "G"]
@@ -0,0 +1,42 @@
+from flix.adapters.description_index import DescriptionIndex, tokenise
+
+
+DESCRIPTIONS = [
+    (1, "A group of intergalactic criminals must stop a fanatical warrior."),
+    (2, "Intergalactic criminals team up against a fanatical warlord."),
+    (3, "A chef opens a restaurant in Paris."),
+    (4, "A young chef competes for a Paris restaurant award."),
+    (5, "Nothing shared here whatsoever."),
+]
+
+
+def test_tokenise_drops_short_and_stop_words():
+    assert tokenise("The cat and THE Dog's bone") == ['cat', 'dog', 'bone']
+    assert tokenise(None) == []
+
+
+def test_description_index_finds_similar_descriptions():
+    index = DescriptionIndex(DESCRIPTIONS, n=2, max_df_ratio=0.5)
+    assert len(index) == 5
+    assert index.similar(1) == [2]
+    assert index.similar(3, limit=1) == [4]
+    assert index.similar(5) == []
+    assert index.similar(99) == []
+
+
+def test_only_the_heaviest_postings_of_a_term_are_walked():
+    descriptions = [(i, 'quokka') for i in range(1, 6)] + [(6, 'wombat'), (7, 'wombat')]
+    assert len(DescriptionIndex(descriptions, n=4, max_df_ratio=1.0).similar(1)) == 4
+    assert len(DescriptionIndex(descriptions, n=4, max_df_ratio=1.0, max_postings=2).similar(1)) == 2
+
+
+def test_added_movies_are_offered_as_neighbours():
+    index = DescriptionIndex(DESCRIPTIONS, n=2, max_df_ratio=0.5)
+    index.add_movie(6, "A chef opens a second restaurant in Paris.")
+    assert len(index) == 6
+    assert index.similar(6) == [3, 4]
+    assert index.similar(3) == [6, 4]
+    # 'whatsoever' was only in the description of movie 5 when the index was built
+    index.add_movie(7, "Whatsoever.")
+    assert index.similar(7) == [5]
+    assert index.similar(5) == [7]
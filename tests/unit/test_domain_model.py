@@ -61,6 +61,14 @@ def test_watchlist_construction(watchlist):
     assert watchlist.watchlist == []
 
 
+def test_user_can_remove_movies_from_their_watchlist(movie):
+    user = User('shaun', '12345')
+    user.add_to_watchlist(movie)
+    user.add_to_watchlist(Movie("Prometheus", 2012, 2))
+    user.remove_from_watchlist(movie)
+    assert [watched.id for watched in user.watchlist] == [2]
+
+
 def test_movie_construction(movie):
     assert movie.id == 1
     assert movie.director is None
@@ -99,3 +107,20 @@ def test_make_review_establishes_relationships(movie, user):
 
     # Check that review knows about movie
     assert review.movie is movie
+
+
+def test_movie_ranking_values(movie):
+    assert movie.rating is None
+    movie.rating = 8.1
+    movie.votes = 757074
+    movie.revenue = 333.13
+    assert movie.rating == 8.1
+    assert movie.votes == 757074
+    assert movie.revenue == 333.13
+
+    movie.rating = 11
+    movie.votes = -1
+    movie.revenue = "N/A"
+    assert movie.rating == 8.1
+    assert movie.votes == 757074
+    assert movie.revenue == 333.13
@@ -30,6 +30,34 @@ def test_repository_can_add_a_movie(in_memory_repo):
     assert in_memory_repo.get_movie(6) is movie
 
 
+def test_added_movies_are_appended_to_the_indexes(in_memory_repo):
+    index = in_memory_repo.get_bitmap_index()
+    in_memory_repo.get_recommender()
+    sequel = Movie("Guardians of the Galaxy Returns", 2019, 6)
+    sequel.description = "The intergalactic criminals return to stop another fanatical warrior."
+    sequel.director = in_memory_repo.get_director("James Gunn")
+    sequel.add_actor(in_memory_repo.get_actor("Chris Pratt"))
+    sequel.add_actor(Actor("Karen Gillan"))
+    sequel.add_genre(Genre("Action"))
+    sequel.rating = 9.5
+    in_memory_repo.add_movie(sequel)
+
+    assert in_memory_repo.get_bitmap_index() is index
+    assert index.movie_ids(index.bitmap('actor', 'Chris Pratt')) == [1, 6]
+    assert in_memory_repo.get_rankings().top('rating', limit=1) == [(6, 9.5)]
+    costar_graph = in_memory_repo.get_costar_graph()
+    assert costar_graph.worked_with(costar_graph.actor_number("Karen Gillan"), costar_graph.actor_number("Chris Pratt"))
+    assert in_memory_repo.get_recommender().similar(6)[0] == 1
+    assert in_memory_repo.get_description_index().similar(1) == [6]
+
+
+def test_movies_below_the_indexed_ids_have_the_index_rebuilt(in_memory_repo):
+    index = in_memory_repo.get_bitmap_index()
+    in_memory_repo.add_movie(Movie("Prequel", 2010, 0))
+    assert in_memory_repo.get_bitmap_index() is not index
+    assert in_memory_repo.get_bitmap_index().movie_id(0) == 0
+
+
 def test_repository_can_retrieve_movie(in_memory_repo):
     movie = in_memory_repo.get_movie(1)
 
@@ -196,3 +224,22 @@ def test_repository_returns_none_for_non_existent_director(in_memory_repo):
     name = "Sam sam"
     director = in_memory_repo.get_director(name)
     assert director is None
+
+
+def test_repository_counts_changes(in_memory_repo):
+    version = in_memory_repo.get_data_version()
+    tag = version.tag()
+    reviews_tag = version.tag(('reviews',))
+
+    in_memory_repo.add_movie(Movie("Moana", 2016, 6))
+    assert version.counter('catalog') == 6
+    assert version.tag() != tag
+    assert version.tag(('reviews',)) == reviews_tag
+
+    make_review("Lovely", in_memory_repo.get_user('shaun'), in_memory_repo.get_movie(6), 8)
+    in_memory_repo.add_review(in_memory_repo.get_movie(6).reviews[0])
+    assert version.counter('reviews') == 1
+
+
+def test_repository_can_iterate_over_movies(in_memory_repo):
+    assert [movie.id for movie in in_memory_repo.iter_movies()] == [1, 2, 3, 4, 5]
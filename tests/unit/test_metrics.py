@@ -0,0 +1,62 @@
+from flask import Flask
+from sqlalchemy import create_engine
+
+from flix import metrics
+from flix.adapters.memory_repository import MemoryRepository
+
+
+def test_counter_and_histogram_render_in_text_format():
+    registry = metrics.Registry()
+    counter = registry.register(metrics.Counter('requests_total', 'Requests.', ('route',)))
+    histogram = registry.register(metrics.Histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0)))
+    counter.inc(route='/movie')
+    counter.inc(2, route='/movie')
+    histogram.observe(0.05, route='/movie')
+    histogram.observe(5.0, route='/movie')
+
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{route="/movie"} 3' in text
+    assert 'latency_seconds_bucket{route="/movie",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/movie",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{route="/movie"} 2' in text
+    assert histogram.count(route='/movie') == 2
+
+
+def test_labels_are_escaped():
+    assert metrics.format_labels(('name',), ('say "hi"\n',)) == '{name="say \\"hi\\"\\n"}'
+
+
+def test_failing_gauge_does_not_hide_other_metrics():
+    def broken():
+        raise RuntimeError
+
+    registry = metrics.Registry()
+    registry.register(metrics.Gauge('broken', 'Broken.', broken))
+    registry.register(metrics.Gauge('answer', 'Answer.', lambda: {(): 42}))
+    text = registry.render()
+    assert 'answer 42' in text
+    assert 'broken' not in text
+
+
+def test_cache_hits_and_misses_are_counters():
+    registry = metrics.init_app(Flask(__name__), MemoryRepository(),
+                                caches={'movie': lambda: {'hits': 3, 'misses': 1, 'hit_ratio': 0.75, 'size': 2}})
+    text = registry.render()
+    assert '# TYPE flix_cache_hits_total counter' in text
+    assert 'flix_cache_hits_total{cache="movie"} 3' in text
+    assert 'flix_cache_misses_total{cache="movie"} 1' in text
+    assert '# TYPE flix_cache_hit_ratio gauge' in text
+
+
+def test_repository_calls_and_pool_events_are_counted():
+    repository = MemoryRepository()
+    engine = create_engine('sqlite://')
+    registry = metrics.init_app(Flask(__name__), repository, database_engine=engine)
+
+    repository.get_movie(1)
+    assert registry.get('flix_repository_calls_total').value(method='get_movie') == 1
+
+    with engine.connect() as connection:
+        connection.execute('SELECT 1')
+    assert registry.get('flix_db_pool_events_total').value(event='checkout') == 1
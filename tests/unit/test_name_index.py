@@ -0,0 +1,62 @@
+from flix.adapters.name_index import NameIndex, normalise_name
+
+
+def make_index():
+    return NameIndex({
+        'actor': [" Chris Pratt", "Chris Evans", "Penélope Cruz", "Zoe Saldana"],
+        'director': ["James Gunn", "Christopher Nolan"],
+        'genre': ["Sci-Fi", "Action"]
+    })
+
+
+def test_normalise_name():
+    assert normalise_name("  Penélope   CRUZ ") == "penelope cruz"
+
+
+def test_lookup_ignores_case_accents_and_spaces():
+    index = make_index()
+    assert index.lookup("chris pratt", 'actor') == "Chris Pratt"
+    assert index.lookup("Penelope Cruz", 'actor') == "Penélope Cruz"
+    assert index.lookup("sci-fi", 'genre') == "Sci-Fi"
+    assert index.lookup("Chris Pratt", 'director') is None
+
+
+def test_prefix_matches_name_start_before_later_words():
+    index = make_index()
+    assert index.prefix("chris") == [('actor', "Chris Evans"), ('actor', "Chris Pratt"),
+                                     ('director', "Christopher Nolan")]
+    assert index.prefix("pra") == [('actor', "Chris Pratt")]
+    assert index.prefix("chris", kinds=['director']) == [('director', "Christopher Nolan")]
+    assert index.prefix("chris", limit=1) == [('actor', "Chris Evans")]
+
+
+def test_fuzzy_tolerates_typos():
+    index = make_index()
+    assert index.fuzzy("Chris Prat")[0] == ('actor', "Chris Pratt")
+    assert index.resolve("Jmes Gunn", 'director') == "James Gunn"
+    assert index.resolve("Quentin Tarantino", 'director') is None
+
+
+def test_complete_falls_back_to_fuzzy():
+    index = make_index()
+    assert index.complete("zoe saldanna") == [('actor', "Zoe Saldana")]
+
+
+def test_prefix_finds_the_best_matches_among_many():
+    index = NameIndex({
+        'actor': [f"Extra{i} Aaron" for i in range(200)] + ["Abe Vigoda"] + [f"Chris Actor{i}" for i in range(200)],
+        'director': ["Chris Zed"]
+    })
+    # Matches at the start of a name rank first, however many later words match before them
+    assert index.prefix("a", limit=1) == [('actor', "Abe Vigoda")]
+    assert index.prefix("chris", limit=1, kinds=['director']) == [('director', "Chris Zed")]
+    assert index.prefix("extra", limit=1000, kinds=['actor'])[-1] == ('actor', "Extra99 Aaron")
+
+
+def test_names_normalising_alike_are_kept_apart():
+    index = NameIndex({'actor': ["José Garcia", "Jose Garcia"]})
+    assert len(index) == 2
+    assert index.lookup("José Garcia", 'actor') == "José Garcia"
+    assert index.lookup("Jose Garcia", 'actor') == "Jose Garcia"
+    assert index.lookup("jose garcia", 'actor') == "José Garcia"
+    assert index.prefix("jose") == [('actor', "Jose Garcia"), ('actor', "José Garcia")]
@@ -7,7 +7,8 @@ def test_database_populate_inspect_table_names(database_engine):
     # Get table information
     inspector = inspect(database_engine)
     assert inspector.get_table_names() == ['actors', 'directors', 'genres', 'movie_actors', 'movie_genres', 'movies',
-                                           'reviews', 'users', 'watchlist_movies']
+                                           'reviews', 'schema_version', 'users', 'version_counters',
+                                           'watchlist_movies']
 
 
 def test_database_populate_select_all_genres(database_engine):
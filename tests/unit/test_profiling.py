@@ -0,0 +1,28 @@
+from flix import profiling
+
+
+def test_profile_tokens_are_signed():
+    token = profiling.make_profile_token('secret')
+    assert profiling.valid_profile_token('secret', token)
+    assert not profiling.valid_profile_token('other secret', token)
+    assert not profiling.valid_profile_token('secret', token + 'x')
+    assert not profiling.valid_profile_token('secret', None)
+
+
+def test_requests_are_profiled_on_request(tmp_path):
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return iter([b'sorted ', str(sorted(range(1000))[0]).encode()])
+
+    middleware = profiling.ProfilingMiddleware(app, str(tmp_path), 'secret')
+    token = profiling.make_profile_token('secret')
+    environ = {'PATH_INFO': '/movies', 'REQUEST_METHOD': 'GET', 'HTTP_X_FLIX_PROFILE': token}
+
+    assert middleware(environ, lambda status, headers: None) == [b'sorted ', b'0']
+    captured = middleware.captured()
+    assert len(captured) == 1
+    assert captured[0]['path'] == '/movies'
+    assert 'sorted' in profiling.top_functions(str(tmp_path / captured[0]['name']))
+
+    middleware({'PATH_INFO': '/movies', 'REQUEST_METHOD': 'GET'}, lambda status, headers: None)
+    assert len(middleware.captured()) == 1
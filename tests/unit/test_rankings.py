@@ -0,0 +1,52 @@
+import pytest
+
+from flix.adapters.bitmap_index import BitmapIndex
+from flix.adapters.rankings import Rankings
+
+
+def make_rankings():
+    index = BitmapIndex()
+    index.add_movie(1, ["Action"], [], "X", 2014)
+    index.add_movie(2, ["Drama"], [], "X", 2014)
+    index.add_movie(3, ["Action"], [], "Y", 2016)
+    index.add_movie(4, ["Action"], [], "Y", 2016)
+    metrics = [(1, 8.1, 700, 333.1), (2, 7.0, 900, None), (3, 8.1, 100, 10.0), (4, 6.2, 400, 325.0)]
+    return Rankings(index, metrics)
+
+
+def test_overall_rankings():
+    rankings = make_rankings()
+    assert rankings.top('rating') == [(1, 8.1), (3, 8.1), (2, 7.0), (4, 6.2)]
+    assert rankings.top('votes', cursor=1, limit=2) == [(1, 700), (4, 400)]
+    # Unknown revenue is left out
+    assert [movie_id for movie_id, value in rankings.top('revenue')] == [1, 4, 3]
+
+
+def test_rankings_within_genre_and_year():
+    rankings = make_rankings()
+    assert rankings.top('rating', genre="Action") == [(1, 8.1), (3, 8.1), (4, 6.2)]
+    assert rankings.top('votes', year=2016, limit=1) == [(4, 400)]
+    assert rankings.top('votes', genre="Action", year=2016, cursor=1) == [(3, 100)]
+    assert rankings.top('rating', genre="Western") == []
+
+
+def test_filtered_rankings_are_cached():
+    rankings = make_rankings()
+    rankings.top('rating', genre="Action")
+    rankings.top('rating', genre="Action")
+    assert rankings.stats()['hits'] == 1
+
+
+def test_unknown_metric():
+    with pytest.raises(ValueError):
+        make_rankings().top('metascore')
+
+
+def test_added_movies_are_ranked_in_place():
+    rankings = make_rankings()
+    rankings.top('rating', genre="Action")
+    rankings.index.add_movie(5, ["Action"], [], "Z", 2016)
+    rankings.add_movie(5, 8.1, 500, None)
+    assert rankings.top('rating') == [(1, 8.1), (3, 8.1), (5, 8.1), (2, 7.0), (4, 6.2)]
+    assert rankings.top('votes', genre="Action", year=2016) == [(5, 500), (4, 400), (3, 100)]
+    assert [movie_id for movie_id, value in rankings.top('revenue')] == [1, 4, 3]
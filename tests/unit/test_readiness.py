@@ -0,0 +1,93 @@
+import os
+import threading
+
+from flask import Flask
+
+from flix import create_app, metrics, readiness
+from flix.adapters import repository as repo
+from flix.adapters.memory_repository import MemoryRepository
+
+
+def make_app(load) -> tuple:
+    app = Flask(__name__)
+    catalogue = readiness.Readiness()
+    readiness.init_app(app, catalogue)
+
+    @app.route('/')
+    def home():
+        return 'home'
+
+    thread = catalogue.load_in_background(load)
+    return app, catalogue, thread
+
+
+def test_requests_get_a_503_until_the_catalogue_is_loaded():
+    release = threading.Event()
+    app, catalogue, thread = make_app(release.wait)
+    client = app.test_client()
+
+    response = client.get('/')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(readiness.RETRY_AFTER)
+    assert client.get('/healthz').status_code == 200
+    response = client.get('/readyz')
+    assert response.status_code == 503
+    assert response.get_json() == {'status': 'loading'}
+
+    release.set()
+    thread.join(5)
+
+    assert catalogue.is_ready()
+    assert client.get('/').data == b'home'
+    assert client.get('/readyz').get_json() == {'status': 'ready'}
+
+
+def test_metrics_are_served_while_the_catalogue_loads():
+    release = threading.Event()
+    app, catalogue, thread = make_app(release.wait)
+    metrics.init_app(app, MemoryRepository())
+    client = app.test_client()
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert b'# TYPE flix_http_requests_total counter' in response.data
+
+    release.set()
+    thread.join(5)
+
+
+def test_failed_load_is_reported_by_healthz():
+    def load():
+        raise ValueError('bad catalogue')
+
+    app, catalogue, thread = make_app(load)
+    thread.join(5)
+    client = app.test_client()
+
+    assert not catalogue.is_ready()
+    response = client.get('/healthz')
+    assert response.status_code == 500
+    assert 'bad catalogue' in response.get_json()['error']
+    assert client.get('/readyz').get_json() == {'status': 'failed'}
+    assert client.get('/').status_code == 503
+
+
+def test_app_loads_the_memory_repository_in_the_background():
+    app = create_app({
+        'TESTING': True,
+        'REPOSITORY': 'memory',
+        'TEST_DATA_PATH': os.path.join('tests', 'data', 'memory'),
+        'WTF_CSRF_ENABLED': False,
+        'BACKGROUND_LOADING': True
+    })
+    client = app.test_client()
+
+    assert app.extensions['readiness'].wait(10)
+    assert client.get('/readyz').status_code == 200
+    assert client.get('/').status_code == 200
+    assert repo.repo_instance.get_number_of_movies() > 0
+
+
+def test_app_is_ready_once_created_without_background_loading(client):
+    assert client.get('/healthz').get_json() == {'status': 'ok'}
+    assert client.get('/readyz').status_code == 200
@@ -0,0 +1,78 @@
+import threading
+
+from flix.adapters.bitmap_index import BitmapIndex
+from flix.adapters.recommendations import Recommender
+
+
+def make_index():
+    index = BitmapIndex()
+    index.add_movie(1, ["Action", "Sci-Fi"], ["Chris Pratt", "Zoe Saldana"], "James Gunn", 2014)
+    index.add_movie(2, ["Action", "Sci-Fi"], ["Chris Pratt", "Zoe Saldana"], "James Gunn", 2017)
+    index.add_movie(3, ["Action"], ["Chris Pratt"], "Colin Trevorrow", 2015)
+    index.add_movie(4, ["Drama"], ["Meryl Streep"], "Steven Spielberg", 2017)
+    return index
+
+
+def test_recommender_ranks_most_similar_first():
+    recommender = Recommender(k=2)
+    recommender.refresh(make_index())
+    assert len(recommender) == 4
+    assert recommender.similar(1) == [2, 3]
+    assert recommender.similar(3, limit=1) == [1]
+    assert recommender.similar(4) == []
+
+
+def test_recommender_adds_new_movies_incrementally():
+    index = make_index()
+    recommender = Recommender(k=2)
+    recommender.refresh(index)
+
+    index.add_movie(5, ["Drama"], ["Meryl Streep"], "Steven Spielberg", 2018)
+    recommender.refresh(index)
+    assert recommender.similar(5) == [4]
+    assert recommender.similar(4) == [5]
+    assert recommender.index is index
+
+
+def test_recommender_uses_broad_features_without_specific_matches():
+    index = BitmapIndex()
+    for movie_id in range(1, Recommender.MAX_POSTING_LENGTH + 3):
+        index.add_movie(movie_id, ["Drama"], [f"Actor {movie_id}"], f"Director {movie_id}", 2000)
+    recommender = Recommender(k=3)
+    recommender.refresh(index)
+    assert recommender.similar(1) == [2, 3, 4]
+
+
+def test_recommender_rescores_movies_when_a_feature_becomes_broad(monkeypatch):
+    monkeypatch.setattr(Recommender, 'MAX_POSTING_LENGTH', 3)
+    index = BitmapIndex()
+    index.add_movie(1, ["Drama"], ["Actor 1"], "Director 1", 2000)
+    index.add_movie(2, ["Drama"], ["Actor 2"], "Director 2", 2000)
+    index.add_movie(3, ["Drama"], ["Actor 3"], "Director 3", 2000)
+    recommender = Recommender(k=1)
+    recommender.refresh(index)
+    assert recommender.similar(1) == [2]
+
+    # Drama now has too many movies to find candidates through, so movie 1 is rescored and only finds 5, through
+    # an actor, though its large cast scores it below what 2 scored through Drama
+    index.add_movie(4, ["Drama"], ["Actor 4"], "Director 4", 2000)
+    index.add_movie(5, ["Drama"], ["Actor 1"] + [f"Extra {i}" for i in range(90)], "Director 5", 2000)
+    recommender.refresh(index)
+
+    rebuilt = Recommender(k=1)
+    rebuilt.refresh(index)
+    assert recommender.similar(1) == [5]
+    assert [recommender.similar(movie_id) for movie_id in range(1, 6)] == \
+           [rebuilt.similar(movie_id) for movie_id in range(1, 6)]
+
+
+def test_concurrent_refreshes_score_each_movie_once():
+    index = make_index()
+    recommender = Recommender(k=2)
+    threads = [threading.Thread(target=recommender.refresh, args=(index,)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert recommender.similar(1) == [2, 3]
+    assert recommender.similar(3) == [1, 2]
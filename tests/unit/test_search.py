@@ -0,0 +1,29 @@
+from flix.movies import search
+
+
+def test_intersect_returns_ascending_common_ids():
+    assert search.intersect([[1, 3, 5, 9], [1, 5, 7, 9], [1, 2, 5, 9, 11]]) == [1, 5, 9]
+
+
+def test_intersect_single_list_is_unique():
+    assert search.intersect([[2, 2, 4, 8]]) == [2, 4, 8]
+
+
+def test_intersect_with_nothing_in_common():
+    assert search.intersect([[1, 2, 3], [4, 5, 6]]) == []
+
+
+def test_intersect_empty_search():
+    assert search.intersect([]) == []
+
+
+def test_intersect_stops_at_limit():
+    broad = list(range(1, 10001))
+    narrow = [10, 20, 30, 40]
+    assert search.intersect([broad, narrow], limit=2) == [10, 20]
+
+
+def test_intersect_gallops_through_large_list():
+    broad = list(range(0, 100000, 2))
+    narrow = [3, 4, 99998, 99999]
+    assert search.intersect([broad, narrow]) == [4, 99998]
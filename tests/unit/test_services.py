@@ -1,7 +1,10 @@
 import pytest
 
+from flask import Flask, session
+
+from flix.adapters.database_repository import SqlAlchemyRepository
 from flix.authentication.services import AuthenticationException
-from flix.domain.model import make_review, User
+from flix.domain.model import make_review, User, Movie, Director
 from flix.movies import services as movies_services
 from flix.authentication import services as auth_services
 
@@ -55,6 +58,43 @@ def test_can_get_movie(in_memory_repo):
     assert movie_as_dict['year'] == 2012
 
 
+def test_get_movie_is_cached(in_memory_repo):
+    movies_services.get_movie(2, in_memory_repo)
+    movie_as_dict = movies_services.get_movie(2, in_memory_repo)
+    assert movie_as_dict['title'] == "Prometheus"
+
+    stats = movies_services.movie_cache_stats(in_memory_repo)
+    assert stats['hits'] == 1
+    assert stats['misses'] == 1
+
+
+def test_cached_movie_is_not_changed_by_caller(in_memory_repo):
+    movie_as_dict = movies_services.get_movie(2, in_memory_repo)
+    movie_as_dict['view_review_url'] = '/movie?movie_id=2'
+    assert 'view_review_url' not in movies_services.get_movie(2, in_memory_repo)
+
+
+def test_adding_review_invalidates_cached_movie(in_memory_repo):
+    assert len(movies_services.get_movie(1, in_memory_repo)['reviews']) == 0
+    movies_services.add_review(1, "Wasn't a fan", 4, 'shaun', in_memory_repo)
+    assert len(movies_services.get_movie(1, in_memory_repo)['reviews']) == 1
+
+
+def test_cached_movie_sees_reviews_added_through_another_repository(file_session_factory):
+    # Two repositories on one database file, as two worker processes would have
+    first = SqlAlchemyRepository(file_session_factory)
+    second = SqlAlchemyRepository(file_session_factory)
+    first.add_user(User('shaun', '12345'))
+    assert len(movies_services.get_movie(1, second)['reviews']) == 0
+
+    movies_services.add_review(1, "Wasn't a fan", 4, 'shaun', first)
+    second.reset_session()
+    assert len(movies_services.get_movie(1, second)['reviews']) == 1
+
+    movies_services.get_movie(1, second)
+    assert movies_services.movie_cache_stats(second)['hits'] == 1
+
+
 def test_cannot_get_non_existent_movie(in_memory_repo):
     movie_id = 27
     with pytest.raises(movies_services.NonExistentMovieException):
@@ -128,6 +168,41 @@ def test_can_get_director(in_memory_repo):
     assert len(director['movies']) > 0
 
 
+def test_can_get_actor_with_loose_spelling(in_memory_repo):
+    actor = movies_services.get_actor("  chris PRATT", in_memory_repo)
+    assert actor['fullname'] == "Chris Pratt"
+    assert actor['movies'] == [1]
+    assert movies_services.get_actor("Chris Prat", in_memory_repo)['fullname'] == "Chris Pratt"
+    assert movies_services.get_actor("Nobody Known", in_memory_repo) is None
+
+
+def test_can_autocomplete_names(in_memory_repo):
+    suggestions = movies_services.autocomplete("rid", in_memory_repo)
+    assert {'name': "Ridley Scott", 'type': 'director'} in suggestions
+    assert len(movies_services.autocomplete("a", in_memory_repo, limit=1000)) <= \
+        movies_services.MAX_AUTOCOMPLETE_LIMIT
+
+
+def test_can_page_through_names(in_memory_repo):
+    names = movies_services.get_names('actor', in_memory_repo, limit=3)
+    assert len(names) == 3
+    rest = movies_services.get_names('actor', in_memory_repo, after=names[-1])
+    assert names[-1] not in rest
+    assert movies_services.get_names('director', in_memory_repo, prefix='ridley') == ['Ridley Scott']
+
+
+def test_can_get_movie_ids_by_letter_after_a_movie(in_memory_repo):
+    movie_ids = movies_services.get_movie_ids_by_letter('S', in_memory_repo)
+    assert len(movie_ids) == 3
+    assert movies_services.get_movie_ids_by_letter('S', in_memory_repo, after=movie_ids[0]) == movie_ids[1:]
+
+
+def test_movie_detail_leaves_out_reviews(in_memory_repo):
+    movie = movies_services.get_movie_detail(2, in_memory_repo)
+    assert 'reviews' not in movie
+    assert movie['genres'] == ['Adventure', 'Mystery', 'Sci-Fi']
+
+
 def test_common_elements(in_memory_repo):
     actor_movies = movies_services.get_actor("Chris Pratt", in_memory_repo)['movies']
     director_movies = movies_services.get_director("James Gunn", in_memory_repo)['movies']
@@ -151,6 +226,144 @@ def test_nothing_in_common(in_memory_repo):
     assert len(common) == 0
 
 
+def test_can_search_movies(in_memory_repo):
+    filters = {'genre': "Action", 'actor': "Chris Pratt", 'director': "James Gunn"}
+    movie_ids, count = movies_services.search_movies(filters, in_memory_repo)
+    assert movie_ids == [1]
+    assert count == 1
+
+
+def test_can_search_movies_with_exclusion_and_paging(in_memory_repo):
+    movie_ids, count = movies_services.search_movies({'genre': ["Action", "Adventure"]}, in_memory_repo,
+                                                     exclude={'director': "James Gunn"})
+    assert 1 not in movie_ids
+    assert count == len(movie_ids)
+
+    movie_ids, count = movies_services.search_movies({'genre': "Action"}, in_memory_repo, cursor=1, limit=10)
+    assert movie_ids == [5]
+    assert count == 2
+
+
+def test_can_get_search_facets(in_memory_repo):
+    facets = movies_services.get_search_facets({'genre': "Action"}, in_memory_repo)
+    assert facets['genre'][0] == ("Action", 2)
+    assert ("James Gunn", 1) in facets['director']
+    assert sum(count for decade, count in facets['decade']) == 2
+
+
+def test_search_facets_are_capped(in_memory_repo, monkeypatch):
+    # The Action movies have more than 3 actors between them, so the cap is what limits them
+    monkeypatch.setattr(movies_services, 'MAX_FACET_LIMIT', 3)
+    facets = movies_services.get_search_facets({'genre': "Action"}, in_memory_repo, limit=1000)
+    assert len(facets['actor']) == 3
+    facets = movies_services.get_search_facets({'genre': "Action"}, in_memory_repo, limit=2)
+    assert len(facets['actor']) == 2
+
+
+def test_search_with_facets_matches_the_separate_calls(in_memory_repo):
+    filters = {'genre': "Action"}
+    movie_ids, count, facets = movies_services.search_movies_with_facets(filters, in_memory_repo, limit=1,
+                                                                         facet_limit=5)
+    assert (movie_ids, count) == movies_services.search_movies(filters, in_memory_repo, limit=1)
+    assert facets == movies_services.get_search_facets(filters, in_memory_repo, limit=5)
+    assert movies_services.search_movies_with_facets({}, in_memory_repo)[:2] == ([], 0)
+
+
+def test_search_without_filters_finds_nothing(in_memory_repo):
+    assert movies_services.search_movies({}, in_memory_repo) == ([], 0)
+
+
+def test_can_get_similar_movies(in_memory_repo):
+    # Prometheus shares Adventure and Sci-Fi with Guardians of the Galaxy, Suicide Squad Action and Adventure
+    similar_movies = movies_services.get_similar_movies(1, in_memory_repo)
+    assert [movie['id'] for movie in similar_movies] == [2, 5]
+    assert movies_services.get_similar_movies(12, in_memory_repo) == []
+
+
+def test_can_get_movies_with_similar_descriptions(in_memory_repo):
+    sequel = Movie("Guardians of the Galaxy Returns", 2019, 100)
+    sequel.description = "The intergalactic criminals return to stop another fanatical warrior."
+    sequel.director = Director("James Gunn")
+    in_memory_repo.add_movie(sequel)
+
+    similar_movies = movies_services.get_movies_with_similar_descriptions(1, in_memory_repo)
+    assert [movie['id'] for movie in similar_movies] == [100]
+    assert movies_services.get_movies_with_similar_descriptions(12, in_memory_repo) == []
+
+
+def test_can_get_actor_path(in_memory_repo):
+    path = movies_services.get_actor_path("Chris Pratt", "Bradley Cooper", in_memory_repo)
+    assert path['actors'] == ["Chris Pratt", "Bradley Cooper"]
+    assert path['movies'][0]['id'] == 1
+    assert movies_services.get_actor_path("Chris Pratt", "Bradley Cooper", in_memory_repo) == path
+    assert movies_services.get_actor_path("Chris Pratt", "Nobody Known", in_memory_repo) is None
+
+
+def test_can_get_rankings(in_memory_repo):
+    ranked = movies_services.get_rankings('rating', in_memory_repo, limit=2)
+    assert [movie['id'] for movie in ranked] == [1, 3]
+    assert ranked[0]['rating'] == 8.1
+
+    ranked = movies_services.get_rankings('votes', in_memory_repo, limit=1)
+    assert ranked[0]['votes'] == 757074 and type(ranked[0]['votes']) is int
+
+    ranked = movies_services.get_rankings('revenue', in_memory_repo, genre="action")
+    assert [movie['id'] for movie in ranked] == [1, 5]
+
+    with pytest.raises(movies_services.UnknownMetricException):
+        movies_services.get_rankings('metascore', in_memory_repo)
+
+
+def test_can_get_statistics(in_memory_repo):
+    statistics = movies_services.get_statistics(in_memory_repo)
+    assert statistics['movies']['decade'] == [{'key': 2010, 'movies': 5, 'average_runtime': 118.6,
+                                               'average_rating': 7.16, 'average_revenue': 238.61}]
+    action = statistics['movies']['genre'][0]
+    assert action['key'] == "Action"
+    assert action['movies'] == 2
+    assert statistics['reviews'] == []
+
+
+def test_statistics_are_recomputed_after_review_threshold(in_memory_repo):
+    statistics = movies_services.get_statistics(in_memory_repo)
+    movies_services.add_review(1, "Wasn't a fan", 4, 'shaun', in_memory_repo)
+    assert movies_services.get_statistics(in_memory_repo) is statistics
+
+    for i in range(movies_services.STATISTICS_REVIEW_THRESHOLD):
+        movies_services.add_review(2, "Review number " + str(i), 5, 'shaun', in_memory_repo)
+    statistics = movies_services.get_statistics(in_memory_repo)
+    assert sum(day['reviews'] for day in statistics['reviews']) == movies_services.STATISTICS_REVIEW_THRESHOLD + 1
+
+
+def test_watchlist_membership(in_memory_repo):
+    movies = movies_services.movies_to_summary_dict([in_memory_repo.get_movie(1), in_memory_repo.get_movie(2)])
+    watchlist = movies_services.Watchlist(movies)
+    assert len(watchlist) == 2
+    assert 1 in watchlist
+    assert 3 not in watchlist
+    assert [movie['title'] for movie in watchlist] == ["Guardians of the Galaxy", "Prometheus"]
+    assert 'reviews' not in movies[0]
+
+
+def test_cached_watchlist_sees_changes_made_through_another_repository(file_session_factory):
+    first = SqlAlchemyRepository(file_session_factory)
+    second = SqlAlchemyRepository(file_session_factory)
+    first.add_user(User('shaun', '12345'))
+
+    app = Flask(__name__)
+    app.secret_key = 'test'
+    with app.test_request_context():
+        session['username'] = 'shaun'
+        assert len(movies_services.get_watchlist(second)) == 0
+
+        movies_services.add_to_watchlist(2, first)
+        second.reset_session()
+        assert 2 in movies_services.get_watchlist(second)
+
+        movies_services.get_watchlist(second)
+        assert movies_services.watchlist_cache_stats(second)['hits'] == 1
+
+
 def test_can_add_user(in_memory_repo):
     username = "james"
     password = 'abcd1A23'
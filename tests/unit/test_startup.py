@@ -0,0 +1,97 @@
+import os
+import subprocess
+import sys
+
+from sqlalchemy import create_engine
+
+from flix import create_app
+from flix.adapters import database_repository
+from flix.adapters.orm import SCHEMA_VERSION
+from flix.startup import StartupTimer
+
+
+def test_startup_timer_times_each_phase_from_the_end_of_the_last():
+    timer = StartupTimer()
+    timer.mark('configuration')
+    timer.mark('repository')
+
+    phases = timer.phases()
+    assert list(phases) == ['configuration', 'repository']
+    assert abs(sum(phases.values()) - timer.total()) < 1e-9
+    assert timer.report().splitlines()[-1].startswith('total')
+
+
+def test_populated_database_is_current(database_engine):
+    assert database_repository.schema_is_current(database_engine)
+
+    database_engine.execute('UPDATE schema_version SET version = ?', SCHEMA_VERSION - 1)
+    assert not database_repository.schema_is_current(database_engine)
+
+
+def test_new_database_is_not_current(tmp_path):
+    engine = create_engine('sqlite:///' + str(tmp_path / 'new.db'))
+    assert not database_repository.schema_is_current(engine)
+
+
+def test_app_populates_a_database_only_until_it_is_current(tmp_path, capsys):
+    config = {
+        'REPOSITORY': 'database',
+        'TEST_DATA_PATH': os.path.join('tests', 'data', 'database'),
+        'SQLALCHEMY_DATABASE_URI': 'sqlite:///' + str(tmp_path / 'flix.db'),
+        'SQLALCHEMY_ECHO': False
+    }
+
+    create_app(config)
+    assert 'REPOPULATING DATABASE' in capsys.readouterr().out
+
+    app = create_app(config)
+    assert 'REPOPULATING DATABASE' not in capsys.readouterr().out
+    assert list(app.extensions['startup'].phases()) == ['configuration', 'repository', 'middleware', 'blueprints',
+                                                        'instrumentation']
+
+
+def test_app_migrates_a_database_made_for_older_tables(tmp_path, capsys):
+    uri = 'sqlite:///' + str(tmp_path / 'flix.db')
+    engine = create_engine(uri)
+    # The tables as they were before ratings, votes and revenue were stored, with no schema_version table
+    engine.execute('CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR(255) NOT NULL UNIQUE, '
+                   'password VARCHAR(255) NOT NULL)')
+    engine.execute('CREATE TABLE movies (id INTEGER PRIMARY KEY, title VARCHAR(255) NOT NULL, year INTEGER NOT NULL, '
+                   'description VARCHAR(1024) NOT NULL, director_id INTEGER, runtime INTEGER NOT NULL, '
+                   'first_letter VARCHAR(255) NOT NULL)')
+    engine.execute('CREATE TABLE reviews (id INTEGER PRIMARY KEY, user_id INTEGER, movie_id INTEGER, '
+                   'review VARCHAR(1024) NOT NULL, rating INTEGER NOT NULL, timestamp DATETIME NOT NULL)')
+    engine.execute("INSERT INTO users VALUES (1, 'fmercury', 'hashed')")
+    engine.execute("INSERT INTO movies VALUES (1, 'Old', 2000, 'Old', NULL, 90, 'O')")
+    engine.execute("INSERT INTO reviews VALUES (1, 1, 1, 'Great', 9, '2020-01-01 00:00:00')")
+
+    config = {'REPOSITORY': 'database', 'TEST_DATA_PATH': os.path.join('tests', 'data', 'database'),
+              'SQLALCHEMY_DATABASE_URI': uri, 'SQLALCHEMY_ECHO': False}
+    create_app(config)
+    assert 'MIGRATING DATABASE' in capsys.readouterr().out
+
+    assert database_repository.schema_is_current(engine)
+    assert engine.execute('SELECT username FROM users').fetchall() == [('fmercury',)]
+    assert engine.execute('SELECT movie_id, review FROM reviews').fetchall() == [(1, 'Great')]
+    assert engine.execute('SELECT title, rating FROM movies WHERE id = 1').fetchone() == ('Guardians of the Galaxy', 8.1)
+
+    create_app(config)
+    assert 'DATABASE' not in capsys.readouterr().out
+
+
+def test_startup_report_is_printed_when_asked_for(capsys):
+    create_app({'REPOSITORY': 'memory', 'TEST_DATA_PATH': os.path.join('tests', 'data', 'memory'),
+                'STARTUP_REPORT': True})
+
+    output = capsys.readouterr().out
+    assert 'STARTUP TIMES' in output
+    assert 'repository' in output
+
+
+def test_validators_are_not_imported_at_startup():
+    code = "import sys; from flix import create_app; " \
+           "create_app({'REPOSITORY': 'memory', 'TEST_DATA_PATH': 'tests/data/memory'}); " \
+           "print('better_profanity' in sys.modules, 'password_validator' in sys.modules)"
+    output = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True).stdout
+
+    assert output.split() == ['False', 'False']
@@ -0,0 +1,66 @@
+import time
+from types import SimpleNamespace
+
+from flask import Flask, g
+
+from flix import timing
+
+
+def test_percentiles_use_nearest_rank():
+    durations = [i / 1000 for i in range(1, 101)]
+    assert timing.percentile(durations, 50) == 0.05
+    assert timing.percentile(durations, 99) == 0.099
+    assert timing.summarise([0.002]) == {'count': 1, 'p50': 2.0, 'p90': 2.0, 'p99': 2.0}
+
+
+def test_stats_keep_recent_durations_per_route():
+    stats = timing.TimingStats(samples=2)
+    for duration in (1.0, 0.002, 0.004):
+        stats.add('/movie', {'total': duration})
+    assert stats.percentiles()['/movie']['total']['count'] == 2
+    assert stats.percentiles()['/movie']['total']['p99'] == 4.0
+
+
+def test_nested_calls_in_a_layer_are_timed_once():
+    def outer():
+        return target.inner()
+
+    def inner():
+        time.sleep(0.001)
+        return 'done'
+
+    target = SimpleNamespace(outer=outer, inner=inner)
+    patches = timing.instrument(target, 'service', ['outer', 'inner'])
+
+    with Flask(__name__).test_request_context():
+        g.request_timer = timing.RequestTimer()
+        assert target.outer() == 'done'
+        assert g.request_timer.calls['service'] == 1
+        assert g.request_timer.totals['service'] >= 0.001
+        assert g.request_timer.server_timing().startswith('service;dur=')
+
+    timing.release(patches)
+    assert target.outer is outer
+
+
+def test_untimed_requests_call_straight_through():
+    timed = timing.timed(lambda: 'done', 'repository')
+    assert timed() == 'done'
+    assert timing.timed(timed, 'repository') is timed
+
+
+def test_patches_are_undone_once_every_user_has_released_them():
+    class Repository:
+        def get_movie(self):
+            return 'movie'
+
+    repository = Repository()
+    first = timing.instrument(repository, 'repository')
+    second = timing.instrument(repository, 'repository')
+    assert repository.get_movie.__timed_layer__ == 'repository'
+
+    timing.release(first)
+    assert repository.get_movie.__timed_layer__ == 'repository'
+    timing.release(second)
+    assert 'get_movie' not in vars(repository)
+    assert repository.get_movie() == 'movie'